@@ -0,0 +1,345 @@
+"""
+Content-addressed archive of rendered detail pages.
+
+Each page's HTML is stored once per distinct content (sha256) in a SQLite file,
+compressed against a shared dictionary: the portal's detail pages are nearly
+identical templates, so compressing every page against the first one archived
+removes most of the repeated markup. zstandard is used when installed,
+otherwise zlib with the same dictionary.
+
+snapshot_from_html() rebuilds the snapshot that SNAPSHOT_SCRIPT captures in the
+browser, so archived pages can be re-extracted offline with render.py.
+"""
+import hashlib
+import json
+import logging
+import re
+import sqlite3
+import time
+import zlib
+from html.parser import HTMLParser
+from urllib.parse import urljoin
+
+from locators import SITE_LOCATORS
+from render import node_text
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+# zlib only looks back 32 KiB, zstd can use a larger dictionary
+DICT_SIZE = {"zlib": 32 * 1024, "zstd": 256 * 1024}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS dictionaries (id INTEGER PRIMARY KEY AUTOINCREMENT, codec TEXT NOT NULL, data BLOB NOT NULL);
+CREATE TABLE IF NOT EXISTS blobs (
+    hash TEXT PRIMARY KEY,
+    codec TEXT NOT NULL,
+    dict_id INTEGER,
+    size INTEGER NOT NULL,
+    data BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS pages (
+    url TEXT PRIMARY KEY,
+    hash TEXT NOT NULL,
+    basic_info TEXT NOT NULL,
+    list_page INTEGER,
+    list_index INTEGER,
+    captured_at REAL NOT NULL
+);
+"""
+
+
+class PageArchive:
+    """Detail page HTML keyed by URL, deduplicated by content and dictionary-compressed"""
+
+    def __init__(self, path, codec=None, level=None):
+        self.path = path
+        self.codec = codec or ("zstd" if zstandard is not None else "zlib")
+        if self.codec == "zstd" and zstandard is None:
+            raise ImportError("zstandard is not installed; use codec='zlib'")
+        self.level = level
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.executescript(_SCHEMA)
+        self.dictionaries = {}
+        self.stored = 0
+        self.deduplicated = 0
+
+    def _dictionary(self, dict_id):
+        if dict_id not in self.dictionaries:
+            row = self.conn.execute("SELECT data FROM dictionaries WHERE id = ?", (dict_id,)).fetchone()
+            self.dictionaries[dict_id] = row[0]
+        return self.dictionaries[dict_id]
+
+    def _current_dictionary(self, raw):
+        """Id of the shared dictionary for this codec, seeded from the first page archived"""
+        row = self.conn.execute(
+            "SELECT id FROM dictionaries WHERE codec = ? ORDER BY id DESC LIMIT 1", (self.codec,)
+        ).fetchone()
+        if row:
+            return row[0]
+        size = DICT_SIZE[self.codec]
+        # zlib matches against the end of its dictionary, so keep the tail of the page
+        data = raw[-size:] if self.codec == "zlib" else raw[:size]
+        dict_id = self.conn.execute(
+            "INSERT INTO dictionaries (codec, data) VALUES (?, ?)", (self.codec, data)
+        ).lastrowid
+        self.dictionaries[dict_id] = data
+        return dict_id
+
+    def _compress(self, raw, dict_id):
+        data = self._dictionary(dict_id)
+        if self.codec == "zstd":
+            zdict = zstandard.ZstdCompressionDict(data, dict_type=zstandard.DICT_TYPE_RAWCONTENT)
+            return zstandard.ZstdCompressor(level=self.level or 10, dict_data=zdict).compress(raw)
+        compressor = zlib.compressobj(self.level or 9, zdict=data)
+        return compressor.compress(raw) + compressor.flush()
+
+    def _decompress(self, codec, dict_id, blob):
+        data = self._dictionary(dict_id)
+        if codec == "zstd":
+            if zstandard is None:
+                raise ImportError("zstandard is needed to read zstd pages from this archive")
+            zdict = zstandard.ZstdCompressionDict(data, dict_type=zstandard.DICT_TYPE_RAWCONTENT)
+            return zstandard.ZstdDecompressor(dict_data=zdict).decompress(blob)
+        decompressor = zlib.decompressobj(zdict=data)
+        return decompressor.decompress(blob) + decompressor.flush()
+
+    def put(self, basic_info, html, position=None):
+        """Archive a page under its call link; returns the content hash"""
+        raw = html.encode("utf-8")
+        digest = hashlib.sha256(raw).hexdigest()
+        with self.conn:
+            if self.conn.execute("SELECT 1 FROM blobs WHERE hash = ?", (digest,)).fetchone():
+                self.deduplicated += 1
+            else:
+                dict_id = self._current_dictionary(raw)
+                self.conn.execute(
+                    "INSERT INTO blobs VALUES (?, ?, ?, ?, ?)",
+                    (digest, self.codec, dict_id, len(raw), self._compress(raw, dict_id)),
+                )
+                self.stored += 1
+            list_page, list_index = position or (None, None)
+            self.conn.execute(
+                "INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?, ?)",
+                (basic_info["link"], digest, json.dumps(basic_info, ensure_ascii=False),
+                 list_page, list_index, time.time()),
+            )
+        return digest
+
+    def html(self, digest):
+        """Decompressed HTML for a content hash"""
+        codec, dict_id, blob = self.conn.execute(
+            "SELECT codec, dict_id, data FROM blobs WHERE hash = ?", (digest,)
+        ).fetchone()
+        return self._decompress(codec, dict_id, blob).decode("utf-8")
+
+    def pages(self):
+        """(url, hash, basic_info) for every archived page, in listing order"""
+        rows = self.conn.execute(
+            "SELECT url, hash, basic_info FROM pages "
+            "ORDER BY list_page IS NULL, list_page, list_index, captured_at"
+        ).fetchall()
+        return [(url, digest, json.loads(info)) for url, digest, info in rows]
+
+    def page(self, url):
+        """(basic_info, html) for an archived call link"""
+        digest, info = self.conn.execute("SELECT hash, basic_info FROM pages WHERE url = ?", (url,)).fetchone()
+        return json.loads(info), self.html(digest)
+
+    def stats(self):
+        pages, = self.conn.execute("SELECT COUNT(*) FROM pages").fetchone()
+        blobs, raw, stored = self.conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0), COALESCE(SUM(LENGTH(data)), 0) FROM blobs"
+        ).fetchone()
+        return {"pages": pages, "blobs": blobs, "raw_bytes": raw, "stored_bytes": stored}
+
+    def log_report(self):
+        stats = self.stats()
+        ratio = stats["raw_bytes"] / stats["stored_bytes"] if stats["stored_bytes"] else 0
+        logger.info(
+            "Archive %s: %s pages, %s distinct, %.1f MB -> %.1f MB (%.1fx, %s)",
+            self.path, stats["pages"], stats["blobs"], stats["raw_bytes"] / 1e6,
+            stats["stored_bytes"] / 1e6, ratio, self.codec,
+        )
+
+    def close(self):
+        self.conn.commit()
+        self.conn.close()
+
+
+# Elements that never contribute to innerText
+_SKIPPED_TAGS = frozenset(["script", "style", "template", "noscript", "head"])
+_VOID_TAGS = frozenset([
+    "area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "source", "track", "wbr",
+])
+_DISPLAY_NONE = re.compile(r"display\s*:\s*none", re.IGNORECASE)
+
+
+class _TreeBuilder(HTMLParser):
+    """Builds snapshot-format nodes (plus attributes) from page_source"""
+
+    def __init__(self, base_url):
+        super().__init__(convert_charrefs=True)
+        self.base_url = base_url
+        self.root = {"t": "#document", "k": [], "a": {}}
+        self.stack = [self.root]
+        self.parents = {}
+
+    def handle_starttag(self, tag, attrs):
+        attrs = {name: value or "" for name, value in attrs}
+        node = {"t": tag, "k": [], "a": attrs}
+        if attrs.get("class"):
+            node["cl"] = attrs["class"]
+        if tag == "a" and attrs.get("href"):
+            node["h"] = urljoin(self.base_url, attrs["href"])
+        self.stack[-1]["k"].append(node)
+        self.parents[id(node)] = self.stack[-1]
+        if tag not in _VOID_TAGS:
+            self.stack.append(node)
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+        if tag not in _VOID_TAGS:
+            self.stack.pop()
+
+    def handle_endtag(self, tag):
+        # Close up to the matching open element; stray end tags are ignored
+        for depth in range(len(self.stack) - 1, 0, -1):
+            if self.stack[depth]["t"] == tag:
+                del self.stack[depth:]
+                return
+
+    def handle_data(self, data):
+        self.stack[-1]["k"].append(data if data.strip() else " ")
+
+
+def _hidden(node):
+    attrs = node.get("a", {})
+    return (
+        node["t"] in _SKIPPED_TAGS
+        or "hidden" in attrs
+        or bool(_DISPLAY_NONE.search(attrs.get("style", "")))
+    )
+
+
+def _serialize(node):
+    """Strip attributes and hidden elements, like the capture script's serialize()"""
+    out = {"t": node["t"], "k": []}
+    if "cl" in node:
+        out["cl"] = node["cl"]
+    if "h" in node:
+        out["h"] = node["h"]
+    for child in node["k"]:
+        if isinstance(child, str):
+            out["k"].append(child)
+        elif not _hidden(child):
+            out["k"].append(_serialize(child))
+    return out
+
+
+_ATTRIBUTE_SELECTOR = re.compile(r"\[([\w-]+)(?:([\^*$]?=)'([^']*)')?\]")
+_COMPOUND = re.compile(r"^([\w-]*)((?:\.[\w-]+)*)((?:\[[^\]]+\])*)$")
+
+
+def _compile_compound(text):
+    """Matcher for one compound selector: tag, .classes and [attr], [attr='v'], ^=, *=, $="""
+    match = _COMPOUND.match(text)
+    if not match:
+        raise ValueError(f"Unsupported selector: {text}")
+    tag, classes, attributes = match.groups()
+    classes = [c for c in classes.split(".") if c]
+    attributes = _ATTRIBUTE_SELECTOR.findall(attributes)
+
+    def matches(node):
+        if tag and node["t"] != tag:
+            return False
+        if classes and not set(classes).issubset(node.get("cl", "").split()):
+            return False
+        attrs = node.get("a", {})
+        for name, op, value in attributes:
+            if name not in attrs:
+                return False
+            actual = attrs[name]
+            if (op == "=" and actual != value) or (op == "^=" and not actual.startswith(value)) \
+                    or (op == "*=" and value not in actual) or (op == "$=" and not actual.endswith(value)):
+                return False
+        return True
+    return matches
+
+
+def select(root, selector):
+    """
+    Descendants of root matching a CSS selector group, in document order.
+    Supports the subset used by SITE_LOCATORS: compound selectors joined by
+    the descendant combinator, and comma-separated groups.
+    """
+    chains = [[_compile_compound(part) for part in group.split()] for group in selector.split(",")]
+    found = []
+
+    def walk(node, ancestors):
+        for child in node["k"]:
+            if isinstance(child, str):
+                continue
+            for chain in chains:
+                if chain[-1](child) and _ancestors_match(chain[:-1], ancestors):
+                    found.append(child)
+                    break
+            walk(child, ancestors + [child])
+
+    walk(root, [])
+    return found
+
+
+def _ancestors_match(chain, ancestors):
+    position = len(ancestors)
+    for matcher in reversed(chain):
+        while position and not matcher(ancestors[position - 1]):
+            position -= 1
+        if not position:
+            return False
+        position -= 1
+    return True
+
+
+def _query(name):
+    return ", ".join(SITE_LOCATORS[name][1])
+
+
+def snapshot_from_html(html, url=""):
+    """Offline counterpart of SNAPSHOT_SCRIPT: the detail snapshot of saved page_source, or None"""
+    builder = _TreeBuilder(url)
+    builder.feed(html)
+    builder.close()
+    root = builder.root
+
+    def text(node):
+        return node_text(_serialize(node)).strip() if node is not None else ""
+
+    def first(parent, name):
+        matches = select(parent, _query(name))
+        return matches[0] if matches else None
+
+    cards = select(root, _query("detail_card"))
+    if cards:
+        snapshot_cards = []
+        for card in cards:
+            content = first(card, "detail_card_content")
+            snapshot_cards.append({
+                "title": text(first(card, "detail_card_title")),
+                "content": _serialize(content) if content is not None else None,
+            })
+        return {"layout": "cards", "url": url, "cards": snapshot_cards}
+    sections = select(root, _query("detail_section"))
+    if not sections:
+        # Same fallback as the capture script: the parent of every 'section h2'
+        sections = [builder.parents[id(h)] for h in select(root, "section " + _query("section_title"))]
+    if not sections:
+        return None
+    return {"layout": "sections", "url": url, "sections": [
+        {"title": text(first(section, "section_title")), "content": _serialize(section)}
+        for section in sections
+    ]}
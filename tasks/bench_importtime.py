@@ -0,0 +1,99 @@
+"""
+Cold-start import benchmark for the pipeline entry points.
+
+Runs `python -X importtime -c "import <module>"` in a fresh interpreter per
+entry point and reports the cumulative import time, the wall time and whether
+the browser stack was pulled in. Browser-free entry points must not import
+selenium or webdriver_manager; --check turns that into a non-zero exit.
+
+    python bench_importtime.py              # table
+    python bench_importtime.py --json       # for tracking over time
+    python bench_importtime.py --check      # fail if a browser-free entry point imports selenium
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+# Entry point module -> whether it is allowed to import the browser stack
+ENTRY_POINTS = {
+    "extract": False,
+    "enrich": False,
+    "render": False,
+    "pipeline": False,
+    "workqueue": False,
+    "distributed": False,
+    "daemon": False,
+    "replay": False,
+    "parastore": False,
+    "bench_parastore": False,
+    "synthetic_portal": False,
+    "browser": True,
+    "filtertest": True,
+}
+
+BROWSER_MODULES = ("selenium", "webdriver_manager")
+
+
+def measure(module, repeat=3):
+    """Best-of-repeat import timings for one module in a fresh interpreter"""
+    here = os.path.dirname(os.path.abspath(__file__))
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        proc = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+            cwd=here, capture_output=True, text=True,
+        )
+        wall_ms = (time.perf_counter() - started) * 1000
+        imported = {}
+        for line in proc.stderr.splitlines():
+            if not line.startswith("import time:") or "|" not in line:
+                continue
+            _, cumulative, name = (part.strip() for part in line[len("import time:"):].split("|"))
+            if cumulative.isdigit():
+                imported[name.strip()] = int(cumulative)
+        run = {
+            "module": module,
+            "ok": proc.returncode == 0,
+            "error": proc.stderr.strip().splitlines()[-1] if proc.returncode else None,
+            "cumulative_ms": imported.get(module, 0) / 1000,
+            "wall_ms": wall_ms,
+            "modules": len(imported),
+            "browser_stack": sorted({n.split(".")[0] for n in imported if n.split(".")[0] in BROWSER_MODULES}),
+        }
+        if best is None or run["wall_ms"] < best["wall_ms"]:
+            best = run
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import-time benchmark for pipeline entry points")
+    parser.add_argument("modules", nargs="*", help="entry point modules (default: all known)")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    parser.add_argument("--check", action="store_true", help="exit 1 if a browser-free entry point imports selenium")
+    args = parser.parse_args()
+
+    results = [measure(module, args.repeat) for module in (args.modules or ENTRY_POINTS)]
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print(f"{'entry point':<18}{'import ms':>11}{'wall ms':>10}{'modules':>9}  browser stack")
+        for r in results:
+            status = ", ".join(r["browser_stack"]) or "-"
+            if not r["ok"]:
+                status = f"FAILED: {r['error']}"
+            print(f"{r['module']:<18}{r['cumulative_ms']:>11.1f}{r['wall_ms']:>10.1f}{r['modules']:>9}  {status}")
+
+    violations = [r["module"] for r in results if r["browser_stack"] and not ENTRY_POINTS.get(r["module"], True)]
+    if violations:
+        print(f"Browser stack imported by browser-free entry points: {', '.join(violations)}", file=sys.stderr)
+    if args.check and violations:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Storage benchmark for the paragraph store.
+
+Converts a calls_raw.json dump to a paragraph store (see parastore.py) and
+reports file sizes, best-of-repeat load times (json.load of the dump, opening
+the store, and materializing every record from it) and the dedupe ratio.
+
+    python bench_parastore.py calls_raw.json
+    python bench_parastore.py calls_raw.json --json
+    python bench_parastore.py calls_raw.json --keep calls.parastore.json
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+
+from parastore import ParagraphStore, write_store
+
+
+def best_of(fn, repeat):
+    """Fastest wall time of fn over repeat runs, in milliseconds"""
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        elapsed = (time.perf_counter() - started) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def load_json(path):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def measure(input_file, store_file, repeat=5):
+    calls = load_json(input_file)
+    stats = write_store(calls, store_file)
+    if ParagraphStore(store_file).calls() != calls:
+        raise AssertionError(f"{store_file} does not round-trip {input_file}")
+    json_bytes = os.path.getsize(input_file)
+    store_bytes = os.path.getsize(store_file)
+    return {
+        "calls": len(calls),
+        **stats,
+        "json_bytes": json_bytes,
+        "store_bytes": store_bytes,
+        "size_ratio": json_bytes / store_bytes if store_bytes else 0,
+        "json_load_ms": best_of(lambda: load_json(input_file), repeat),
+        "store_open_ms": best_of(lambda: ParagraphStore(store_file), repeat),
+        "store_materialize_ms": best_of(lambda: ParagraphStore(store_file).calls(), repeat),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Paragraph store size and load-time benchmark")
+    parser.add_argument("input", help="calls_raw.json dump to convert")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--keep", help="write the store here instead of a temporary file")
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+
+    if args.keep:
+        result = measure(args.input, args.keep, args.repeat)
+    else:
+        with tempfile.TemporaryDirectory() as tmp:
+            result = measure(args.input, os.path.join(tmp, "calls.parastore.json"), args.repeat)
+
+    if args.json:
+        print(json.dumps(result, indent=2))
+        return
+    print(f"calls:               {result['calls']}")
+    print(f"paragraphs:          {result['paragraphs']} references, {result['unique_paragraphs']} unique")
+    print(f"dedupe ratio:        {result['dedupe_ratio']:.2f}x ({result['paragraph_bytes']} -> {result['unique_paragraph_bytes']} bytes of text)")
+    print(f"file size:           {result['json_bytes']} -> {result['store_bytes']} bytes ({result['size_ratio']:.2f}x smaller)")
+    print(f"json.load:           {result['json_load_ms']:.1f} ms")
+    print(f"store open (lazy):   {result['store_open_ms']:.1f} ms")
+    print(f"store materialized:  {result['store_materialize_ms']:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,1156 @@
+"""
+Selenium-based scraper for the EU Funding & Tenders portal.
+Imported lazily by the luigi tasks in extract.py; nothing browser-free should import it.
+"""
+import time
+import tempfile
+from selenium import webdriver
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.webdriver.chrome.service import Service
+from selenium.webdriver.chrome.options import Options
+from collections import OrderedDict
+import logging
+from contextlib import contextmanager
+from locators import LocatorRegistry
+from runlog import event
+from render import heading_selected, replace_raw_dates
+from pipeline import RenderStage
+from tabs import TabScheduler
+from router import PageRouter
+from archive import PageArchive
+from watchdog import DriverWatchdog
+from listing import read_listing_cards, card_basic_info, parse_listing_dates, parse_result_count
+from cdp import CDPPage, CDPError, debugger_address
+from session import PortalSession
+
+logger = logging.getLogger(__name__)
+
+# First listing page (open and forthcoming calls, newest first)
+LISTING_URL = (
+    "https://ec.europa.eu/info/funding-tenders/opportunities/portal/screen/"
+    "opportunities/calls-for-proposals?order=DESC&pageNumber=1"
+    "&pageSize=50&sortBy=startDate&isExactMatch=true"
+    "&status=31094501,31094502"
+)
+# The same listing with closed calls, for crawls of the whole archive
+ARCHIVE_LISTING_URL = LISTING_URL + ",31094503"
+
+def handle_cookie_banner(driver):
+    """Handle cookie banner - shortest version"""
+    try:
+        WebDriverWait(driver, 5).until(EC.presence_of_element_located((By.CSS_SELECTOR, "div.wt-cck--container")))
+        # Just hide it with JavaScript - fastest method
+        driver.execute_script("document.querySelector('div.wt-cck--container').style.display = 'none';")
+        logger.info("Cookie banner hidden")
+        time.sleep(1)
+    except:
+        pass  # No banner or already handled
+
+def deselect_closed_status(driver):
+    """Deselect 'Closed' filter - shortest version"""
+    try:
+        # Click filter button
+        filter_btn = WebDriverWait(driver, 10).until(
+            EC.element_to_be_clickable((By.XPATH, "//button[.//span[contains(text(),'Submission status')]]"))
+        )
+        driver.execute_script("arguments[0].click();", filter_btn)
+        time.sleep(2)
+        
+        # Find and click closed label if checked
+        closed_label = driver.find_element(By.XPATH, "//label[contains(@class, 'eui-label') and normalize-space(text())='Closed']")
+        checkbox_id = closed_label.get_attribute("for")
+        if driver.find_element(By.ID, checkbox_id).is_selected():
+            driver.execute_script("arguments[0].click();", closed_label)
+            logger.info("Deselected 'Closed' filter")
+        time.sleep(2)
+    except Exception as e:
+        logger.warning("Filter deselection failed: %s", e)
+
+# Section projection in the page: selected(heading) mirrors render.heading_selected.
+# Expects include and exclude to hold lowercased headings.
+HEADING_FILTER_SCRIPT = """
+var selected = function(title) {
+    title = title.toLowerCase();
+    var has = function(list) { return list.some(function(h) { return title.indexOf(h) !== -1; }); };
+    return !(include.length && !has(include)) && !(exclude.length && has(exclude));
+};
+"""
+
+# Clicks every visible, not yet expanded toggle under the root in one call, then
+# waits until the DOM has been quiet for quietMs (MutationObserver) instead of
+# sleeping. Repeats for toggles revealed by the previous round. Toggles inside a
+# card or section whose heading is left out by the projection are not clicked.
+EXPAND_TOGGLES_SCRIPT = HEADING_FILTER_SCRIPT + """
+var selector = arguments[0], variants = arguments[1], quietMs = arguments[2],
+    timeoutMs = arguments[3], maxRounds = arguments[4], root = arguments[5] || document,
+    containerSel = arguments[6], headingSel = arguments[7], include = arguments[8], exclude = arguments[9];
+var done = arguments[arguments.length - 1];
+var wanted = function(b) {
+    if (!include.length && !exclude.length) { return true; }
+    var box = b.closest(containerSel);
+    var heading = box && box.querySelector(headingSel);
+    return !heading || selected(heading.innerText.trim());
+};
+var target = root === document ? document.body : root;
+var counts = variants.map(function() { return 0; });
+var clicked = 0, mutations = 0, rounds = 0, start = Date.now();
+var quietTimer = null, capTimer = null, finished = false;
+var observer = new MutationObserver(function(records) {
+    mutations += records.length;
+    clearTimeout(quietTimer);
+    quietTimer = setTimeout(nextRound, quietMs);
+});
+function finish() {
+    if (finished) { return; }
+    finished = true;
+    observer.disconnect();
+    clearTimeout(quietTimer);
+    clearTimeout(capTimer);
+    done({clicked: clicked, mutations: mutations, rounds: rounds, counts: counts, waitedMs: Date.now() - start});
+}
+function clickRound() {
+    var n = 0;
+    var buttons = root.querySelectorAll(selector);
+    for (var i = 0; i < buttons.length; i++) {
+        var b = buttons[i];
+        if (b.hasAttribute('data-scraper-expanded') || b.disabled) { continue; }
+        if (b.getAttribute('aria-expanded') === 'true') { continue; }
+        if (!b.getClientRects().length || !wanted(b)) { continue; }
+        for (var j = 0; j < variants.length; j++) {
+            if (b.matches(variants[j])) { counts[j]++; }
+        }
+        b.setAttribute('data-scraper-expanded', '1');
+        b.click();
+        n++;
+    }
+    clicked += n;
+    rounds++;
+    return n;
+}
+function nextRound() {
+    if (rounds >= maxRounds || !clickRound()) { finish(); return; }
+    quietTimer = setTimeout(nextRound, quietMs);
+}
+observer.observe(target, {childList: true, subtree: true, attributes: true, characterData: true});
+capTimer = setTimeout(finish, timeoutMs);
+if (!clickRound()) { finish(); return; }
+quietTimer = setTimeout(nextRound, quietMs);
+"""
+
+# Captures the rendered detail page as a JSON-able tree (see render.py for the
+# node format) so text processing can happen outside the browser.
+# Arguments are the card, card title, card content, section and section title
+# selectors, the layout to look for ('cards', 'sections' or null to detect) and
+# the include/exclude heading lists. Cards and sections left out by the
+# projection are returned with skip set and are not serialized.
+SNAPSHOT_SCRIPT = HEADING_FILTER_SCRIPT + """
+var cardSel = arguments[0], cardTitleSel = arguments[1], contentSel = arguments[2],
+    sectionSel = arguments[3], sectionTitleSel = arguments[4], layout = arguments[5],
+    include = arguments[6], exclude = arguments[7];
+var hidden = function(el) {
+    var tag = el.tagName;
+    if (tag === 'SCRIPT' || tag === 'STYLE' || tag === 'TEMPLATE' || tag === 'NOSCRIPT') { return true; }
+    return !(el.offsetWidth || el.offsetHeight || el.getClientRects().length);
+};
+var serialize = function(el) {
+    var node = {t: el.tagName.toLowerCase(), k: []};
+    var cls = el.getAttribute('class');
+    if (cls) { node.cl = cls; }
+    if (node.t === 'a' && el.href) { node.h = el.href; }
+    for (var c = el.firstChild; c; c = c.nextSibling) {
+        if (c.nodeType === 3) { node.k.push(/\\S/.test(c.nodeValue) ? c.nodeValue : ' '); }
+        else if (c.nodeType === 1 && !hidden(c)) { node.k.push(serialize(c)); }
+    }
+    return node;
+};
+var text = function(el) { return el ? el.innerText.trim() : ''; };
+var map = function(list, fn) { return Array.prototype.map.call(list, fn); };
+var cards = layout === 'sections' ? [] : document.querySelectorAll(cardSel);
+if (cards.length) {
+    return {layout: 'cards', url: location.href, cards: map(cards, function(card) {
+        var title = text(card.querySelector(cardTitleSel));
+        if (!selected(title)) { return {title: title, content: null, skip: true}; }
+        var content = card.querySelector(contentSel);
+        return {title: title, content: content ? serialize(content) : null};
+    })};
+}
+if (layout === 'cards') { return null; }
+var sections = document.querySelectorAll(sectionSel);
+if (!sections.length) {
+    sections = map(document.querySelectorAll('section ' + sectionTitleSel), function(h) { return h.parentElement; });
+}
+if (!sections.length) { return null; }
+return {layout: 'sections', url: location.href, sections: map(sections, function(section) {
+    var title = text(section.querySelector(sectionTitleSel));
+    if (!selected(title)) { return {title: title, content: null, skip: true}; }
+    return {title: title, content: serialize(section)};
+})};
+"""
+
+def click_next_page(driver):
+    """Click next page button - shortest version, JavaScript only"""
+    try:
+        # Find next button by icon and get parent button
+        icon = WebDriverWait(driver, 10).until(
+            EC.presence_of_element_located((By.CSS_SELECTOR, "eui-icon-svg[icon='eui-caret-right'][aria-label='Go to next page']"))
+        )
+        next_btn = icon.find_element(By.XPATH, "./ancestor::button[1]")
+        
+        # Check if disabled
+        if next_btn.get_attribute("aria-disabled") == "true":
+            return False
+            
+        # Always use JavaScript click to avoid interception
+        driver.execute_script("arguments[0].click();", next_btn)
+        time.sleep(3)
+        return True
+    except:
+        return False
+
+class FundingOpportunitiesScraper:
+    """Encapsulates scraping logic with better error handling and reusability"""
+    
+    def __init__(self, headless=True, wait_time=10, expand_quiet_ms=300, expand_timeout_ms=8000,
+                 render_workers=None, tabs=1, archive_file=None, max_browser_mb=2048, recycle_every=None,
+                 backend="selenium", include_sections=None, exclude_sections=None, listing_url=None,
+                 session_file=None, include_closed=False):
+        self.headless = headless
+        self.wait_time = wait_time
+        self.driver = None
+        self.first_page_processed = False
+        # Keep the 'Closed' status filter selected instead of deselecting it in the initial setup
+        self.include_closed = include_closed
+        # First listing page; a synthetic portal (see synthetic_portal.py) can stand in for the real one
+        self.listing_url = listing_url or (ARCHIVE_LISTING_URL if include_closed else LISTING_URL)
+        # Cookies and storage of a set-up session, injected into new drivers (see session.py)
+        self.session = PortalSession(session_file)
+        self.session_restored = False
+        self.locators = LocatorRegistry()
+        self.expand_quiet_ms = expand_quiet_ms
+        self.expand_timeout_ms = expand_timeout_ms
+        self.page_expanded = False
+        # Snapshots are rendered in a process pool (None = one worker per core, 0 = inline)
+        self.render_stage = RenderStage(workers=render_workers)
+        # Number of detail tabs kept loading at once (1 = one tab per call, opened and closed)
+        self.tabs = tabs
+        self.tab_scheduler = None
+        # Detail page layout by URL pattern, so pages are not probed for cards and sections
+        self.router = PageRouter()
+        # Optional page_source archive for offline re-extraction (see replay.py)
+        self.archive = PageArchive(archive_file) if archive_file else None
+        # Restarts the browser between calls when it grows too large or slow
+        self.watchdog = DriverWatchdog(max_rss_mb=max_browser_mb, max_calls=recycle_every)
+        # "cdp" loads and snapshots detail pages over a direct DevTools websocket (see cdp.py)
+        self.backend = backend
+        self.cdp = None
+        # Driver used by the snapshot path for the current detail page (the CDP tab or None)
+        self.page = None
+        # Section projection: card/section headings to extract (empty = all) and to leave out
+        self.include_sections = [heading.lower() for heading in include_sections or []]
+        self.exclude_sections = [heading.lower() for heading in exclude_sections or []]
+    
+    def setup_driver(self):
+        """Initialize Chromium driver with options"""
+        chrome_options = Options()
+        chrome_options.binary_location = "/usr/bin/chromium-browser"  # Chromium binary locaion
+    
+        if self.headless:
+            chrome_options.add_argument("--headless")
+        chrome_options.add_argument("--no-sandbox")
+        chrome_options.add_argument("--disable-dev-shm-usage")
+        chrome_options.add_argument("--disable-gpu")
+        chrome_options.add_argument("--disable-software-rasterizer")
+        chrome_options.add_argument("--disable-extensions")
+        chrome_options.add_argument("--disable-logging")
+        chrome_options.add_argument("--window-size=1920,1080")
+
+        # A unique temporary directory for user data
+        user_data_dir = tempfile.mkdtemp()
+        chrome_options.add_argument(f"--user-data-dir={user_data_dir}")
+    
+        # Use the known chromedriver path
+        service = Service("/usr/bin/chromedriver")
+        self.driver = webdriver.Chrome(service=service, options=chrome_options)
+        # Async scripts (show more expansion) must be allowed to outlive their own cap
+        self.driver.set_script_timeout(self.expand_timeout_ms / 1000 + self.wait_time)
+        self.session_restored = self.session.apply(self.driver)
+        return self.driver
+    
+    def recycle_driver(self, reason):
+        """
+        Replace the browser between calls and restore the session setup
+        (cookie banner, status filter). Nothing positional lives in the driver:
+        detail pages are opened by URL and listing pages are re-navigated.
+        """
+        logger.warning("Restarting the browser (%s) after %s calls, %.0f MB", reason, self.watchdog.calls,
+                       self.watchdog.last_rss / 1e6, extra=event("watchdog.restart", reason=reason, calls=self.watchdog.calls))
+        self.close_cdp()
+        try:
+            self.driver.quit()
+        except Exception as e:
+            logger.warning("Error closing the old browser: %s", e)
+        self.tab_scheduler = None
+        self.page_expanded = False
+        self.first_page_processed = False
+        self.setup_driver()
+        try:
+            self.driver.get(self.listing_url)
+            self.handle_initial_page_setup()
+        except Exception as e:
+            logger.error("Error restoring session setup after restart: %s", e)
+        self.watchdog.recycled(reason)
+    
+    def check_driver(self):
+        """Recycle the browser if the watchdog says it has grown too large or slow"""
+        reason = self.watchdog.check(self.driver)
+        if reason:
+            self.recycle_driver(reason)
+    
+    def handle_initial_page_setup(self):
+        """Handle cookie banner and deselect closed filter on first page load"""
+        if not self.first_page_processed:
+            if self.session_restored and self.session_valid():
+                logger.info("Restored portal session, skipping initial page setup")
+                self.first_page_processed = True
+                return
+            logger.info("Handling initial page setup (cookies and filters)")
+            
+            # Handle cookie banner
+            handle_cookie_banner(self.driver)
+            
+            # Deselect closed status filter, unless the whole archive is crawled
+            if not self.include_closed:
+                deselect_closed_status(self.driver)
+            
+            self.first_page_processed = True
+            logger.info("Initial page setup completed")
+            try:
+                self.session.capture(self.driver)
+            except Exception as e:
+                logger.warning("Could not capture the portal session: %s", e)
+    
+    def session_valid(self):
+        """Check a restored session on the first listing page: cards load and no closed calls are listed (unless wanted)"""
+        try:
+            WebDriverWait(self.driver, self.wait_time).until(
+                EC.presence_of_element_located((By.TAG_NAME, "eui-card-header"))
+            )
+            statuses = self.driver.execute_script(
+                "return Array.prototype.map.call(document.querySelectorAll(arguments[0]), "
+                "function(el) { return el.innerText.trim(); });",
+                self.locators.locators["card_status"].query,
+            )
+        except Exception as e:
+            logger.warning("Restored session could not be validated, re-running setup: %s", e)
+            return False
+        if "Closed" in statuses and not self.include_closed:
+            logger.warning("Restored session lists closed calls, re-running setup")
+            return False
+        return True
+    
+    def open_cdp(self):
+        """Connect the CDP detail tab on first use; False if detail pages go through WebDriver"""
+        if self.backend != "cdp":
+            return False
+        if self.cdp is None:
+            try:
+                address = debugger_address(self.driver)
+                if not address:
+                    raise CDPError("the session has no debuggerAddress capability")
+                self.cdp = CDPPage(address, timeout=self.wait_time * 3, init_script=self.session.init_script())
+                logger.info("Detail pages are loaded over CDP via %s", address)
+            except Exception as e:
+                logger.warning("CDP backend unavailable, using WebDriver for detail pages: %s", e)
+                self.backend = "selenium"
+                return False
+        return True
+    
+    def close_cdp(self):
+        if self.cdp is not None:
+            self.cdp.close()
+            self.cdp = None
+    
+    def page_driver(self):
+        """What the snapshot path talks to: the CDP tab while it holds the page, else WebDriver"""
+        return self.page or self.driver
+    
+    @contextmanager
+    def cdp_context(self, url):
+        """Load url in the CDP tab (network idle) and route the snapshot path through it"""
+        self.page_expanded = False
+        self.cdp.get(url)
+        self.page = self.cdp
+        try:
+            yield
+        finally:
+            self.page = None
+            self.page_expanded = False
+    
+    @contextmanager
+    def tab_context(self, url):
+        """Context manager for handling new tabs safely"""
+        original_windows = self.driver.window_handles.copy()
+        self.page_expanded = False
+        try:
+            # Opened blank so the saved session is registered before the call page loads
+            self.driver.execute_script("window.open('about:blank', '_blank');")
+            self.driver.switch_to.window(self.driver.window_handles[-1])
+            self.session.apply_to_tab(self.driver)
+            self.driver.get(url)
+            yield
+        finally:
+            # Close any new tabs and return to original
+            current_windows = self.driver.window_handles
+            for window in current_windows:
+                if window not in original_windows:
+                    self.driver.switch_to.window(window)
+                    self.driver.close()
+            if original_windows:
+                self.driver.switch_to.window(original_windows[0])
+            self.page_expanded = False
+    
+    def safe_find_element(self, by, value, parent=None, default=""):
+        """Safely find element with default fallback"""
+        try:
+            element = (parent or self.driver).find_element(by, value)
+            return element.text.strip() if hasattr(element, 'text') else str(element)
+        except Exception as e:
+            logger.debug("Element not found: %s=%s, error: %s", by, value, e)
+            return default
+    
+    def safe_find_elements(self, by, value, parent=None):
+        """Safely find elements with empty list fallback"""
+        try:
+            return (parent or self.driver).find_elements(by, value)
+        except Exception as e:
+            logger.debug("Elements not found: %s=%s, error: %s", by, value, e)
+            return []
+    
+    def find_located(self, name, parent=None):
+        """Find the first element for a registered site locator, raising if absent"""
+        element = self.locators.find_element(self.driver, name, parent=parent)
+        if element is None:
+            raise LookupError(f"No element found for locator '{name}'")
+        return element
+    
+    def find_all_located(self, name, parent=None):
+        """Find all elements for a registered site locator"""
+        return self.locators.find_elements(self.driver, name, parent=parent)
+    
+    def safe_find_located(self, name, parent=None, default=""):
+        """Text of the first element for a registered site locator, with default fallback"""
+        element = self.locators.find_element(self.driver, name, parent=parent)
+        return element.text.strip() if element is not None else default
+    
+    def extract_card_basic_info(self, card, raw_dates=False):
+        """
+        Extract basic information from a funding card
+        With raw_dates the portal date strings are returned as *_raw fields and
+        parsed later by the render stage
+        """
+        try:
+            # Extract title and link
+            title_elem = self.find_located("card_title_link", parent=card)
+            title = title_elem.text.strip()
+            link = title_elem.get_attribute("href")
+            
+            # Extract subtitle information
+            subtitle_elem = self.find_located("card_subtitle", parent=card)
+            spans = subtitle_elem.find_elements(By.TAG_NAME, "span")
+            strongs = subtitle_elem.find_elements(By.TAG_NAME, "strong")
+            status = self.find_located("card_status", parent=card).text.strip()
+            opening = strongs[0].text.strip() if strongs else ""
+            deadline = strongs[1].text.strip() if len(strongs) > 1 else ""
+
+            info = {
+                "title": title,
+                "link": link,
+                "code": spans[0].text.strip() if spans else "",
+                "type": spans[2].text.strip() if len(spans) > 2 else "",
+                "opening_date_raw": opening,
+                "deadline_date_raw": deadline,
+                "stage": spans[-1].text.strip() if spans else "",
+                "status": status
+            }
+            return info if raw_dates else replace_raw_dates(info)
+        except Exception as e:
+            logger.error("Error extracting card basic info: %s", e)
+            return None
+    
+    def heading_selected(self, title):
+        """True if the section projection keeps the card or section with this heading"""
+        return heading_selected(title, self.include_sections, self.exclude_sections)
+    
+    def expand_page(self, root=None):
+        """
+        Click every visible 'Show more' / collapse toggle on the page in one script call
+        and wait for the DOM to settle instead of sleeping per button
+        """
+        locator = self.locators.locators["show_more"]
+        variants = locator.variants_for_lookup()
+        selectors = self.locators.locators
+        try:
+            result = self.page_driver().execute_async_script(
+                EXPAND_TOGGLES_SCRIPT,
+                locator.join(variants),
+                variants,
+                self.expand_quiet_ms,
+                self.expand_timeout_ms,
+                3,
+                root,
+                f"{selectors['detail_card'].query}, {selectors['detail_section'].query}",
+                f"{selectors['detail_card_title'].query}, {selectors['section_title'].query}",
+                self.include_sections,
+                self.exclude_sections,
+            )
+        except Exception as e:
+            logger.warning("Batched show more expansion failed, falling back to per-card clicks: %s", e)
+            return 0
+        locator.record(variants, result["counts"])
+        self.page_expanded = True
+        if result["clicked"]:
+            logger.info(
+                "Expanded %s toggles in %s rounds, DOM settled after %sms",
+                result['clicked'], result['rounds'], result['waitedMs'],
+                extra=event("detail.expand", clicked=result['clicked'], waited_ms=result['waitedMs']),
+            )
+        return result["clicked"]
+    
+    def click_show_more_buttons(self, content_div):
+        """Click all 'Show more' buttons to reveal hidden content"""
+        if self.page_expanded:
+            # expand_page already handled every toggle; clicking again would collapse them
+            return
+        try:
+            # All show more variants are merged into one query by the locator registry,
+            # so each button is returned once even if several selectors match it
+            buttons_clicked = 0
+            for button in self.find_all_located("show_more", parent=content_div):
+                try:
+                    if button.is_displayed() and button.is_enabled():
+                        self.driver.execute_script("arguments[0].click();", button)
+                        time.sleep(1)  # Brief pause between clicks
+                        buttons_clicked += 1
+                except Exception as e:
+                    logger.debug("Couldn't click show more button: %s", e)
+            
+            if buttons_clicked > 0:
+                logger.info("Clicked %s show more buttons", buttons_clicked, extra=event("detail.expand", clicked=buttons_clicked))
+                time.sleep(2)  # Wait for content to expand
+                
+        except Exception as e:
+            logger.debug("No show more buttons found: %s", e)
+    
+    def extract_text_with_links(self, element):
+        """Extract text content while preserving links with their href attributes"""
+        try:
+            # Get all text nodes and link nodes
+            content_parts = []
+            
+            # Process all child nodes
+            for child in element.find_elements(By.CSS_SELECTOR, "*"):
+                if child.tag_name.lower() == 'a':
+                    href = child.get_attribute('href')
+                    text = child.text.strip()
+                    if text and href:
+                        content_parts.append(f"[{text}]({href})")
+                    elif text:
+                        content_parts.append(text)
+                elif child.text.strip():
+                    # For non-link elements, just get the text
+                    text = child.text.strip()
+                    # Avoid duplicating text that's already captured by parent
+                    if text and text not in " ".join(content_parts):
+                        content_parts.append(text)
+            
+            # If no child elements found, get direct text
+            if not content_parts and element.text.strip():
+                content_parts.append(element.text.strip())
+            
+            return " ".join(content_parts) if content_parts else ""
+            
+        except Exception as e:
+            logger.debug("Error extracting text with links: %s", e)
+            return element.text.strip() if hasattr(element, 'text') else ""
+    
+    def extract_hierarchical_content_from_card(self, content_div):
+        """
+        Extract content from a card in hierarchical structure
+        Returns dict with heading as key and content as value
+        """
+        try:
+            # Click show more buttons first
+            self.click_show_more_buttons(content_div)
+            
+            # Look for structured content with section headers
+            section_headers = content_div.find_elements(By.CSS_SELECTOR, "eui-card-header__title-container-title ng-star-inserted")
+
+            if section_headers:
+                logger.debug("Found %s structured sections", len(section_headers))
+                return self._extract_sections_by_headers(content_div, section_headers)
+            else:
+                # Fallback: try to extract any meaningful content
+                logger.debug("No structured sections found, using fallback extraction")
+                content = self.extract_text_with_links(content_div)
+                return {"content": [content]} if content else {"content": ["No content found"]}
+                
+        except Exception as e:
+            logger.error("Error in hierarchical content extraction: %s", e)
+            return {"error": [f"Content extraction failed: {str(e)}"]}
+    
+    def _extract_sections_by_headers(self, content_div, section_headers):
+        """Extract content organized by section headers"""
+        sections = OrderedDict()
+        
+        try:
+            for i, header in enumerate(section_headers):
+                header_text = header.text.strip()
+                if not header_text:
+                    continue
+                
+                # Find the content following this header
+                content_elements = []
+                
+                # Try to find the parent container of the header
+                header_container = header.find_element(By.XPATH, "..")
+                
+                # Look for siblings or following elements
+                following_elements = header_container.find_elements(By.XPATH, "following-sibling::*")
+                
+                # Also look within the same container
+                parent_container = header_container.find_element(By.XPATH, "..")
+                all_elements = parent_container.find_elements(By.CSS_SELECTOR, "*")
+                
+                # Find elements that come after this header
+                header_index = -1
+                for idx, elem in enumerate(all_elements):
+                    if elem == header or header_text in elem.text:
+                        header_index = idx
+                        break
+                
+                if header_index >= 0:
+                    # Get next elements until we hit another header or end
+                    next_header_index = len(all_elements)
+                    for j in range(i + 1, len(section_headers)):
+                        next_header_text = section_headers[j].text.strip()
+                        for idx in range(header_index + 1, len(all_elements)):
+                            if next_header_text in all_elements[idx].text:
+                                next_header_index = idx
+                                break
+                        if next_header_index < len(all_elements):
+                            break
+                    
+                    # Extract content between headers
+                    content_list = []
+                    for idx in range(header_index + 1, next_header_index):
+                        elem = all_elements[idx]
+                        elem_text = self.extract_text_with_links(elem)
+                        
+                        if (elem_text and 
+                            len(elem_text.strip()) > 5 and 
+                            elem_text.strip() not in [h.text.strip() for h in section_headers]):
+                            
+                            # Format based on element type
+                            if elem.tag_name.lower() == 'li':
+                                content_list.append(f"• {elem_text}")
+                            elif elem.tag_name.lower() in ['p', 'div']:
+                                content_list.append(elem_text)
+                            elif elem.tag_name.lower() in ['strong', 'b']:
+                                content_list.append(f"**{elem_text}**")
+                            else:
+                                content_list.append(elem_text)
+                
+                sections[header_text] = content_list if content_list else ["No content found"]
+                
+        except Exception as e:
+            logger.error("Error extracting sections by headers: %s", e)
+            sections["extraction_error"] = [f"Error: {str(e)}"]
+        
+        return sections
+    
+    def extract_all_card_details(self):
+        """
+        Extract all cards as independent units with hierarchical content
+        Skip 'General info' and stop after 'Partner search announcements'
+        """
+        cards_data = OrderedDict()
+        
+        try:
+            # Wait for content to load
+            WebDriverWait(self.driver, self.wait_time).until(
+                EC.presence_of_all_elements_located((By.CSS_SELECTOR, "eui-card"))
+            )
+            
+            cards = self.find_all_located("detail_card")
+            logger.info("Found %s cards on detail page", len(cards), extra=event("detail.card", cards=len(cards)))
+            
+            for i, card in enumerate(cards):
+                try:
+                    # Get card title
+                    header_title = self.safe_find_located("detail_card_title", parent=card)
+                    
+                    if not header_title:
+                        logger.debug("Card %s has no header title, skipping", i+1)
+                        continue
+                    
+                    # Skip 'General info' cards
+                    if "General info" in header_title:
+                        logger.info("Skipping 'General info' card: '%s'", header_title, extra=event("detail.card", card=header_title, skipped=True))
+                        continue
+                    
+                    # Stop processing after extracting 'Partner search announcements'
+                    if "Partner search announcements" in header_title:
+                        if not self.heading_selected(header_title):
+                            logger.info("Stopping at unselected final card: '%s'", header_title, extra=event("detail.card", card=header_title, skipped=True))
+                            break
+                        logger.info("Processing final card: '%s'", header_title, extra=event("detail.card", card=header_title))
+                        
+                        # Extract this card's content
+                        try:
+                            content_div = self.find_located("detail_card_content", parent=card)
+                            card_content = self.extract_hierarchical_content_from_card(content_div)
+                            cards_data.update(card_content)  # Add sections as independent units
+                        except Exception as e:
+                            logger.error("Error extracting Partner search announcements: %s", e)
+                            cards_data["Partner search announcements"] = [f"Extraction error: {str(e)}"]
+                        
+                        logger.info("Stopping extraction after 'Partner search announcements'", extra=event("detail.card"))
+                        break
+                    
+                    # Section projection: skip before show more expansion and text extraction
+                    if not self.heading_selected(header_title):
+                        logger.debug("Card not selected, skipping: '%s'", header_title)
+                        continue
+                    
+                    logger.info("Processing card: '%s'", header_title, extra=event("detail.card", card=header_title))
+                    
+                    # Get card content
+                    try:
+                        content_div = self.find_located("detail_card_content", parent=card)
+                    except:
+                        logger.debug("No content div found for card: '%s'", header_title)
+                        cards_data[header_title] = ["No content available"]
+                        continue
+                    
+                    # Extract hierarchical content
+                    card_content = self.extract_hierarchical_content_from_card(content_div)
+                    
+                    # Add each section as an independent unit
+                    if isinstance(card_content, dict):
+                        for section_title, section_content in card_content.items():
+                            # Create a unique key combining card title and section title
+                            if section_title in ["content", "error"]:
+                                key = header_title
+                            else:
+                                key = section_title
+                            cards_data[key] = section_content
+                    else:
+                        cards_data[header_title] = card_content if card_content else ["No content extracted"]
+                    
+                    logger.info("Successfully extracted content for: '%s'", header_title, extra=event("detail.card", card=header_title, done=True))
+                    
+                except Exception as e:
+                    logger.error("Error processing card %s: %s", i+1, e)
+                    continue
+        
+        except Exception as e:
+            logger.error("Error in extract_all_card_details: %s", e)
+        
+        return cards_data
+    
+    def extract_page_sections(self):
+        """
+        Extract content from page sections (non-card elements)
+        Handles pages with section-based layout instead of cards
+        """
+        sections_data = OrderedDict()
+        
+        try:
+            # Wait for content to load
+            WebDriverWait(self.driver, self.wait_time).until(
+                EC.presence_of_element_located((By.TAG_NAME, "section"))
+            )
+            
+            # Look for sections with IDs like scroll-gi, scroll-sep, etc.
+            sections = self.find_all_located("detail_section")
+            
+            if not sections:
+                # Fallback: look for any sections with h2 headers
+                sections = self.driver.find_elements(By.CSS_SELECTOR, "section h2")
+                if sections:
+                    sections = [header.find_element(By.XPATH, "..") for header in sections]
+            
+            logger.info("Found %s sections on page", len(sections), extra=event("detail.section", sections=len(sections)))
+            
+            for section in sections:
+                try:
+                    # Get section title from h2
+                    title_elem = self.find_located("section_title", parent=section)
+                    section_title = title_elem.text.strip()
+                    
+                    if not section_title or not self.heading_selected(section_title):
+                        continue
+                    
+                    logger.info("Processing section: '%s'", section_title, extra=event("detail.section", section=section_title))
+                    
+                    # Click any show more buttons in this section
+                    self.click_show_more_buttons(section)
+                    
+                    # Extract content from this section
+                    content_list = []
+                    
+                    # Look for structured content (tables, lists, divs with data)
+                    content_elements = self.find_all_located("section_content", parent=section)
+                    
+                    for elem in content_elements:
+                        elem_text = self.extract_text_with_links(elem)
+                        
+                        if elem_text and len(elem_text.strip()) > 3:
+                            # Format based on element structure
+                            if elem.find_elements(By.CSS_SELECTOR, "strong"):
+                                # This is likely a label-value pair
+                                labels = elem.find_elements(By.CSS_SELECTOR, "strong")
+                                for label in labels:
+                                    label_text = label.text.strip()
+                                    # Find the value after the label
+                                    parent = label.find_element(By.XPATH, "../..")
+                                    value_text = parent.text.replace(label_text, "").strip()
+                                    if value_text:
+                                        content_list.append(f"**{label_text}**: {value_text}")
+                            elif elem.tag_name.lower() == 'li':
+                                content_list.append(f"• {elem_text}")
+                            elif elem.tag_name.lower() in ['ol', 'ul']:
+                                # Process list items
+                                list_items = elem.find_elements(By.TAG_NAME, "li")
+                                for li in list_items:
+                                    li_text = self.extract_text_with_links(li)
+                                    if li_text:
+                                        content_list.append(f"• {li_text}")
+                            else:
+                                content_list.append(elem_text)
+                    
+                    sections_data[section_title] = content_list if content_list else ["No content found"]
+                    logger.info("Successfully extracted content for section: '%s'", section_title, extra=event("detail.section", section=section_title, done=True))
+                    
+                except Exception as e:
+                    logger.error("Error processing section: %s", e)
+                    continue
+                    
+        except Exception as e:
+            logger.error("Error in extract_page_sections: %s", e)
+            sections_data["extraction_error"] = [f"Error: {str(e)}"]
+        
+        return sections_data
+    
+    def detect_page_type(self):
+        """
+        Detect whether the page contains cards or sections
+        Returns 'cards' or 'sections'
+        """
+        try:
+            # Check for cards first
+            cards = self.find_all_located("detail_card")
+            if cards:
+                logger.info("Detected card-based page with %s cards", len(cards), extra=event("detail.page", layout="cards", count=len(cards)))
+                return 'cards'
+            
+            # Check for sections
+            sections = self.find_all_located("detail_section_any")
+            if sections:
+                logger.info("Detected section-based page with %s sections", len(sections), extra=event("detail.page", layout="sections", count=len(sections)))
+                return 'sections'
+            
+            logger.warning("Could not detect page type, defaulting to cards")
+            return 'cards'
+            
+        except Exception as e:
+            logger.error("Error detecting page type: %s", e)
+            return 'cards'
+    
+    def capture_snapshot(self, url=None):
+        """
+        Capture the current detail page as a DOM snapshot in one script call,
+        waiting only for the layout the router expects for url. Pages of an
+        unknown pattern, or where the routed layout finds nothing, wait for
+        cards or sections and teach the router. Returns None on failure.
+        """
+        selectors = self.locators.locators
+        args = (
+            selectors["detail_card"].query,
+            selectors["detail_card_title"].query,
+            selectors["detail_card_content"].query,
+            selectors["detail_section"].query,
+            selectors["section_title"].query,
+        )
+        projection = (self.include_sections, self.exclude_sections)
+        layout = self.router.route(url) if url else None
+        if layout:
+            try:
+                snapshot = WebDriverWait(self.page_driver(), self.wait_time).until(
+                    lambda driver: driver.execute_script(SNAPSHOT_SCRIPT, *args, layout, *projection)
+                )
+                self.router.hit(url)
+                return snapshot
+            except Exception as e:
+                logger.debug("Routed %s snapshot failed: %s", layout, e)
+                self.router.miss(url)
+        try:
+            # After a routed miss the page has had its full wait, so detect once without waiting again
+            snapshot = WebDriverWait(self.page_driver(), 0 if layout else self.wait_time).until(
+                lambda driver: driver.execute_script(SNAPSHOT_SCRIPT, *args, None, *projection)
+            )
+            if url:
+                self.router.learn(url, snapshot["layout"])
+            return snapshot
+        except Exception as e:
+            logger.warning("Snapshot capture failed, extracting from the live DOM: %s", e)
+            return None
+    
+    def extract_detail_live(self, url=None):
+        """Extract the routed (or detected) page layout element by element from the live DOM"""
+        page_type = (self.router.route(url) if url else None) or self.detect_page_type()
+        if page_type == 'cards':
+            return self.extract_all_card_details()
+        return self.extract_page_sections()
+    
+    def scrape_section_only_page(self, url):
+        """
+        Scrape pages that don't have card listings, only sections
+        """
+        self.driver.get(url)
+        
+        try:
+            WebDriverWait(self.driver, self.wait_time).until(
+                EC.presence_of_element_located((By.TAG_NAME, "section"))
+            )
+        except Exception as e:
+            logger.error("Error waiting for page to load: %s", e)
+            return {}
+        
+        # Extract page title if available
+        title = self.safe_find_element(By.CSS_SELECTOR, "h1, title")
+        
+        # Extract all sections
+        detailed_sections = self.extract_page_sections()
+        
+        return {
+            "title": title,
+            "link": url,
+            "type": "section-based",
+            **detailed_sections
+        }
+    
+    def navigate_to_page(self, page_number):
+        """
+        Navigate to a specific page using continuous navigation approach
+        Builds up from page 1 by clicking next repeatedly
+        """
+        # Start from base URL (page 1)
+        self.driver.get(self.listing_url)
+        
+        # Handle initial setup only on first page load
+        self.handle_initial_page_setup()
+        
+        # Wait for page to load completely
+        try:
+            WebDriverWait(self.driver, self.wait_time).until(
+                EC.presence_of_element_located((By.TAG_NAME, "eui-card-header"))
+            )
+        except Exception as e:
+            logger.error("Error waiting for page 1 to load: %s", e)
+            raise
+        
+        # If we need page 1, we're already there
+        if page_number == 1:
+            logger.info("Already on page 1")
+            return True
+        
+        # Navigate to target page by clicking next
+        current_page = 1
+        while current_page < page_number:
+            logger.info("Navigating from page %s to page %s", current_page, current_page + 1, extra=event("listing.navigate", page=current_page + 1))
+            
+            if not click_next_page(self.driver):
+                logger.error("Could not navigate to page %s, reached end of results", current_page + 1)
+                return False
+            
+            # Wait for new page to load
+            try:
+                WebDriverWait(self.driver, self.wait_time).until(
+                    EC.presence_of_element_located((By.TAG_NAME, "eui-card-header"))
+                )
+            except Exception as e:
+                logger.error("Error waiting for page %s to load: %s", current_page + 1, e)
+                return False
+            
+            current_page += 1
+        
+        logger.info("Successfully navigated to page %s", page_number)
+        return True
+    
+    def extract_detail(self, key, basic_info, page_number=None):
+        """
+        Extract the detail page open in the current tab and hand it to the render stage.
+        key orders the call among the results of its listing page.
+        """
+        self.page_expanded = False
+        self.expand_page()
+        if self.archive is not None:
+            try:
+                self.archive.put(basic_info, self.page_driver().page_source, position=(page_number, key))
+            except Exception as e:
+                logger.error("Error archiving %s: %s", basic_info['link'], e)
+        # Capture the rendered detail page; text processing happens in the render stage
+        snapshot = self.capture_snapshot(basic_info['link'])
+        # Results are ordered by listing position, also when one batch spans several pages
+        position = (page_number or 0, key)
+        if snapshot is not None:
+            self.render_stage.submit(basic_info, snapshot, key=position)
+        else:
+            # Merge basic info with detailed sections at the same level
+            if self.page is not None:
+                # Element-by-element extraction needs WebDriver elements, so reload the page there
+                with self.tab_context(basic_info['link']):
+                    time.sleep(3)  # Allow page to load
+                    detailed_sections = self.extract_detail_live(basic_info['link'])
+            else:
+                detailed_sections = self.extract_detail_live(basic_info['link'])
+            self.render_stage.add_rendered({**basic_info, **detailed_sections}, key=position)
+        logger.info("Successfully processed: %s", basic_info['title'], extra=event("call.done", code=basic_info['code']))
+        return True
+    
+    def result_count(self):
+        """Total number of results shown on the listing page, or None if the count is not on the page"""
+        return parse_result_count(self.safe_find_located("listing_result_count"))
+    
+    def list_page(self, page_number, start_index=0, end_index=None):
+        """
+        Navigate to a listing page and read its cards
+        Returns (entries, total_cards) where entries are (1-based index, basic_info) pairs
+        limited to the start_index:end_index range (0-based)
+        """
+        # Navigate to the target page
+        if not self.navigate_to_page(page_number):
+            logger.error("Failed to navigate to page %s", page_number)
+            return [], 0
+        
+        # Read every card on the page in one script call
+        try:
+            cards = read_listing_cards(self.driver, self.locators)
+            bulk = True
+        except Exception as e:
+            logger.warning("Bulk listing extraction failed, reading cards one by one: %s", e)
+            cards = self.find_all_located("listing_card_header")
+            bulk = False
+        
+        if not cards:
+            logger.info("No cards found on this page")
+            return [], 0
+        
+        # Apply range filtering
+        if end_index is None:
+            end_index = len(cards)
+        
+        # Ensure indices are within bounds
+        start_index = max(0, start_index)
+        end_index = min(len(cards), end_index)
+        
+        if start_index >= end_index:
+            logger.info("Invalid range: start_index=%s, end_index=%s", start_index, end_index)
+            return [], len(cards)
+        
+        selected_cards = cards[start_index:end_index]
+        logger.info("Processing cards %s-%s out of %s total cards on page %s", start_index+1, end_index, len(cards), page_number)
+        
+        # Read all listing cards up front: their elements cannot be used once
+        # the driver has switched to a detail tab
+        entries = []
+        for i, card in enumerate(selected_cards):
+            basic_info = card_basic_info(card) if bulk else self.extract_card_basic_info(card, raw_dates=True)
+            if basic_info:
+                entries.append((start_index + i + 1, basic_info))  # 1-based for logging
+            elif bulk:
+                logger.error("Error extracting card basic info: card %s has no title, subtitle or status", start_index + i + 1)
+        # Parse the page's dates in one pass
+        parse_listing_dates([basic_info for _, basic_info in entries])
+        return entries, len(cards)
+    
+    def scrape_details(self, entries, page_number=None, total=None):
+        """
+        Open and extract the detail page of each (index, basic_info) entry; returns rendered calls.
+        Entries may also be (index, basic_info, page) when they come from different listing pages.
+        """
+        total = total or len(entries)
+        entries = [(entry[0], entry[1], entry[2] if len(entry) > 2 else page_number) for entry in entries]
+        use_cdp = self.open_cdp()
+        if self.tabs > 1 and not use_cdp:
+            # Keep several detail tabs loading while the ready one is extracted; batches
+            # give the watchdog a point between calls where the browser can be restarted
+            batch_size = self.tabs * self.watchdog.check_every
+            for start in range(0, len(entries), batch_size):
+                batch = entries[start:start + batch_size]
+                if self.tab_scheduler is None:
+                    self.tab_scheduler = TabScheduler(self.driver, size=self.tabs, timeout=self.wait_time * 3,
+                                                      on_new_tab=self.session.apply_to_tab)
+                for entry in batch:
+                    logger.info("Queueing card %s/%s: %s", entry[0], total, entry[1]['title'],
+                                extra=event("call.start", page=entry[2], index=entry[0], code=entry[1]['code']))
+                started = time.monotonic()
+                done = self.tab_scheduler.run(
+                    batch,
+                    lambda entry: entry[1]['link'],
+                    lambda entry: self.extract_detail(*entry),
+                )
+                for (actual_index, basic_info, _), ok in done:
+                    if not ok:
+                        logger.error("Error processing card %s: %s", actual_index, basic_info['title'])
+                elapsed = time.monotonic() - started
+                for _ in batch:
+                    self.watchdog.record(elapsed / len(batch))
+                self.check_driver()
+        else:
+            for actual_index, basic_info, page in entries:
+                started = time.monotonic()
+                try:
+                    logger.info("Processing card %s/%s: %s", actual_index, total, basic_info['title'],
+                                extra=event("call.start", page=page, index=actual_index, code=basic_info['code']))
+                    if use_cdp:
+                        # Readiness comes from the load event and network idle instead of a fixed sleep
+                        with self.cdp_context(basic_info['link']):
+                            self.extract_detail(actual_index, basic_info, page)
+                    else:
+                        with self.tab_context(basic_info['link']):
+                            time.sleep(3)  # Allow page to load
+                            self.extract_detail(actual_index, basic_info, page)
+                except Exception as e:
+                    logger.error("Error processing card %s: %s", actual_index, e)
+                self.watchdog.record(time.monotonic() - started)
+                self.check_driver()
+        
+        return self.render_stage.drain()
+    
+    def scrape_page(self, page_number, page_size=50, start_index=0, end_index=None):
+        """
+        Scrape a single page of funding opportunities with option to limit to specific range
+        start_index and end_index allow processing only specific cards (0-based indexing)
+        Uses navigation approach instead of direct URL construction
+        """
+        entries, total = self.list_page(page_number, start_index, end_index)
+        if not entries:
+            return []
+        return self.scrape_details(entries, page_number, total)
+    
+    def cleanup(self):
+        """Clean up resources"""
+        self.close_cdp()
+        if self.driver:
+            self.driver.quit()
+        self.tab_scheduler = None
+        self.render_stage.close()
+        self.watchdog.log_report()
+        if self.archive is not None:
+            self.archive.log_report()
+            self.archive.close()
+            self.archive = None
@@ -0,0 +1,282 @@
+"""
+Direct Chrome DevTools Protocol backend for detail pages.
+
+CDPPage drives one Chromium tab over a single DevTools websocket, skipping the
+Python -> HTTP -> chromedriver hop of every Selenium command. It offers the
+subset of the WebDriver API the snapshot path uses (get, execute_script,
+execute_async_script, page_source, current_url), so the in-page scripts run
+unchanged, and adds network-idle readiness and request blocking.
+
+The tab lives in the browser chromedriver started: its DevTools endpoint is
+read from the session's goog:chromeOptions.debuggerAddress capability.
+"""
+import base64
+import json
+import logging
+import os
+import socket
+import struct
+import time
+from urllib.parse import urlparse
+from urllib.request import Request, urlopen
+
+logger = logging.getLogger(__name__)
+
+# Resources the extraction never needs; blocking them makes pages reach network idle sooner
+DEFAULT_BLOCKED_URLS = [
+    "*.png", "*.jpg", "*.jpeg", "*.gif", "*.svg", "*.webp", "*.ico",
+    "*.woff", "*.woff2", "*.ttf",
+    "*google-analytics.com*", "*googletagmanager.com*", "*europa.eu/wel/*", "*piwik*", "*matomo*",
+]
+
+
+class CDPError(Exception):
+    """A DevTools command failed or the page threw"""
+
+
+class _WebSocket:
+    """Minimal RFC 6455 client: text frames, fragmentation, ping/pong, close"""
+
+    def __init__(self, url, timeout=30):
+        parsed = urlparse(url)
+        self.sock = socket.create_connection((parsed.hostname, parsed.port or 80), timeout=timeout)
+        key = base64.b64encode(os.urandom(16)).decode()
+        path = parsed.path + (f"?{parsed.query}" if parsed.query else "")
+        self.sock.sendall((
+            f"GET {path} HTTP/1.1\r\nHost: {parsed.netloc}\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+            f"Sec-WebSocket-Key: {key}\r\nSec-WebSocket-Version: 13\r\n\r\n"
+        ).encode())
+        self.buffer = b""
+        self.message = b""
+        response = self._read_until(b"\r\n\r\n")
+        if b" 101 " not in response.split(b"\r\n", 1)[0]:
+            raise CDPError(f"DevTools websocket handshake failed: {response[:200]!r}")
+
+    def _read_until(self, marker):
+        while marker not in self.buffer:
+            chunk = self.sock.recv(65536)
+            if not chunk:
+                raise ConnectionError("DevTools websocket closed")
+            self.buffer += chunk
+        data, _, self.buffer = self.buffer.partition(marker)
+        return data + marker
+
+    def _parse_frame(self):
+        """(fin, opcode, payload) of the first complete frame in the buffer, or None"""
+        if len(self.buffer) < 2:
+            return None
+        first, second = self.buffer[0], self.buffer[1]
+        length, offset = second & 0x7F, 2
+        if length == 126:
+            if len(self.buffer) < 4:
+                return None
+            length, = struct.unpack("!H", self.buffer[2:4])
+            offset = 4
+        elif length == 127:
+            if len(self.buffer) < 10:
+                return None
+            length, = struct.unpack("!Q", self.buffer[2:10])
+            offset = 10
+        if len(self.buffer) < offset + length:
+            return None
+        payload = self.buffer[offset:offset + length]
+        self.buffer = self.buffer[offset + length:]
+        return bool(first & 0x80), first & 0x0F, payload
+
+    def _send_frame(self, opcode, payload):
+        header = bytes([0x80 | opcode])
+        length = len(payload)
+        if length < 126:
+            header += bytes([0x80 | length])
+        elif length < 65536:
+            header += bytes([0x80 | 126]) + struct.pack("!H", length)
+        else:
+            header += bytes([0x80 | 127]) + struct.pack("!Q", length)
+        # Client frames must be masked
+        mask = os.urandom(4)
+        masked = bytes(b ^ mask[i % 4] for i, b in enumerate(payload))
+        self.sock.sendall(header + mask + masked)
+
+    def send(self, text):
+        self._send_frame(0x1, text.encode("utf-8"))
+
+    def recv(self, timeout=None):
+        """Next text message; socket.timeout if none arrives in time (partial frames stay buffered)"""
+        self.sock.settimeout(timeout)
+        while True:
+            frame = self._parse_frame()
+            if frame is None:
+                chunk = self.sock.recv(65536)
+                if not chunk:
+                    raise ConnectionError("DevTools websocket closed")
+                self.buffer += chunk
+                continue
+            fin, opcode, payload = frame
+            if opcode == 0x9:
+                self._send_frame(0xA, payload)
+            elif opcode == 0x8:
+                raise ConnectionError("DevTools websocket closed by the browser")
+            elif opcode in (0x0, 0x1, 0x2):
+                self.message += payload
+                if fin:
+                    message, self.message = self.message, b""
+                    return message.decode("utf-8")
+
+    def close(self):
+        try:
+            self._send_frame(0x8, b"")
+        except OSError:
+            pass
+        self.sock.close()
+
+
+class CDPConnection:
+    """Request/response and event dispatch over one DevTools websocket"""
+
+    def __init__(self, ws_url, timeout=30):
+        self.ws = _WebSocket(ws_url, timeout=timeout)
+        self.timeout = timeout
+        self.next_id = 0
+        self.handlers = {}
+        self.commands = 0
+
+    def on(self, method, handler):
+        self.handlers.setdefault(method, []).append(handler)
+
+    def _dispatch(self, message):
+        for handler in self.handlers.get(message.get("method"), ()):
+            handler(message.get("params", {}))
+
+    def send(self, method, params=None, timeout=None):
+        """Run a DevTools command and return its result, dispatching events that arrive meanwhile"""
+        self.next_id += 1
+        command_id = self.next_id
+        self.commands += 1
+        self.ws.send(json.dumps({"id": command_id, "method": method, "params": params or {}}))
+        deadline = time.monotonic() + (timeout or self.timeout)
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise CDPError(f"{method} timed out")
+            message = json.loads(self.ws.recv(remaining))
+            if message.get("id") == command_id:
+                if "error" in message:
+                    raise CDPError(f"{method}: {message['error'].get('message')}")
+                return message.get("result", {})
+            self._dispatch(message)
+
+    def wait(self, condition, timeout):
+        """Dispatch events until condition() is true; False on timeout"""
+        deadline = time.monotonic() + timeout
+        while not condition():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            try:
+                # Wake up regularly so time-based conditions (idle windows) are re-checked
+                self._dispatch(json.loads(self.ws.recv(min(remaining, 0.1))))
+            except socket.timeout:
+                continue
+        return True
+
+    def close(self):
+        self.ws.close()
+
+
+class CDPPage:
+    """A Chromium tab driven over CDP, with the WebDriver methods the snapshot path needs"""
+
+    def __init__(self, debugger_address, blocked_urls=None, idle_ms=500, idle_timeout=5, timeout=30, init_script=None):
+        self.endpoint = f"http://{debugger_address}"
+        self.idle_ms = idle_ms
+        # Pages with long-polling requests never go fully idle, so the idle wait is capped separately
+        self.idle_timeout = idle_timeout
+        self.timeout = timeout
+        # PUT is required by recent Chromium for /json/new
+        with urlopen(Request(f"{self.endpoint}/json/new?about:blank", method="PUT"), timeout=timeout) as response:
+            target = json.load(response)
+        self.target_id = target["id"]
+        self.conn = CDPConnection(target["webSocketDebuggerUrl"], timeout=timeout)
+        self.inflight = set()
+        self.last_activity = time.monotonic()
+        self.loaded = False
+        self.conn.on("Network.requestWillBeSent", self._request_started)
+        self.conn.on("Network.loadingFinished", self._request_done)
+        self.conn.on("Network.loadingFailed", self._request_done)
+        self.conn.on("Page.loadEventFired", self._load_fired)
+        self.conn.send("Page.enable")
+        self.conn.send("Network.enable")
+        self.conn.send("Network.setBlockedURLs", {"urls": DEFAULT_BLOCKED_URLS if blocked_urls is None else blocked_urls})
+        # Start-of-document scripts are per target, so the driver's do not apply to this tab
+        if init_script:
+            self.conn.send("Page.addScriptToEvaluateOnNewDocument", {"source": init_script})
+
+    def _request_started(self, params):
+        self.inflight.add(params["requestId"])
+        self.last_activity = time.monotonic()
+
+    def _request_done(self, params):
+        self.inflight.discard(params["requestId"])
+        self.last_activity = time.monotonic()
+
+    def _load_fired(self, params):
+        self.loaded = True
+
+    def network_idle(self):
+        """Loaded, with no request in flight for idle_ms"""
+        return self.loaded and not self.inflight and (time.monotonic() - self.last_activity) * 1000 >= self.idle_ms
+
+    def get(self, url):
+        """Navigate and wait for the load event plus network idle"""
+        self.inflight.clear()
+        self.loaded = False
+        result = self.conn.send("Page.navigate", {"url": url})
+        if result.get("errorText"):
+            raise CDPError(f"Navigation to {url} failed: {result['errorText']}")
+        if not self.conn.wait(lambda: self.loaded, self.timeout):
+            raise CDPError(f"{url} did not finish loading within {self.timeout}s")
+        if not self.conn.wait(self.network_idle, self.idle_timeout):
+            logger.debug("No network idle within %ss on %s (%s requests in flight)", self.idle_timeout, url, len(self.inflight))
+
+    def _evaluate(self, expression, await_promise=False, timeout=None):
+        result = self.conn.send("Runtime.evaluate", {
+            "expression": expression,
+            "returnByValue": True,
+            "awaitPromise": await_promise,
+        }, timeout=timeout)
+        if "exceptionDetails" in result:
+            details = result["exceptionDetails"]
+            raise CDPError(details.get("exception", {}).get("description") or details.get("text"))
+        return result.get("result", {}).get("value")
+
+    def execute_script(self, script, *args):
+        """Run a WebDriver-style script body with JSON-able arguments and return its value"""
+        return self._evaluate(f"(function() {{\n{script}\n}}).apply(null, {json.dumps(args)})")
+
+    def execute_async_script(self, script, *args):
+        """Run a WebDriver-style async script; it reports back through its last argument"""
+        return self._evaluate(
+            f"new Promise(function(resolve) {{ (function() {{\n{script}\n}}).apply(null, {json.dumps(args)}.concat([resolve])); }})",
+            await_promise=True,
+            timeout=self.timeout * 2,
+        )
+
+    @property
+    def page_source(self):
+        return self._evaluate("document.documentElement.outerHTML")
+
+    @property
+    def current_url(self):
+        return self._evaluate("location.href")
+
+    def close(self):
+        try:
+            self.conn.close()
+            urlopen(f"{self.endpoint}/json/close/{self.target_id}", timeout=self.timeout).close()
+        except Exception as e:
+            logger.debug("Could not close CDP tab %s: %s", self.target_id, e)
+
+
+def debugger_address(driver):
+    """DevTools host:port of the browser behind a chromedriver session"""
+    return driver.capabilities.get("goog:chromeOptions", {}).get("debuggerAddress")
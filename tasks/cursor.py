@@ -0,0 +1,142 @@
+"""
+Shift-tolerant pagination over the startDate-sorted listing.
+
+A crawl takes hours. A call published mid-run pushes every later card one
+position down, so the next page repeats the previous page's last card and
+the new call (near the top) is never read. A call dropping out of the
+listing pulls every later card one position up, so a card slips from the
+next page onto the page already read. ListingCursor de-duplicates cards by
+call code as pages arrive and notices both shifts: leading cards already
+seen on the previous page (insertions) and a change in the portal's result
+count (insertions or removals). It then re-fetches only the boundary pages
+that can hold the missed cards, instead of requiring a full rerun.
+
+    cursor = ListingCursor(scraper.list_page, page_size=50, result_count=scraper.result_count)
+    for page_num, entries, total in cursor:
+        ...
+"""
+import logging
+
+from runlog import event
+
+logger = logging.getLogger(__name__)
+
+
+def call_key(basic_info):
+    """Identity of a listed call: its code, or its link for cards without one"""
+    return basic_info.get("code") or basic_info["link"]
+
+
+class ListingCursor:
+    """
+    Iterates (page_num, entries, total) over listing pages with entries
+    de-duplicated by call code. list_page(page_num) returns (entries, total)
+    like FundingOpportunitiesScraper.list_page; result_count(), if given,
+    returns the listing's total number of results (or None) for the page
+    just loaded. Entries recovered from a re-fetched boundary page are
+    yielded with that page's number.
+    """
+
+    def __init__(self, list_page, page_size=50, max_pages=None, result_count=None):
+        self.list_page = list_page
+        self.page_size = page_size
+        self.max_pages = max_pages
+        self.result_count = result_count
+        self.seen = set()
+        # Keys of each page as read, to recognise cards pushed onto the next page
+        self.page_keys = {}
+        self.count = None
+        self.duplicates = 0
+        self.recovered = 0
+        self.refetches = 0
+        self.shifts = 0
+
+    def _read(self, page_num):
+        entries, total = self.list_page(page_num)
+        count = None
+        if self.result_count is not None:
+            try:
+                count = self.result_count()
+            except Exception as e:
+                logger.debug("Could not read the result count: %s", e)
+        return entries, total, count
+
+    def _accept(self, page_num, entries):
+        """Entries not seen before; records the page's keys"""
+        fresh = []
+        for index, basic_info in entries:
+            key = call_key(basic_info)
+            if key in self.seen:
+                self.duplicates += 1
+                continue
+            self.seen.add(key)
+            fresh.append((index, basic_info))
+        self.page_keys[page_num] = [call_key(basic_info) for _, basic_info in entries]
+        return fresh
+
+    def _overlap(self, page_num, entries):
+        """Number of leading cards of this page that were read on the previous page"""
+        previous = set(self.page_keys.get(page_num - 1, ()))
+        overlap = 0
+        for _, basic_info in entries:
+            if call_key(basic_info) not in previous:
+                break
+            overlap += 1
+        return overlap
+
+    def _refetch(self, pages, missing=None):
+        """Re-read boundary pages, yielding unseen entries, until `missing` cards are recovered"""
+        found = 0
+        for page_num in pages:
+            if missing is not None and found >= missing:
+                break
+            self.refetches += 1
+            entries, total, _ = self._read(page_num)
+            fresh = self._accept(page_num, entries)
+            found += len(fresh)
+            self.recovered += len(fresh)
+            logger.info("Re-fetched boundary page %s: recovered %s missed calls", page_num, len(fresh),
+                        extra=event("listing.refetch", page=page_num, recovered=len(fresh)))
+            if fresh:
+                yield page_num, fresh, total
+
+    def __iter__(self):
+        page_num = 1
+        max_pages = self.max_pages or float("inf")
+        while page_num <= max_pages:
+            logger.info("Listing page %s", page_num)
+            entries, total, count = self._read(page_num)
+            if not entries:
+                logger.info("No more results found on page %s, stopping pagination", page_num)
+                return
+            overlap = self._overlap(page_num, entries)
+            fresh = self._accept(page_num, entries)
+            yield page_num, fresh, total
+
+            delta = count - self.count if count is not None and self.count is not None else 0
+            if count is not None:
+                self.count = count
+            inserted = max(overlap, delta)
+            if inserted > 0 and page_num > 1:
+                # New calls were published above this page; sorted by startDate they sit near the top
+                self.shifts += 1
+                logger.warning("Listing shifted down by %s before page %s, re-reading earlier pages", inserted, page_num,
+                               extra=event("listing.shift", page=page_num, inserted=inserted))
+                yield from self._refetch(range(1, page_num), missing=inserted)
+            elif delta < 0 and page_num > 1:
+                # Calls left the listing; the cards that moved up landed on the previous page
+                self.shifts += 1
+                logger.warning("Listing shifted up by %s before page %s, re-reading page %s", -delta, page_num, page_num - 1,
+                               extra=event("listing.shift", page=page_num, removed=-delta))
+                yield from self._refetch([page_num - 1])
+
+            if total < self.page_size:
+                logger.info("Page %s returned fewer items than page_size (%s < %s), likely the last page", page_num, total, self.page_size)
+                return
+            page_num += 1
+
+    def log_report(self):
+        logger.info("Listing cursor: %s calls, %s duplicates dropped, %s shifts, %s pages re-fetched, %s calls recovered",
+                    len(self.seen), self.duplicates, self.shifts, self.refetches, self.recovered,
+                    extra=event("listing.cursor", calls=len(self.seen), duplicates=self.duplicates,
+                                shifts=self.shifts, refetches=self.refetches, recovered=self.recovered))
@@ -0,0 +1,332 @@
+"""
+Resident service mode: warm browsers, scheduled incremental refreshes and a
+local query API over the current dataset.
+
+A background thread keeps one FundingOpportunitiesScraper (browser, cookie
+banner and filters already set up) and refreshes on a schedule with the
+incremental cycle of state.crawl_by_priority: only calls that are new since
+the last cycle get their detail pages scraped, status changes of known calls
+come from the listing, and every full_sweep_every cycles a complete listing
+sweep closes calls that are no longer listed. Each refresh publishes an immutable Dataset
+that the HTTP server reads without locks, so reads never wait for scraping.
+
+    python daemon.py --serve 127.0.0.1:8780 --interval 3600 --output calls_raw.json
+
+    GET /calls?status=Open&deadline_before=2026-12-31   filtered calls (JSON array)
+    GET /calls/<code>                                   one call by code
+    GET /status                                         refresh bookkeeping
+"""
+import argparse
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlparse
+
+from runlog import configure_logging, event
+from state import CrawlState, crawl_by_priority, merge_calls, save_calls
+
+logger = logging.getLogger(__name__)
+
+# Query parameters of /calls, each a predicate on (call, value). Statuses match
+# as prefixes, so status=Open finds the portal's "Open For Submission"
+FILTERS = {
+    "status": lambda call, value: (call.get("status") or "").lower().startswith(
+        tuple(status for status in value.lower().split(",") if status)),
+    "code": lambda call, value: call.get("code") in value.split(","),
+    "deadline_before": lambda call, value: bool(call.get("deadline_date")) and call["deadline_date"] <= value,
+    "deadline_after": lambda call, value: bool(call.get("deadline_date")) and call["deadline_date"] >= value,
+}
+
+
+class Dataset:
+    """
+    Immutable, pre-encoded view of the calls. Every call is serialized once when
+    the dataset is built, so a query only filters dicts and joins bytes.
+    """
+
+    def __init__(self, calls, refreshed=None):
+        self.calls = calls
+        self.refreshed = refreshed
+        self.encoded = [json.dumps(call, ensure_ascii=False).encode("utf-8") for call in calls]
+        self.body = self._join(self.encoded)
+        self.version = hashlib.sha1(self.body).hexdigest()[:16]
+        self.by_code = {call.get("code"): i for i, call in enumerate(calls) if call.get("code")}
+        self.cache = {}
+
+    @staticmethod
+    def _join(parts):
+        return b"[" + b",".join(parts) + b"]"
+
+    def etag(self, key=""):
+        suffix = f"-{hashlib.sha1(key.encode('utf-8')).hexdigest()[:8]}" if key else ""
+        return f'"{self.version}{suffix}"'
+
+    def query(self, params):
+        """(body, etag) of the calls matching every filter in params; raises KeyError for unknown filters"""
+        filters = sorted((name, value) for name, value in params.items() if value)
+        if not filters:
+            return self.body, self.etag()
+        key = "&".join(f"{name}={value}" for name, value in filters)
+        cached = self.cache.get(key)
+        if cached is None:
+            predicates = [(FILTERS[name], value) for name, value in filters]
+            body = self._join([
+                encoded for call, encoded in zip(self.calls, self.encoded)
+                if all(predicate(call, value) for predicate, value in predicates)
+            ])
+            # Bounded: a dataset lives for one refresh interval
+            if len(self.cache) < 1024:
+                self.cache[key] = cached = (body, self.etag(key))
+            else:
+                cached = (body, self.etag(key))
+        return cached
+
+    def call(self, code):
+        """(body, etag) of the call with this code, or None"""
+        index = self.by_code.get(code)
+        if index is None:
+            return None
+        return self.encoded[index], self.etag(f"code={code}")
+
+
+class ScrapeDaemon:
+    """Keeps a warm scraper and refreshes the dataset every interval seconds"""
+
+    def __init__(self, output_file="calls_raw.json", state_file="crawl_state.db", interval=3600,
+                 full_sweep_every=12, page_size=50, max_pages=None, batch_size=10, scraper_factory=None):
+        self.output_file = output_file
+        self.state_file = state_file
+        self.interval = interval
+        self.full_sweep_every = full_sweep_every
+        self.page_size = page_size
+        self.max_pages = max_pages
+        self.batch_size = batch_size
+        self.scraper_factory = scraper_factory
+        self.scraper = None
+        self.cycles = 0
+        self.refreshing = False
+        self.last_error = None
+        self.last_duration = None
+        self.next_refresh = time.time()
+        self.stop_event = threading.Event()
+        self.wake_event = threading.Event()
+        self.thread = None
+        self.dataset = Dataset(self._load(), refreshed=None)
+
+    def _load(self):
+        """Start from the last dump so the API serves data before the first refresh"""
+        if not os.path.exists(self.output_file):
+            return []
+        try:
+            with open(self.output_file, encoding="utf-8") as f:
+                calls = json.load(f)
+            logger.info("Loaded %s calls from %s", len(calls), self.output_file)
+            return calls
+        except Exception as e:
+            logger.error("Error loading %s: %s", self.output_file, e)
+            return []
+
+    def _warm_scraper(self):
+        if self.scraper is None:
+            if self.scraper_factory is not None:
+                self.scraper = self.scraper_factory()
+            else:
+                from browser import FundingOpportunitiesScraper
+                self.scraper = FundingOpportunitiesScraper(render_workers=0)
+            self.scraper.setup_driver()
+            logger.info("Browser launched for the daemon")
+        return self.scraper
+
+    def _drop_scraper(self):
+        if self.scraper is not None:
+            try:
+                self.scraper.cleanup()
+            except Exception as e:
+                logger.warning("Error closing scraper: %s", e)
+            self.scraper = None
+
+    def refresh(self):
+        """One incremental cycle; publishes and saves the new dataset"""
+        full_sweep = bool(self.full_sweep_every) and self.cycles % self.full_sweep_every == 0
+        started = time.time()
+        scraper = self._warm_scraper()
+        state = CrawlState(self.state_file)
+        try:
+            new_calls, changes, pages = crawl_by_priority(
+                scraper, state, self.page_size, self.max_pages, incremental=True, full_sweep=full_sweep,
+                batch_size=self.batch_size,
+            )
+        finally:
+            state.close()
+
+        calls = merge_calls(self.dataset.calls, new_calls, changes)
+        self.dataset = Dataset(calls, refreshed=time.time())
+        save_calls(calls, self.output_file)
+        logger.info("Refresh %s: %s new calls, %s status changes, %s pages%s", self.cycles, len(new_calls),
+                    len(changes), pages, " (full sweep)" if full_sweep else "",
+                    extra=event("daemon.refresh", new=len(new_calls), changes=len(changes), pages=pages,
+                                full_sweep=full_sweep, seconds=round(time.time() - started, 1)))
+
+    def _run(self):
+        while not self.stop_event.is_set():
+            self.wake_event.wait(max(0, self.next_refresh - time.time()))
+            self.wake_event.clear()
+            if self.stop_event.is_set():
+                break
+            self.refreshing = True
+            started = time.monotonic()
+            try:
+                self.refresh()
+                self.last_error = None
+            except Exception as e:
+                logger.error("Refresh failed: %s", e)
+                self.last_error = str(e)
+                # A broken browser is replaced on the next cycle
+                self._drop_scraper()
+            finally:
+                self.refreshing = False
+                self.cycles += 1
+                self.last_duration = time.monotonic() - started
+                self.next_refresh = time.time() + self.interval
+        self._drop_scraper()
+
+    def start(self):
+        self.thread = threading.Thread(target=self._run, name="daemon-refresh", daemon=True)
+        self.thread.start()
+        return self.thread
+
+    def trigger(self):
+        """Refresh now instead of waiting for the schedule"""
+        self.next_refresh = time.time()
+        self.wake_event.set()
+
+    def stop(self):
+        self.stop_event.set()
+        self.wake_event.set()
+        if self.thread is not None:
+            self.thread.join()
+
+    def status(self):
+        iso = lambda ts: datetime.fromtimestamp(ts).isoformat(timespec="seconds") if ts else None
+        dataset = self.dataset
+        return {
+            "version": dataset.version,
+            "calls": len(dataset.calls),
+            "refreshed": iso(dataset.refreshed),
+            "next_refresh": iso(self.next_refresh),
+            "refreshing": self.refreshing,
+            "cycles": self.cycles,
+            "last_duration": round(self.last_duration, 1) if self.last_duration is not None else None,
+            "last_error": self.last_error,
+        }
+
+
+class _APIRequestHandler(BaseHTTPRequestHandler):
+    """Read-only JSON API over the daemon's current dataset"""
+
+    protocol_version = "HTTP/1.1"
+
+    def _send(self, status, body=b"", etag=None):
+        if etag and etag == self.headers.get("If-None-Match"):
+            status, body = 304, b""
+        self.send_response(status)
+        if status != 304:
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        if etag:
+            self.send_header("ETag", etag)
+            self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        if body:
+            self.wfile.write(body)
+
+    def _error(self, status, message):
+        self._send(status, json.dumps({"error": message}).encode("utf-8"))
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        path = url.path.rstrip("/")
+        # Read the reference once; a refresh swaps in a new dataset, never mutates this one
+        dataset = self.server.daemon.dataset
+        if path == "/calls":
+            params = {name: values[-1] for name, values in parse_qs(url.query).items()}
+            unknown = set(params) - set(FILTERS)
+            if unknown:
+                self._error(400, f"Unknown filters: {', '.join(sorted(unknown))}")
+                return
+            self._send(200, *dataset.query(params))
+        elif path.startswith("/calls/"):
+            found = dataset.call(unquote(path[len("/calls/"):]))
+            if found is None:
+                self._error(404, "No such call")
+            else:
+                self._send(200, *found)
+        elif path == "/status":
+            self._send(200, json.dumps(self.server.daemon.status()).encode("utf-8"))
+        else:
+            self._error(404, "Not found")
+
+    def do_POST(self):
+        if urlparse(self.path).path.rstrip("/") == "/refresh":
+            self.server.daemon.trigger()
+            self._send(202, json.dumps({"queued": True}).encode("utf-8"))
+        else:
+            self._error(404, "Not found")
+
+    def log_message(self, format, *args):
+        logger.debug("%s - %s", self.address_string(), format % args)
+
+
+class APIServer(ThreadingHTTPServer):
+    """Serves a ScrapeDaemon's dataset over HTTP"""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, daemon, host="127.0.0.1", port=8780):
+        super().__init__((host, port), _APIRequestHandler)
+        self.daemon = daemon
+
+    def start(self):
+        """Serve in a background thread"""
+        thread = threading.Thread(target=self.serve_forever, name="api-server", daemon=True)
+        thread.start()
+        logger.info("Query API listening on %s:%s", *self.server_address)
+        return thread
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Resident EU funding calls scraper with a local query API")
+    parser.add_argument("--serve", default="127.0.0.1:8780", help="host:port of the query API")
+    parser.add_argument("--output", default="calls_raw.json", help="dataset dump, loaded at start and rewritten per refresh")
+    parser.add_argument("--state", default="crawl_state.db", help="crawl state for incremental refreshes")
+    parser.add_argument("--interval", type=int, default=3600, help="seconds between refreshes")
+    parser.add_argument("--full-sweep-every", type=int, default=12, help="cycles between complete listing sweeps")
+    parser.add_argument("--max-pages", type=int)
+    parser.add_argument("--page-size", type=int, default=50)
+    args = parser.parse_args()
+
+    configure_logging()
+    daemon = ScrapeDaemon(args.output, args.state, args.interval, args.full_sweep_every,
+                          page_size=args.page_size, max_pages=args.max_pages)
+    host, _, port = args.serve.rpartition(":")
+    server = APIServer(daemon, host or "127.0.0.1", int(port))
+    server.start()
+    daemon.start()
+    try:
+        while daemon.thread.is_alive():
+            daemon.thread.join(1)
+    except KeyboardInterrupt:
+        logger.info("Stopping daemon")
+    finally:
+        server.shutdown()
+        daemon.stop()
+
+
+if __name__ == "__main__":
+    main()
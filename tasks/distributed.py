@@ -0,0 +1,234 @@
+"""
+Coordinator/worker mode for FundingOpportunitiesScraper.
+
+The coordinator publishes listing pages to a lease-based work queue (see
+workqueue.py), turns every scraped listing page into detail items and finally
+merges the detail results into the usual calls_raw.json. Workers on any number
+of hosts claim items, scrape them and upload the result; leases that expire
+because a worker died are re-queued.
+
+    # coordinator, serving the queue to other hosts (unauthenticated: trusted networks only)
+    python distributed.py coordinator --queue crawl.db --serve 0.0.0.0:8765 --output calls_raw.json
+    # one per worker host (or use --local-workers on the coordinator)
+    python distributed.py worker --queue tcp://coordinator-host:8765
+"""
+import argparse
+import logging
+import multiprocessing
+import os
+import socket
+import threading
+import time
+
+import luigi
+
+from runlog import configure_logging
+from state import save_calls
+from workqueue import QueueServer, open_queue
+
+logger = logging.getLogger(__name__)
+
+LISTING = "listing"
+DETAIL = "detail"
+
+
+class LeaseKeeper:
+    """Heartbeats a leased item in the background while it is being processed"""
+
+    def __init__(self, queue, item_id, worker, lease_seconds):
+        self.queue = queue
+        self.item_id = item_id
+        self.worker = worker
+        self.lease_seconds = lease_seconds
+        self.stop = threading.Event()
+        self.thread = threading.Thread(target=self._beat, daemon=True)
+
+    def _beat(self):
+        while not self.stop.wait(self.lease_seconds / 3):
+            try:
+                if not self.queue.heartbeat(self.item_id, self.worker, self.lease_seconds):
+                    logger.warning("Lost lease on item %s", self.item_id)
+                    return
+            except Exception as e:
+                logger.warning("Heartbeat for item %s failed: %s", self.item_id, e)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop.set()
+        self.thread.join()
+
+
+def process_item(scraper, item):
+    """Scrape one claimed item and return its result"""
+    payload = item["payload"]
+    if item["kind"] == LISTING:
+        entries, total = scraper.list_page(payload["page"])
+        return {"entries": entries, "total": total}
+    calls = scraper.scrape_details([(payload["index"], payload["basic_info"])], payload["page"])
+    if not calls:
+        raise RuntimeError(f"No data extracted from {payload['basic_info']['link']}")
+    return calls[0]
+
+
+def default_scraper():
+    """Scraper for a worker; workers share the portal session on this host, so only the first one pays the setup"""
+    from browser import FundingOpportunitiesScraper
+
+    return FundingOpportunitiesScraper(render_workers=0, session_file="portal_session.json")
+
+
+def run_worker(queue, worker_id=None, lease_seconds=120, idle_timeout=60, poll_interval=2, scraper_factory=None):
+    """Claim and process items until the queue has been idle for idle_timeout seconds"""
+    worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+    scraper_factory = scraper_factory or default_scraper
+    scraper = None
+    processed = 0
+    idle_since = time.monotonic()
+    logger.info("Worker %s started", worker_id)
+    try:
+        while True:
+            item = queue.claim(worker_id, lease_seconds)
+            if item is None:
+                if time.monotonic() - idle_since > idle_timeout:
+                    break
+                time.sleep(poll_interval)
+                continue
+
+            if scraper is None:
+                scraper = scraper_factory()
+                scraper.setup_driver()
+            logger.info("Worker %s processing %s (attempt %s)", worker_id, item["key"], item["attempts"])
+            try:
+                with LeaseKeeper(queue, item["id"], worker_id, lease_seconds):
+                    result = process_item(scraper, item)
+                if not queue.complete(item["id"], worker_id, result):
+                    logger.warning("Result for %s discarded, lease was lost", item["key"])
+                processed += 1
+            except Exception as e:
+                logger.error("Worker %s failed on %s: %s", worker_id, item["key"], e)
+                queue.fail(item["id"], worker_id, e)
+            idle_since = time.monotonic()
+    finally:
+        if scraper is not None:
+            scraper.cleanup()
+    logger.info("Worker %s finished after %s items", worker_id, processed)
+    return processed
+
+
+def _worker_process(queue_spec):
+    configure_logging()
+    run_worker(open_queue(queue_spec))
+
+
+def start_local_workers(queue_spec, count):
+    """Start worker processes on this host"""
+    context = multiprocessing.get_context("spawn")
+    workers = [context.Process(target=_worker_process, args=(queue_spec,), daemon=True) for _ in range(count)]
+    for worker in workers:
+        worker.start()
+    return workers
+
+
+def run_coordinator(queue, max_pages=None, page_size=50, poll_interval=5):
+    """
+    Publish listing pages, fan completed listings out into detail items and
+    return the merged detail results in listing order once the queue drains
+    """
+    queue.put(LISTING, "listing:1", {"page": 1})
+    expanded = set()
+    while True:
+        queue.requeue_expired()
+        # Checked before reading results: a listing page that completes in
+        # between is still expanded below, and keeps the loop going
+        finished = queue.is_finished()
+        published = False
+        for _, key, payload, result in queue.results(LISTING):
+            if key in expanded:
+                continue
+            expanded.add(key)
+            published = True
+            page = payload["page"]
+            # Detail items are keyed by link, so a call seen on two pages is scraped once
+            for index, basic_info in result["entries"]:
+                queue.put(DETAIL, basic_info["link"], {"page": page, "index": index, "basic_info": basic_info}, priority=1)
+            if result["total"] >= page_size and (not max_pages or page < max_pages):
+                queue.put(LISTING, f"listing:{page + 1}", {"page": page + 1})
+            logger.info("Listing page %s: published %s detail items", page, len(result["entries"]))
+
+        if finished and not published:
+            break
+        time.sleep(poll_interval)
+
+    stats = queue.stats()
+    if stats.get("failed"):
+        logger.warning("%s items failed after retries", stats["failed"])
+    details = sorted(queue.results(DETAIL), key=lambda row: (row[2]["page"], row[2]["index"]))
+    return [result for _, _, _, result in details]
+
+
+def coordinate(queue_file, output_file, serve=None, local_workers=0, max_pages=None, page_size=50):
+    """Run a full distributed crawl from this host"""
+    queue = open_queue(queue_file)
+    server = None
+    if serve:
+        host, _, port = serve.rpartition(":")
+        server = QueueServer(queue, host or "127.0.0.1", int(port))
+        server.start()
+    workers = start_local_workers(queue_file, local_workers) if local_workers else []
+    try:
+        calls = run_coordinator(queue, max_pages=max_pages, page_size=page_size)
+        save_calls(calls, output_file)
+        logger.info("Merged %s calls from the work queue into %s", len(calls), output_file)
+    finally:
+        for worker in workers:
+            worker.join(timeout=120)
+        if server is not None:
+            server.shutdown()
+        queue.close()
+
+
+class DistributedFetchFundingOpportunities(luigi.Task):
+    """Luigi task running a distributed crawl; output matches FetchFundingOpportunities"""
+
+    queue_file = luigi.Parameter(default="crawl_queue.db")
+    serve = luigi.Parameter(default="")
+    local_workers = luigi.IntParameter(default=2)
+    max_pages = luigi.IntParameter(default=None)
+    page_size = luigi.IntParameter(default=50)
+    output_file = luigi.Parameter(default="calls_raw.json")
+
+    def run(self):
+        coordinate(self.queue_file, self.output_file, self.serve or None, self.local_workers,
+                   self.max_pages, self.page_size)
+
+    def output(self):
+        return luigi.LocalTarget(self.output_file)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Distributed EU funding calls crawl")
+    sub = parser.add_subparsers(dest="role", required=True)
+    coord = sub.add_parser("coordinator")
+    coord.add_argument("--queue", default="crawl_queue.db", help="SQLite queue file")
+    coord.add_argument("--serve", help="host:port to serve the queue to remote workers")
+    coord.add_argument("--output", default="calls_raw.json")
+    coord.add_argument("--local-workers", type=int, default=0)
+    coord.add_argument("--max-pages", type=int)
+    coord.add_argument("--page-size", type=int, default=50)
+    worker = sub.add_parser("worker")
+    worker.add_argument("--queue", required=True, help="SQLite queue file or tcp://host:port")
+    worker.add_argument("--idle-timeout", type=int, default=60)
+    args = parser.parse_args()
+
+    configure_logging()
+    if args.role == "coordinator":
+        coordinate(args.queue, args.output, args.serve, args.local_workers, args.max_pages, args.page_size)
+    else:
+        run_worker(open_queue(args.queue), idle_timeout=args.idle_timeout)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,328 @@
+"""
+Enrichment stage: parse the free-text sections of the scraped calls into typed
+columns (budget amounts and currency, multi-stage deadlines, programme codes)
+and store them in SQLite so dashboards can query them directly.
+
+Parsed sections are cached by content hash in a separate SQLite file, so
+sections that did not change between runs are never parsed again.
+"""
+import hashlib
+import json
+import logging
+import os
+import re
+import sqlite3
+from datetime import datetime
+
+import luigi
+
+from extract import FetchFundingOpportunities
+
+logger = logging.getLogger(__name__)
+
+# Bump when the parsers change so cached results are recomputed
+PARSER_VERSION = 2
+
+BASIC_FIELDS = frozenset(["title", "link", "code", "type", "opening_date", "deadline_date", "stage", "status"])
+
+_MONTHS = "January|February|March|April|May|June|July|August|September|October|November|December"
+_MONTHS_SHORT = "Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Sept|Oct|Nov|Dec"
+DATE_RE = re.compile(rf"\b(\d{{1,2}})\s+({_MONTHS}|{_MONTHS_SHORT})\.?\s+(\d{{4}})\b", re.IGNORECASE)
+# Grouped amounts such as '50 000 000' or '2,500,000', or '12.5 million'; the digit
+# guards keep codes and dates like 'HORIZON-CL4-2025-01-01 2025' from reading as amounts
+AMOUNT_RE = re.compile(
+    r"(?:\b(20\d{2})\b[\s:()\-]{0,6})?"
+    r"(?:(?:EUR|€)\s*)?"
+    r"(?<!\d)(\d{1,3}(?:[ \u00a0.,]\d{3})+(?!\d)|\d+(?:[.,]\d+)?\s*(?:million|billion|bn|m)\b)"
+    r"(?:\s*(EUR|€|euro))?",
+    re.IGNORECASE,
+)
+# 'Total' label in the text leading up to an amount
+TOTAL_RE = re.compile(r"\btotal\b", re.IGNORECASE)
+CURRENCY_RE = re.compile(r"\b(EUR|USD|GBP|CHF)\b|€|\beuros?\b", re.IGNORECASE)
+PROGRAMME_CODE_RE = re.compile(r"\b([A-Z][A-Z0-9]{1,}(?:-[A-Z0-9]+){2,})\b")
+DEADLINE_MODEL_RE = re.compile(
+    r"\b(single[- ]stage|two[- ]stage|multiple cut-?off|multiple[- ]stage|continuous)\b", re.IGNORECASE
+)
+_YEAR_RE = re.compile(r"^(?:19|20)\d{2}$")
+_SCALE = {"million": 1e6, "m": 1e6, "billion": 1e9, "bn": 1e9}
+
+
+def _parse_date(day, month, year):
+    month = month.rstrip(".")[:3].title()
+    try:
+        return datetime.strptime(f"{day} {month} {year}", "%d %b %Y").strftime("%Y-%m-%d")
+    except ValueError:
+        return None
+
+
+def _parse_amount(text):
+    """'50 000 000' -> 50000000.0, '12.5 million' -> 12500000.0"""
+    text = text.strip().lower()
+    scale = 1.0
+    for word, factor in _SCALE.items():
+        if text.endswith(word):
+            scale = factor
+            text = text[: -len(word)].strip()
+            break
+    if scale == 1.0:
+        digits = re.sub(r"[ \u00a0.,]", "", text)
+    else:
+        digits = text.replace(",", ".")
+    try:
+        return float(digits) * scale
+    except ValueError:
+        return None
+
+
+def _currency(token):
+    if not token:
+        return None
+    token = token.strip().upper()
+    return "EUR" if token in ("€", "EURO", "EUROS") else token
+
+
+def parse_section(title, lines):
+    """Extract budgets, dates, deadline model and programme codes from one section"""
+    text = "\n".join(lines) if isinstance(lines, list) else str(lines)
+    currency_match = CURRENCY_RE.search(f"{title}\n{text}")
+    default_currency = _currency(currency_match.group(0)) if currency_match else None
+
+    amounts = []
+    previous_end = 0
+    for match in AMOUNT_RE.finditer(text):
+        year, amount, currency = match.groups()
+        leading_text = text[previous_end:match.start()]
+        previous_end = match.end()
+        if _YEAR_RE.match(amount.strip()):
+            continue
+        value = _parse_amount(amount)
+        if value is None or value < 1000:
+            continue
+        amounts.append({
+            "amount": value,
+            "currency": _currency(currency) or default_currency,
+            "year": int(year) if year else None,
+            "total": bool(TOTAL_RE.search(leading_text)),
+        })
+
+    dates = []
+    for day, month, year in DATE_RE.findall(text):
+        parsed = _parse_date(day, month, year)
+        if parsed and parsed not in dates:
+            dates.append(parsed)
+
+    model = DEADLINE_MODEL_RE.search(text)
+    codes = []
+    for code in PROGRAMME_CODE_RE.findall(text):
+        if re.search(r"\d", code) and code not in codes:
+            codes.append(code)
+
+    return {
+        "amounts": amounts,
+        "dates": dates,
+        "deadline_model": model.group(1).lower().replace(" ", "-") if model else None,
+        "programme_codes": codes,
+    }
+
+
+class ParseCache:
+    """Section parse results keyed by content hash, persisted in SQLite"""
+
+    def __init__(self, path):
+        self.conn = sqlite3.connect(path)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS parse_cache (hash TEXT PRIMARY KEY, version INTEGER, result TEXT)"
+        )
+        self.memo = {}
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(title, lines):
+        payload = json.dumps([title, lines], ensure_ascii=False, sort_keys=True)
+        return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+    def parse(self, title, lines):
+        key = self.key(title, lines)
+        if key in self.memo:
+            self.hits += 1
+            return self.memo[key]
+        row = self.conn.execute(
+            "SELECT result FROM parse_cache WHERE hash = ? AND version = ?", (key, PARSER_VERSION)
+        ).fetchone()
+        if row:
+            self.hits += 1
+            result = json.loads(row[0])
+        else:
+            self.misses += 1
+            result = parse_section(title, lines)
+            self.conn.execute(
+                "INSERT OR REPLACE INTO parse_cache VALUES (?, ?, ?)",
+                (key, PARSER_VERSION, json.dumps(result, ensure_ascii=False)),
+            )
+        self.memo[key] = result
+        return result
+
+    def close(self):
+        self.conn.commit()
+        self.conn.close()
+
+
+def budget_total(budgets):
+    """
+    Call budget from the amounts of its budget sections: the explicit 'Total'
+    figure if there is one, otherwise the sum of the per-year figures, otherwise
+    the largest amount. Never a mix, so per-year lines, totals and per-project
+    amounts are not added up together.
+    """
+    totals = [b["amount"] for b in budgets if b["total"]]
+    if totals:
+        return max(totals)
+    yearly = {}
+    for budget in budgets:
+        if budget["year"]:
+            yearly.setdefault(budget["year"], budget["amount"])
+    if yearly:
+        return sum(yearly.values())
+    return max((b["amount"] for b in budgets), default=None)
+
+
+def enrich_call(call, cache):
+    """Aggregate the parsed sections of one call into typed rows"""
+    parsed = {
+        title: cache.parse(title, content)
+        for title, content in call.items()
+        if title not in BASIC_FIELDS and isinstance(content, (list, str))
+    }
+
+    # Amounts and deadlines are only read from their own sections; elsewhere they are
+    # per-project amounts, info days, project start dates and the like
+    budget_sections = [p for t, p in parsed.items() if "budget" in t.lower()]
+    deadline_sections = [p for t, p in parsed.items() if "deadline" in t.lower()]
+    budgets = []
+    for result in budget_sections:
+        for amount in result["amounts"]:
+            if amount not in budgets:
+                budgets.append(amount)
+    currencies = [b["currency"] for b in budgets if b["currency"]]
+
+    opening = call.get("opening_date") or ""
+    deadlines = set(d for p in deadline_sections for d in p["dates"] if d > opening)
+    if call.get("deadline_date"):
+        deadlines.add(call["deadline_date"])
+
+    codes = []
+    for result in parsed.values():
+        codes.extend(c for c in result["programme_codes"] if c not in codes)
+    models = [p["deadline_model"] for p in parsed.values() if p["deadline_model"]]
+    code = call.get("code") or ""
+
+    return {
+        "call": {
+            "code": code,
+            "title": call.get("title"),
+            "status": call.get("status"),
+            "type": call.get("type"),
+            "link": call.get("link"),
+            "programme": code.split("-")[0] if "-" in code else None,
+            "opening_date": call.get("opening_date") or None,
+            "deadline_date": call.get("deadline_date") or None,
+            "deadline_model": models[0] if models else None,
+            "budget_total": budget_total(budgets),
+            "currency": max(set(currencies), key=currencies.count) if currencies else None,
+            "deadline_count": len(deadlines),
+            "final_deadline": max(deadlines) if deadlines else None,
+        },
+        "budgets": budgets,
+        "deadlines": sorted(deadlines),
+        "programme_codes": codes,
+    }
+
+
+SCHEMA = """
+CREATE TABLE calls (
+    code TEXT PRIMARY KEY, title TEXT, status TEXT, type TEXT, link TEXT, programme TEXT,
+    opening_date DATE, deadline_date DATE, deadline_model TEXT,
+    budget_total REAL, currency TEXT, deadline_count INTEGER, final_deadline DATE
+);
+CREATE TABLE call_budgets (code TEXT, amount REAL, currency TEXT, year INTEGER, total BOOLEAN);
+CREATE TABLE call_deadlines (code TEXT, stage INTEGER, deadline DATE);
+CREATE TABLE call_programme_codes (code TEXT, programme_code TEXT);
+CREATE INDEX call_deadlines_date ON call_deadlines (deadline);
+CREATE INDEX calls_status ON calls (status);
+"""
+
+
+def write_enriched(rows, path):
+    """Write enriched rows to a fresh SQLite database at path"""
+    if os.path.exists(path):
+        os.remove(path)
+    conn = sqlite3.connect(path)
+    conn.executescript(SCHEMA)
+    for row in rows:
+        call = row["call"]
+        columns = ", ".join(call)
+        conn.execute(
+            f"INSERT OR REPLACE INTO calls ({columns}) VALUES ({', '.join('?' * len(call))})",
+            list(call.values()),
+        )
+        conn.executemany(
+            "INSERT INTO call_budgets VALUES (?, ?, ?, ?, ?)",
+            [(call["code"], b["amount"], b["currency"], b["year"], b["total"]) for b in row["budgets"]],
+        )
+        conn.executemany(
+            "INSERT INTO call_deadlines VALUES (?, ?, ?)",
+            [(call["code"], stage, d) for stage, d in enumerate(row["deadlines"], 1)],
+        )
+        conn.executemany(
+            "INSERT INTO call_programme_codes VALUES (?, ?)",
+            [(call["code"], c) for c in row["programme_codes"]],
+        )
+    conn.commit()
+    conn.close()
+
+
+class EnrichFundingOpportunities(luigi.Task):
+    """Luigi task turning calls_raw.json into typed SQLite tables"""
+
+    input_file = luigi.Parameter(default="calls_raw.json")
+    output_file = luigi.Parameter(default="calls_enriched.db")
+    cache_file = luigi.Parameter(default="enrich_cache.db")
+
+    def requires(self):
+        return FetchFundingOpportunities(output_file=self.input_file)
+
+    def run(self):
+        with self.input().open("r") as f:
+            calls = json.load(f)
+
+        # The calls table is keyed by code; calls without one would overwrite each other
+        keyed_calls = [call for call in calls if call.get("code")]
+        if len(keyed_calls) < len(calls):
+            logger.warning("Skipping %s calls without a code: %s", len(calls) - len(keyed_calls),
+                           [call.get("link") for call in calls if not call.get("code")])
+        # A call listed twice would get its budgets, deadlines and programme codes twice;
+        # the first copy is kept, which after an incremental merge is the newest scrape
+        by_code = {}
+        for call in keyed_calls:
+            by_code.setdefault(call["code"], call)
+        if len(by_code) < len(keyed_calls):
+            logger.warning("Skipping %s duplicate calls", len(keyed_calls) - len(by_code))
+        keyed_calls = list(by_code.values())
+
+        cache = ParseCache(self.cache_file)
+        try:
+            rows = [enrich_call(call, cache) for call in keyed_calls]
+        finally:
+            cache.close()
+        logger.info("Parsed sections of %s calls: %s cache hits, %s parsed", len(rows), cache.hits, cache.misses)
+
+        # Write next to the target and rename, so a failed run leaves no partial output
+        tmp_path = f"{self.output_file}.tmp"
+        write_enriched(rows, tmp_path)
+        os.replace(tmp_path, self.output_file)
+        logger.info("Saved enriched data for %s calls to %s", len(rows), self.output_file)
+
+    def output(self):
+        return luigi.LocalTarget(self.output_file)
@@ -11,10 +11,14 @@ from contextlib import contextmanager
 import logging
 from urllib.parse import urlparse, parse_qs, urlencode, urlunparse
 import sys
-import random
+from locators import LocatorRegistry
+from listing import card_basic_info, parse_listing_dates, read_listing_cards
+from runlog import configure_logging, event
+from profiling import profiled
+from state import CrawlState, is_known
 
-# Configure logging for detailed debugging
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+# Configure logging; per-card lines are sampled per event type (runlog.DEFAULT_SAMPLE_RATES)
+configure_logging()
 logger = logging.getLogger(__name__)
 
 # ---- CONFIGURATION ----
@@ -23,6 +27,9 @@ BASE_URL = 'https://ec.europa.eu/info/funding-tenders/opportunities/portal/scree
 HEADLESS = True
 MAX_CALLS = 820  # Safety limit - should stop at 804 based on your filter
 WAIT_TIME = 5    # Wait time for page loads
+# Own crawl state for --incremental: this script never scrapes detail pages, so moving the
+# pipeline's watermark (crawl_state.db) would make the pipeline skip calls it never scraped
+STATE_FILE = "filtertest_state.db"
 # -----------------------
 
 class EUScraper:
@@ -31,8 +38,9 @@ class EUScraper:
         self.driver = None
         self.base_url = base_url
         self.base_params = self._parse_url_params(base_url)
-        logger.info(f"Initialized scraper with base URL: {base_url}")
-        logger.info(f"Parsed base parameters: {self.base_params}")
+        self.locators = LocatorRegistry()
+        logger.info("Initialized scraper with base URL: %s", base_url)
+        logger.info("Parsed base parameters: %s", self.base_params)
     
     def _parse_url_params(self, url):
         """Parse URL and extract query parameters for building paginated URLs"""
@@ -43,16 +51,16 @@ class EUScraper:
     
     def validate_url_format(self, url):
         """Validate that the URL format matches what the website expects"""
-        logger.debug(f"Validating URL format: {url}")
+        logger.debug("Validating URL format: %s", url)
         
         # Check if status parameter has unencoded commas
         if 'status=' in url:
             status_part = url.split('status=')[1].split('&')[0]
             if '%2C' in status_part:
-                logger.warning(f"URL contains encoded comma in status parameter: {status_part}")
+                logger.warning("URL contains encoded comma in status parameter: %s", status_part)
                 return False
             elif ',' in status_part:
-                logger.debug(f"Status parameter format looks correct: {status_part}")
+                logger.debug("Status parameter format looks correct: %s", status_part)
                 return True
         
         return True
@@ -80,9 +88,9 @@ class EUScraper:
         
         # Validate the URL format
         if not self.validate_url_format(new_url):
-            logger.error(f"Generated URL has incorrect format: {new_url}")
+            logger.error("Generated URL has incorrect format: %s", new_url)
         
-        logger.debug(f"Built URL for page {page_number}: {new_url}")
+        logger.debug("Built URL for page %s: %s", page_number, new_url)
         return new_url
     
     def setup_driver(self):
@@ -108,7 +116,7 @@ class EUScraper:
         
         user_data_dir = tempfile.mkdtemp()
         chrome_options.add_argument(f"--user-data-dir={user_data_dir}")
-        logger.debug(f"Using temporary user data directory: {user_data_dir}")
+        logger.debug("Using temporary user data directory: %s", user_data_dir)
         
         service = Service("/usr/bin/chromedriver")
         self.driver = webdriver.Chrome(service=service, options=chrome_options)
@@ -127,7 +135,7 @@ class EUScraper:
             )
             logger.debug("Page load complete")
         except Exception as e:
-            logger.warning(f"Page load wait timeout: {e}")
+            logger.warning("Page load wait timeout: %s", e)
     
     def get_page_info(self):
         """Extract current page information for debugging"""
@@ -136,24 +144,24 @@ class EUScraper:
             current_url = self.driver.current_url
             page_title = self.driver.title
             
-            logger.debug(f"Current URL: {current_url}")
-            logger.debug(f"Page title: {page_title}")
+            logger.debug("Current URL: %s", current_url)
+            logger.debug("Page title: %s", page_title)
             
             return {
                 'url': current_url,
                 'title': page_title
             }
         except Exception as e:
-            logger.error(f"Error getting page info: {e}")
+            logger.error("Error getting page info: %s", e)
             return {}
     
     def extract_cards_from_page(self):
         """Extract all cards from current page with detailed logging"""
-        logger.info(f"Extracting cards from current page...")
+        logger.info("Extracting cards from current page...")
         
         # Log the current URL being processed
         current_url = self.driver.current_url
-        logger.info(f"🌐 Currently visiting URL: {current_url}")
+        logger.info("🌐 Currently visiting URL: %s", current_url)
         
         # Wait for cards to load
         try:
@@ -161,30 +169,53 @@ class EUScraper:
                 EC.presence_of_element_located((By.CSS_SELECTOR, "eui-card"))
             )
         except Exception as e:
-            logger.warning(f"No cards found or timeout waiting for cards: {e}")
+            logger.warning("No cards found or timeout waiting for cards: %s", e)
             return []
         
-        cards = self.driver.find_elements(By.CSS_SELECTOR, "eui-card")
-        logger.info(f"Found {len(cards)} cards on this page")
+        try:
+            # One script call for the whole page instead of several round trips per card
+            cards = read_listing_cards(self.driver, self.locators, card_locator="listing_card")
+            bulk = True
+        except Exception as e:
+            logger.warning("Bulk card extraction failed, reading cards one by one: %s", e)
+            cards = self.locators.find_elements(self.driver, "listing_card")
+            bulk = False
+        logger.info("Found %s cards on this page", len(cards))
         
         if len(cards) == 0:
             logger.warning("No cards found - this might indicate end of results or page load issue")
             # Let's check what's actually on the page
             page_source_snippet = self.driver.page_source[:500]
-            logger.debug(f"Page source snippet: {page_source_snippet}")
+            logger.debug("Page source snippet: %s", page_source_snippet)
         
         page_data = []
         
         for idx, card in enumerate(cards):
-            card_data = self.extract_card_data(card, idx + 1)
+            card_data = self.card_data_from_row(card, idx + 1) if bulk else self.extract_card_data(card, idx + 1)
             page_data.append(card_data)
             
-            # Random status logging instead of every 10th
-            if random.random() < 0.2:  # 20% chance to log each card
-                logger.info(f"Card {idx + 1}: Status='{card_data['status']}', Title='{card_data['title'][:50]}...'")
+            # Sampled by the log handler ("listing.card"), formatted only if emitted
+            logger.info("Card %s: Status='%s', Title='%s...'", idx + 1, card_data['status'], card_data['title'][:50],
+                        extra=event("listing.card", card=idx + 1, status=card_data['status']))
         
         return page_data
     
+    def card_data_from_row(self, row, card_number):
+        """Card data from a bulk-extracted listing row; missing fields stay UNKNOWN"""
+        card_data = {
+            'card_number': card_number,
+            'status': row['status'] if row['status'] is not None else 'UNKNOWN',
+            'title': row['title'] if row['title'] is not None else 'UNKNOWN',
+            'link': row['link'] if row['link'] is not None else 'UNKNOWN',
+        }
+        # Code and dates feed the incremental crawl state
+        basic_info = card_basic_info(row)
+        if basic_info:
+            parse_listing_dates([basic_info])
+            for field in ('code', 'opening_date', 'deadline_date'):
+                card_data[field] = basic_info[field] or None
+        return card_data
+    
     def extract_card_data(self, card, card_number):
         """Extract data from a single card with error handling"""
         card_data = {
@@ -196,39 +227,39 @@ class EUScraper:
         
         try:
             # Extract status
-            status_elem = card.find_element(By.CSS_SELECTOR, "span.eui-label")
+            status_elem = self.locators.find_element(self.driver, "card_status", parent=card)
             card_data['status'] = status_elem.text.strip()
         except Exception as e:
-            logger.debug(f"Card {card_number}: Could not extract status - {e}")
+            logger.debug("Card %s: Could not extract status - %s", card_number, e)
             
         try:
             # Extract title and link
-            link_elem = card.find_element(By.CSS_SELECTOR, "a.eui-u-text-link")
+            link_elem = self.locators.find_element(self.driver, "card_title_link", parent=card)
             card_data['title'] = link_elem.text.strip()
             card_data['link'] = link_elem.get_attribute("href")
         except Exception as e:
-            logger.debug(f"Card {card_number}: Could not extract title/link - {e}")
+            logger.debug("Card %s: Could not extract title/link - %s", card_number, e)
         
         return card_data
     
     def check_if_end_of_results(self, cards_data, page_number):
         """Check if we've reached the end of results"""
         if not cards_data:
-            logger.info(f"No cards found on page {page_number} - likely end of results")
+            logger.info("No cards found on page %s - likely end of results", page_number)
             return True
         
         # Check for "No results" or similar messages on the page
         try:
             no_results_elements = self.driver.find_elements(By.XPATH, "//*[contains(text(), 'No results') or contains(text(), 'no results') or contains(text(), 'No calls')]")
             if no_results_elements:
-                logger.info(f"Found 'no results' message on page {page_number}")
+                logger.info("Found 'no results' message on page %s", page_number)
                 return True
         except Exception as e:
-            logger.debug(f"Error checking for 'no results' message: {e}")
+            logger.debug("Error checking for 'no results' message: %s", e)
         
         # Check if we have fewer cards than expected (less than 50 suggests last page)
         if len(cards_data) > 0 and len(cards_data) < 50:
-            logger.info(f"Found only {len(cards_data)} cards on page {page_number} (less than 50) - likely last page")
+            logger.info("Found only %s cards on page %s (less than 50) - likely last page", len(cards_data), page_number)
             return True
         
         return False
@@ -249,8 +280,8 @@ class EUScraper:
         new_query = urlencode(params, doseq=True)
         new_url = urlunparse((parsed.scheme, parsed.netloc, parsed.path, parsed.params, new_query, parsed.fragment))
         
-        logger.info(f"Navigating from page {current_page} to page {next_page}")
-        logger.info(f"🔗 Next page URL: {new_url}")
+        logger.info("Navigating from page %s to page %s", current_page, next_page)
+        logger.info("🔗 Next page URL: %s", new_url)
         
         self.driver.get(new_url)
         self.wait_for_page_load()
@@ -265,13 +296,23 @@ class EUScraper:
         if expected_page > 1:
             if f"pageNumber={expected_page}" not in current_url:
                 if "pageNumber=1" in current_url or "pageNumber" not in current_url:
-                    logger.error(f"REDIRECT DETECTED: Expected page {expected_page}, but on page 1")
+                    logger.error("REDIRECT DETECTED: Expected page %s, but on page 1", expected_page)
                     return False
         
-        logger.debug(f"Successfully on page {expected_page}")
+        logger.debug("Successfully on page %s", expected_page)
         return True
 
-def main():
+def crawl_state_info(card):
+    """Listing fields of a card for CrawlState; fields it lacks are None, so stored values are kept"""
+    return {
+        'link': card['link'],
+        'status': card['status'] if card['status'] != 'UNKNOWN' else None,
+        'code': card.get('code'),
+        'opening_date': card.get('opening_date'),
+        'deadline_date': card.get('deadline_date'),
+    }
+
+def main(incremental=False):
     logger.info("="*60)
     logger.info("Starting EU Funding Calls Scraper")
     logger.info("="*60)
@@ -283,11 +324,17 @@ def main():
     page_number = 1
     consecutive_empty_pages = 0
     pages_with_less_than_50_cards = 0
+    # Incremental mode: calls known from earlier runs, by the same rule as the pipeline (state.is_known)
+    state = CrawlState(STATE_FILE) if incremental else None
+    known = state.known_links() if state else set()
+    watermark = state.watermark() if state else (None, set())
+    listed = []
+    failed = False
     
     try:
         # STEP 1: Start with page 1 to establish session
-        logger.info(f"\n--- ESTABLISHING SESSION ON PAGE 1 ---")
-        logger.info(f"🔗 Starting URL: {BASE_URL}")
+        logger.info("\n--- ESTABLISHING SESSION ON PAGE 1 ---")
+        logger.info("🔗 Starting URL: %s", BASE_URL)
         driver.get(BASE_URL)  # This is your filtered URL for page 1
         scraper.wait_for_page_load()
         
@@ -295,11 +342,12 @@ def main():
         
         # STEP 2: Sequential navigation through pages
         while len(all_data) < MAX_CALLS:
-            logger.info(f"\n--- PROCESSING PAGE {current_page} ---")
+            logger.info("\n--- PROCESSING PAGE %s ---", current_page)
             
             # Validate we're on the expected page
             if not scraper.validate_current_page(current_page):
                 logger.error("Page validation failed - stopping scraper")
+                failed = True
                 break
             
             # Extract cards from current page
@@ -308,7 +356,7 @@ def main():
             # Check if we've hit the end
             if scraper.check_if_end_of_results(page_cards, current_page):
                 consecutive_empty_pages += 1
-                logger.warning(f"End of results detected on page {current_page} ({consecutive_empty_pages}/2)")
+                logger.warning("End of results detected on page %s (%s/2)", current_page, consecutive_empty_pages)
                 
                 if consecutive_empty_pages >= 2:
                     logger.info("Found 2 consecutive end-of-results indicators - stopping scraper")
@@ -316,31 +364,40 @@ def main():
             else:
                 consecutive_empty_pages = 0
             
+            # Add page data to the collection and the crawl state before any end-of-results stop
+            all_data.extend(page_cards)
+            
+            if state:
+                infos = [crawl_state_info(card) for card in page_cards if card['link'] != 'UNKNOWN']
+                state.mark_seen(infos)
+                listed.extend(infos)
+                new_cards = [info for info in infos if not is_known(info, known, watermark)]
+                logger.info("Page %s: %s new of %s cards", current_page, len(new_cards), len(page_cards))
+                # Sorted by start date: a full page of known calls means the rest were seen too
+                if not new_cards and len(page_cards) >= 50:
+                    logger.info("Page %s contains only known calls - stopping incremental crawl", current_page)
+                    break
+            
             # Track pages with less than 50 cards (indicates end of results)
             if len(page_cards) > 0 and len(page_cards) < 50:
                 pages_with_less_than_50_cards += 1
-                logger.info(f"Page {current_page} has {len(page_cards)} cards (less than 50) - likely near end")
+                logger.info("Page %s has %s cards (less than 50) - likely near end", current_page, len(page_cards))
                 
                 # If we get 2 pages in a row with less than 50 cards, probably at the end
                 if pages_with_less_than_50_cards >= 2:
                     logger.info("Found 2 pages with less than 50 cards - likely reached end of filtered results")
-                    # Add current page data and then stop
-                    all_data.extend(page_cards)
-                    logger.info(f"Page {current_page} complete. Total cards so far: {len(all_data)}")
+                    logger.info("Page %s complete. Total cards so far: %s", current_page, len(all_data))
                     break
             else:
                 pages_with_less_than_50_cards = 0
             
-            # Add page data to overall collection
-            all_data.extend(page_cards)
-            
-            logger.info(f"Page {current_page} complete. Total cards so far: {len(all_data)}")
+            logger.info("Page %s complete. Total cards so far: %s", current_page, len(all_data))
             
-            # Status distribution check randomly (instead of every 5 pages)
-            if random.random() < 0.3:  # 30% chance to show status distribution
-                current_statuses = [card['status'] for card in all_data]
-                status_counter = Counter(current_statuses)
-                logger.info(f"📊 Current status distribution: {dict(status_counter)}")
+            # Status distribution, sampled by the log handler ("listing.status_distribution")
+            status_counter = Counter(card['status'] for card in all_data)
+            logger.info("📊 Current status distribution: %s", dict(status_counter),
+                        extra=event("listing.status_distribution", page=current_page,
+                                    status_distribution=dict(status_counter)))
             
             # Break if we have no more cards
             if not page_cards:
@@ -349,7 +406,7 @@ def main():
             
             # Stop if we're close to our expected limit (804) to avoid overscraping
             if len(all_data) >= 800:
-                logger.info(f"Approaching expected limit (804 calls), currently at {len(all_data)} - checking if we should continue")
+                logger.info("Approaching expected limit (804 calls), currently at %s - checking if we should continue", len(all_data))
                 if len(page_cards) < 50:  # If this page has less than 50, we're probably at the end
                     logger.info("This page has less than 50 cards and we're near the limit - stopping")
                     break
@@ -359,18 +416,27 @@ def main():
             try:
                 current_page = scraper.navigate_to_next_page(current_page)
             except Exception as e:
-                logger.error(f"Failed to navigate to next page: {e}")
+                logger.error("Failed to navigate to next page: %s", e)
+                failed = True
                 break
 
     except KeyboardInterrupt:
         logger.info("Scraping interrupted by user")
+        failed = True
     except Exception as e:
-        logger.error(f"Unexpected error during scraping: {e}")
+        failed = True
+        logger.error("Unexpected error during scraping: %s", e)
         import traceback
         traceback.print_exc()
     finally:
         logger.info("Closing driver...")
         driver.quit()
+        scraper.locators.log_report()
+        if state:
+            # Only a finished crawl moves the high-water mark
+            if not failed:
+                state.advance_watermark(listed)
+            state.close()
 
     # ===== RESULTS ANALYSIS =====
     logger.info("\n" + "="*60)
@@ -438,4 +504,7 @@ def main():
         print("This suggests the scraper went beyond the filtered results.")
 
 if __name__ == "__main__":
-    main()
+    # python filtertest.py --profile  ->  filtertest.folded plus a top-N summary in the log
+    # python filtertest.py --incremental  ->  stop at the first page of calls seen by an earlier run (filtertest_state.db)
+    with profiled("filtertest.folded", enabled="--profile" in sys.argv[1:]):
+        main(incremental="--incremental" in sys.argv[1:])
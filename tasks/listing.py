@@ -0,0 +1,95 @@
+"""
+Bulk extraction of listing cards.
+
+One in-page script reads every card on a listing page (title, link, subtitle
+spans and dates, status), replacing the per-card find_element/.text round
+trips. Field mapping and date parsing then run in Python over the whole page.
+"""
+import logging
+import re
+
+from render import parse_portal_date, replace_raw_dates
+
+logger = logging.getLogger(__name__)
+
+_COUNT = re.compile(r"\d[\d,.\s]*")
+
+# Arguments are the card, title link, subtitle and status selectors. A field is
+# null when its element is missing, so callers can tell missing from empty.
+LISTING_CARDS_SCRIPT = """
+var cardSel = arguments[0], linkSel = arguments[1], subtitleSel = arguments[2], statusSel = arguments[3];
+var text = function(el) { return el ? el.innerText.trim() : null; };
+var texts = function(root, tag) {
+    return root ? Array.prototype.map.call(root.getElementsByTagName(tag), text) : null;
+};
+return Array.prototype.map.call(document.querySelectorAll(cardSel), function(card) {
+    var link = card.querySelector(linkSel);
+    var subtitle = card.querySelector(subtitleSel);
+    return {
+        title: text(link),
+        link: link ? link.href : null,
+        spans: texts(subtitle, 'span'),
+        strongs: texts(subtitle, 'strong'),
+        status: text(card.querySelector(statusSel))
+    };
+});
+"""
+
+
+def read_listing_cards(driver, locators, card_locator="listing_card_header"):
+    """Raw fields of every listing card on the current page, in one WebDriver call"""
+    query = lambda name: locators.locators[name].query
+    return driver.execute_script(
+        LISTING_CARDS_SCRIPT,
+        query(card_locator), query("card_title_link"), query("card_subtitle"), query("card_status"),
+    )
+
+
+def parse_result_count(text):
+    """Number of results from the listing's count line ('1,234 item(s) found'), or None"""
+    match = _COUNT.search(text or "")
+    if not match:
+        return None
+    return int(re.sub(r"\D", "", match.group()))
+
+
+def card_basic_info(row):
+    """
+    Map one raw card to the basic info fields of extract_card_basic_info, with
+    the portal dates left in *_raw fields. None if the card lacks a title link,
+    subtitle or status, like the per-card path.
+    """
+    if row["title"] is None or row["spans"] is None or row["status"] is None:
+        return None
+    spans, strongs = row["spans"], row["strongs"]
+    return {
+        "title": row["title"],
+        "link": row["link"],
+        "code": spans[0] if spans else "",
+        "type": spans[2] if len(spans) > 2 else "",
+        "opening_date_raw": strongs[0] if strongs else "",
+        "deadline_date_raw": strongs[1] if len(strongs) > 1 else "",
+        "stage": spans[-1] if spans else "",
+        "status": row["status"],
+    }
+
+
+def parse_listing_dates(infos):
+    """
+    Replace the *_raw portal dates of a page of basic infos with ISO dates in
+    one pass; each distinct date string is parsed once
+    """
+    parsed = {}
+
+    def parse(raw):
+        if raw not in parsed:
+            try:
+                parsed[raw] = parse_portal_date(raw)
+            except ValueError as e:
+                logger.warning("Unparseable date '%s' on %s: %s", raw, info.get("code"), e)
+                parsed[raw] = ""
+        return parsed[raw]
+
+    for info in infos:
+        replace_raw_dates(info, parse)
+    return infos
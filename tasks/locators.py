@@ -0,0 +1,201 @@
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Same string values as selenium's By.CSS_SELECTOR / By.XPATH, so this module
+# can be used without importing the browser stack
+CSS = "css selector"
+XPATH = "xpath"
+
+# Site selectors used by the scrapers. Each entry is (by, variants, prune).
+# Variants are alternatives for the same element and are merged into one query.
+# Only locators with prune=True drop variants that never match.
+SITE_LOCATORS = {
+    "show_more": (CSS, [
+        "sedia-show-more button",
+        "button[class*='show-more']",
+        "button[class*='expand']",
+        ".show-more",
+        "[data-toggle='collapse']",
+    ], True),
+    "listing_card_header": (CSS, ["eui-card-header"], False),
+    "listing_card": (CSS, ["eui-card"], False),
+    "card_title_link": (CSS, ["a.eui-u-text-link"], False),
+    "card_subtitle": (CSS, [".eui-card-header__title-container-subtitle"], False),
+    "card_status": (CSS, ["span.eui-label"], False),
+    # "804 item(s) found" above the listing; optional, used to notice listing shifts
+    "listing_result_count": (XPATH, [
+        "//*[contains(text(), 'item(s) found')]",
+        "//*[contains(text(), 'results found')]",
+    ], True),
+    "detail_card": (CSS, ["eui-card"], False),
+    "detail_card_title": (CSS, ["eui-card-header-title.eui-card-header__title-container-title"], False),
+    "detail_card_content": (CSS, ["eui-card-content"], False),
+    "detail_section": (CSS, ["section[id^='scroll-']"], False),
+    "detail_section_any": (CSS, ["section[id^='scroll-']", "section h2"], False),
+    "section_title": (CSS, ["h2"], False),
+    "section_content": (CSS, [
+        "div.eui-input-group",
+        "div.sedia-base",
+        "ol",
+        "ul",
+        "p",
+        "div.row",
+    ], False),
+}
+
+# Runs the combined query once (document order, no duplicates) and reports how
+# many of the returned elements each variant matched
+_ATTRIBUTE_CSS_SCRIPT = """
+var root = arguments[0] || document;
+var variants = arguments[1];
+var found = root.querySelectorAll(arguments[2]);
+var counts = variants.map(function() { return 0; });
+var elements = [];
+for (var i = 0; i < found.length; i++) {
+    elements.push(found[i]);
+    for (var j = 0; j < variants.length; j++) {
+        if (found[i].matches(variants[j])) { counts[j]++; }
+    }
+}
+return [elements, counts];
+"""
+
+_ATTRIBUTE_XPATH_SCRIPT = """
+var root = arguments[0] || document;
+var variants = arguments[1];
+var snapshot = function(expr) {
+    return document.evaluate(expr, root, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+};
+var found = snapshot(arguments[2]);
+var elements = [];
+for (var i = 0; i < found.snapshotLength; i++) { elements.push(found.snapshotItem(i)); }
+var counts = variants.map(function(v) { return snapshot(v).snapshotLength; });
+return [elements, counts];
+"""
+
+
+class Locator:
+    """A site selector compiled once from its alternative variants"""
+
+    def __init__(self, name, by, variants, prune=False, warmup=20, reprobe_every=25):
+        self.name = name
+        self.by = by
+        self.variants = list(variants)
+        self.prune = prune
+        self.warmup = warmup
+        self.reprobe_every = reprobe_every
+        self.lookups = 0
+        self.hits = {v: 0 for v in self.variants}
+        self.misses = {v: 0 for v in self.variants}
+        self.matched = {v: 0 for v in self.variants}
+        self.dead = set()
+        self._compile()
+
+    def join(self, variants):
+        """Merge variants into a single CSS group or XPath union"""
+        return (" | " if self.by == XPATH else ", ").join(variants)
+
+    def _compile(self):
+        """Build the combined query over the variants still considered live"""
+        self.live = [v for v in self.variants if v not in self.dead]
+        self.query = self.join(self.live)
+
+    def variants_for_lookup(self):
+        """Variants to query now - all of them when it is time to re-probe dead ones"""
+        if self.dead and self.lookups % self.reprobe_every == 0:
+            return self.variants
+        return self.live
+
+    def record(self, variants, counts):
+        """Update hit/miss counters and prune or revive variants"""
+        self.lookups += 1
+        changed = False
+        for variant, count in zip(variants, counts):
+            if count:
+                self.hits[variant] += 1
+                self.matched[variant] += count
+                if variant in self.dead:
+                    logger.info("Locator '%s': variant '%s' matches again, reviving it", self.name, variant)
+                    self.dead.discard(variant)
+                    changed = True
+            else:
+                self.misses[variant] += 1
+
+        if self.prune and self.lookups >= self.warmup:
+            remaining = len(self.live)
+            for variant in self.live:
+                # Always keep at least one variant to query
+                if not self.hits[variant] and remaining > 1:
+                    logger.info("Locator '%s': variant '%s' never matched, skipping it", self.name, variant)
+                    self.dead.add(variant)
+                    remaining -= 1
+                    changed = True
+        if changed:
+            self._compile()
+
+    def stats(self):
+        return {
+            "name": self.name,
+            "lookups": self.lookups,
+            "variants": [
+                {
+                    "selector": v,
+                    "hits": self.hits[v],
+                    "misses": self.misses[v],
+                    "matched": self.matched[v],
+                    "dead": v in self.dead,
+                }
+                for v in self.variants
+            ],
+        }
+
+
+class LocatorRegistry:
+    """Compiles site selectors once and tracks which variants actually match"""
+
+    def __init__(self, definitions=None):
+        self.locators = {}
+        for name, (by, variants, prune) in (definitions or SITE_LOCATORS).items():
+            self.register(name, by, variants, prune=prune)
+
+    def register(self, name, by, variants, prune=False):
+        self.locators[name] = Locator(name, by, variants, prune=prune)
+        return self.locators[name]
+
+    def find_elements(self, driver, name, parent=None):
+        """Find all elements for a registered locator in a single WebDriver call"""
+        locator = self.locators[name]
+        variants = locator.variants_for_lookup()
+        try:
+            if len(variants) == 1:
+                elements = (parent or driver).find_elements(locator.by, variants[0])
+                counts = [len(elements)]
+            else:
+                script = _ATTRIBUTE_XPATH_SCRIPT if locator.by == XPATH else _ATTRIBUTE_CSS_SCRIPT
+                elements, counts = driver.execute_script(script, parent, variants, locator.join(variants))
+        except Exception as e:
+            logger.debug("Elements not found: %s=%s, error: %s", name, variants, e)
+            return []
+        locator.record(variants, counts)
+        return elements
+
+    def find_element(self, driver, name, parent=None):
+        """First match for a registered locator, or None"""
+        elements = self.find_elements(driver, name, parent=parent)
+        return elements[0] if elements else None
+
+    def report(self):
+        return [locator.stats() for locator in self.locators.values()]
+
+    def log_report(self):
+        """Log per-variant hit/miss counts so stale selectors can be pruned"""
+        for locator in self.locators.values():
+            if not locator.lookups:
+                continue
+            for v in locator.stats()["variants"]:
+                logger.info(
+                    "Locator '%s' [%s]: hits=%s misses=%s matched=%s%s",
+                    locator.name, v['selector'], v['hits'], v['misses'], v['matched'],
+                    " (dead)" if v['dead'] else "",
+                )
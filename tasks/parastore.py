@@ -0,0 +1,161 @@
+"""
+Paragraph-deduplicated storage for scraped calls.
+
+Many calls share large boilerplate blocks (standard eligibility and
+admissibility text, legal-document lists) that calls_raw.json repeats
+verbatim. The store splits every section string into paragraphs (lines),
+keeps each distinct paragraph once, content-addressed by its hash, and has
+records reference paragraphs by position in that table. Other fields
+(title, code, dates, ...) stay inline, in the record's original key order.
+
+File layout (compact JSON):
+    {"format": "parastore/1",
+     "paragraphs": ["text", ...],
+     "records": [{"title": "...", "Topic description": {"p": [[paragraph ids], ...]}, ...}, ...]}
+
+A section list of strings is stored as {"p": ids per string}; any other
+dict value is wrapped as {"v": value} so the two cannot be confused.
+
+ParagraphStore reads a store and rebuilds the calls_raw.json record shape
+lazily: section text is only joined when a section is accessed.
+
+    write_store(calls, "calls.parastore.json")
+    for call in ParagraphStore("calls.parastore.json"):
+        call["Topic description"]
+"""
+import hashlib
+import json
+import logging
+import os
+from collections.abc import Mapping
+
+logger = logging.getLogger(__name__)
+
+FORMAT = "parastore/1"
+
+
+class ParagraphTable:
+    """Distinct paragraphs in first-seen order, keyed by content hash while writing"""
+
+    def __init__(self):
+        self.paragraphs = []
+        self.ids = {}
+        self.references = 0
+        self.reference_bytes = 0
+
+    def add(self, text):
+        self.references += 1
+        self.reference_bytes += len(text.encode("utf-8"))
+        digest = hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+        paragraph_id = self.ids.get(digest)
+        if paragraph_id is None:
+            paragraph_id = self.ids[digest] = len(self.paragraphs)
+            self.paragraphs.append(text)
+        return paragraph_id
+
+    def encode(self, text):
+        """Paragraph ids of a section string; '\\n'.join of the paragraphs restores it"""
+        return [self.add(paragraph) for paragraph in text.split("\n")]
+
+    def stats(self):
+        unique_bytes = sum(len(p.encode("utf-8")) for p in self.paragraphs)
+        return {
+            "paragraphs": self.references,
+            "unique_paragraphs": len(self.paragraphs),
+            "paragraph_bytes": self.reference_bytes,
+            "unique_paragraph_bytes": unique_bytes,
+            "dedupe_ratio": self.reference_bytes / unique_bytes if unique_bytes else 1.0,
+        }
+
+
+def _is_section(value):
+    return isinstance(value, list) and all(isinstance(item, str) for item in value)
+
+
+def encode_calls(calls, table=None):
+    """(store document, paragraph table) for a list of calls"""
+    table = table or ParagraphTable()
+    records = []
+    for call in calls:
+        record = {}
+        for key, value in call.items():
+            if _is_section(value):
+                record[key] = {"p": [table.encode(item) for item in value]}
+            elif isinstance(value, dict):
+                record[key] = {"v": value}
+            else:
+                record[key] = value
+        records.append(record)
+    return {"format": FORMAT, "paragraphs": table.paragraphs, "records": records}, table
+
+
+def write_store(calls, path):
+    """Write calls as a paragraph store; returns the dedupe stats"""
+    document, table = encode_calls(calls)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(document, f, ensure_ascii=False, separators=(",", ":"))
+    os.replace(tmp_path, path)
+    stats = table.stats()
+    logger.info("Stored %s calls in %s: %s paragraph references, %s unique (dedupe ratio %.1fx)",
+                len(calls), path, stats["paragraphs"], stats["unique_paragraphs"], stats["dedupe_ratio"])
+    return stats
+
+
+class StoredCall(Mapping):
+    """Read-only call record; section lists are rebuilt from paragraph ids on first access"""
+
+    __slots__ = ("_record", "_paragraphs", "_cache")
+
+    def __init__(self, record, paragraphs):
+        self._record = record
+        self._paragraphs = paragraphs
+        self._cache = {}
+
+    def __getitem__(self, key):
+        value = self._record[key]
+        if not isinstance(value, dict):
+            return value
+        if "v" in value:
+            return value["v"]
+        section = self._cache.get(key)
+        if section is None:
+            paragraphs = self._paragraphs
+            section = self._cache[key] = ["\n".join([paragraphs[i] for i in item]) for item in value["p"]]
+        return section
+
+    def __iter__(self):
+        return iter(self._record)
+
+    def __len__(self):
+        return len(self._record)
+
+    def to_dict(self):
+        return {key: self[key] for key in self}
+
+
+class ParagraphStore:
+    """Lazy reader for a paragraph store written by write_store"""
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, encoding="utf-8") as f:
+            document = json.load(f)
+        if document.get("format") != FORMAT:
+            raise ValueError(f"{path} is not a paragraph store ({document.get('format')!r})")
+        self.paragraphs = document["paragraphs"]
+        self.records = document["records"]
+
+    def __len__(self):
+        return len(self.records)
+
+    def __getitem__(self, index):
+        return StoredCall(self.records[index], self.paragraphs)
+
+    def __iter__(self):
+        for record in self.records:
+            yield StoredCall(record, self.paragraphs)
+
+    def calls(self):
+        """Fully materialized calls, identical to the calls_raw.json records"""
+        return [call.to_dict() for call in self]
@@ -0,0 +1,106 @@
+import logging
+import multiprocessing
+import queue
+import threading
+from concurrent.futures import ProcessPoolExecutor, wait
+
+from render import render_call
+
+logger = logging.getLogger(__name__)
+
+
+class RenderStage:
+    """
+    CPU stage between the browser (producer) and the output: DOM snapshots are
+    pushed through a bounded queue and rendered in a process pool, so the driver
+    can fetch the next page while other cores do the text processing.
+    With workers=0 snapshots are rendered inline in the calling thread.
+    """
+
+    def __init__(self, workers=None, max_pending=8):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.results = {}
+        self.next_seq = 0
+        self.futures = []
+        self.lock = threading.Lock()
+        self.executor = None
+        self.queue = None
+        self.dispatcher = None
+        if workers != 0:
+            # spawn: never fork a process that holds WebDriver/HTTP threads
+            self.executor = ProcessPoolExecutor(
+                max_workers=workers, mp_context=multiprocessing.get_context("spawn")
+            )
+            self.queue = queue.Queue(maxsize=max_pending)
+            self.slots = threading.BoundedSemaphore(max_pending)
+            self.dispatcher = threading.Thread(target=self._dispatch, name="render-dispatch", daemon=True)
+            self.dispatcher.start()
+
+    def _take_seq(self, key=None):
+        """Ordering key for a result: the caller's key, or submission order"""
+        with self.lock:
+            seq = self.next_seq if key is None else key
+            self.next_seq += 1
+        return seq
+
+    def submit(self, basic_info, snapshot, key=None):
+        """Queue a snapshot for rendering; blocks while the stage is saturated"""
+        seq = self._take_seq(key)
+        if self.executor is None:
+            self._store(seq, basic_info, lambda: render_call(basic_info, snapshot))
+        else:
+            self.queue.put((seq, basic_info, snapshot))
+        return seq
+
+    def add_rendered(self, call_data, key=None):
+        """Record a call that was already extracted elsewhere, keeping its place in the order"""
+        seq = self._take_seq(key)
+        with self.lock:
+            self.results[seq] = call_data
+        return seq
+
+    def _store(self, seq, basic_info, compute):
+        try:
+            result = compute()
+        except Exception as e:
+            logger.error("Error rendering %s: %s", basic_info.get("title"), e)
+            result = None
+        with self.lock:
+            self.results[seq] = result
+
+    def _dispatch(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                self.queue.task_done()
+                return
+            seq, basic_info, snapshot = item
+            # Bound the work handed to the pool, not just the producer queue
+            self.slots.acquire()
+            future = self.executor.submit(render_call, basic_info, snapshot)
+            future.add_done_callback(lambda f: self.slots.release())
+            with self.lock:
+                self.futures.append((seq, basic_info, future))
+            self.queue.task_done()
+
+    def drain(self):
+        """Wait for everything submitted so far; return rendered calls ordered by key"""
+        if self.queue is not None:
+            self.queue.join()
+            with self.lock:
+                pending, self.futures = self.futures, []
+            wait([future for _, _, future in pending])
+            for seq, basic_info, future in pending:
+                self._store(seq, basic_info, future.result)
+        with self.lock:
+            ready = [self.results.pop(seq) for seq in sorted(self.results)]
+        return [call for call in ready if call is not None]
+
+    def close(self):
+        if self.queue is not None:
+            self.queue.put(None)
+            self.dispatcher.join()
+            self.executor.shutdown()
+            self.queue = None
+            self.executor = None
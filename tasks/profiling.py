@@ -0,0 +1,146 @@
+"""
+Low-overhead sampling profiler for scraper runs.
+
+A background thread samples the stacks of the other threads at a fixed
+interval (sys._current_frames, no tracing hooks), so wall time is attributed
+to whatever each thread was doing: Python code, a blocking WebDriver command
+(shown as 'WebDriver:<command>') or a sleep (shown as 'sleep'). Stacks are
+written in the folded format read by flamegraph.pl and speedscope, and a
+top-N summary is logged at the end.
+
+    with profiled("profile.folded"):
+        run_scrape()
+"""
+import linecache
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+# Selenium sends every WebDriver command through this method, with the command name in a local
+_WEBDRIVER_EXECUTE = ("execute", os.path.join("selenium", "webdriver", "remote", "webdriver.py"))
+_SLEEP_CALL = "sleep("
+
+
+class SamplingProfiler:
+    """
+    Samples thread stacks every `interval` seconds and aggregates folded stacks.
+    threads limits sampling to threads with these names (None samples all).
+    """
+
+    def __init__(self, interval=0.01, max_depth=64, threads=None):
+        self.interval = interval
+        self.max_depth = max_depth
+        self.threads = set(threads) if threads else None
+        self.labels = {}
+        self.stacks = Counter()
+        self.samples = 0
+        self.started = None
+        self.elapsed = 0
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    def _label(self, code):
+        label = self.labels.get(code)
+        if label is None:
+            label = f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+            self.labels[code] = label
+        return label
+
+    def _stack(self, frame, thread_name):
+        labels = []
+        leaf = True
+        while frame is not None and len(labels) < self.max_depth:
+            code = frame.f_code
+            if code.co_name == _WEBDRIVER_EXECUTE[0] and code.co_filename.endswith(_WEBDRIVER_EXECUTE[1]):
+                # Everything below is HTTP plumbing; the command name says more
+                command = frame.f_locals.get("driver_command")
+                labels = [f"WebDriver:{command}"]
+            elif leaf:
+                line = linecache.getline(code.co_filename, frame.f_lineno).strip()
+                if _SLEEP_CALL in line:
+                    labels.append("sleep")
+                labels.append(self._label(code))
+            else:
+                labels.append(self._label(code))
+            leaf = False
+            frame = frame.f_back
+        labels.append(thread_name)
+        labels.reverse()
+        return ";".join(labels)
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self.stop_event.wait(self.interval):
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                name = names.get(ident, f"thread-{ident}")
+                if ident == own or (self.threads and name not in self.threads):
+                    continue
+                self.stacks[self._stack(frame, name)] += 1
+            self.samples += 1
+
+    def start(self):
+        self.started = time.monotonic()
+        self.thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+        self.thread.join()
+        self.elapsed = time.monotonic() - self.started
+
+    def write_folded(self, path):
+        """One 'frame;frame;frame count' line per distinct stack"""
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+    def summary(self, top=15):
+        """(self time by leaf frame, inclusive time by frame) as [(label, seconds)]"""
+        leaf = Counter()
+        inclusive = Counter()
+        for stack, count in self.stacks.items():
+            frames = stack.split(";")[1:]
+            if not frames:
+                continue
+            leaf[frames[-1]] += count
+            for label in set(frames):
+                inclusive[label] += count
+        to_seconds = lambda counter: [(label, count * self.interval) for label, count in counter.most_common(top)]
+        return to_seconds(leaf), to_seconds(inclusive)
+
+    def log_summary(self, top=15):
+        self_time, inclusive = self.summary(top)
+        logger.info("Profile: %s samples over %.1fs at %.0f ms", self.samples, self.elapsed, self.interval * 1000)
+        logger.info("Top %s by self time:", top)
+        for label, seconds in self_time:
+            logger.info("  %8.1fs  %s", seconds, label)
+        logger.info("Top %s by inclusive time:", top)
+        for label, seconds in inclusive:
+            logger.info("  %8.1fs  %s", seconds, label)
+
+
+@contextmanager
+def profiled(output="profile.folded", enabled=True, interval=0.01, top=15, threads=("MainThread",)):
+    """Profile the enclosed block (the main thread by default) and write its folded stacks to output"""
+    if not enabled:
+        yield None
+        return
+    profiler = SamplingProfiler(interval=interval, threads=threads)
+    profiler.start()
+    try:
+        yield profiler
+    finally:
+        profiler.stop()
+        try:
+            profiler.write_folded(output)
+            logger.info("Wrote folded stacks to %s (open in speedscope or flamegraph.pl)", output)
+        except Exception as e:
+            logger.error("Error writing profile: %s", e)
+        profiler.log_summary(top)
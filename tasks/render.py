@@ -0,0 +1,246 @@
+"""
+Pure-Python rendering of captured detail-page snapshots.
+
+A snapshot is the JSON-able DOM tree returned by the in-page capture script
+(or rebuilt from saved HTML). Each element node is a dict:
+    {"t": tag, "cl": class attribute, "h": href (links only), "k": [children]}
+where children are either nested nodes or raw text strings. Nothing here
+touches the browser, so these functions can run in worker processes.
+"""
+import re
+from collections import OrderedDict
+from datetime import datetime
+
+PORTAL_DATE_FORMAT = "%d %B %Y"
+
+# Tags rendered on their own line by innerText
+BLOCK_TAGS = frozenset([
+    "address", "article", "aside", "blockquote", "dd", "div", "dl", "dt", "fieldset",
+    "figcaption", "figure", "footer", "form", "h1", "h2", "h3", "h4", "h5", "h6",
+    "header", "hr", "li", "main", "nav", "ol", "p", "pre", "section", "table",
+    "tbody", "thead", "tfoot", "tr", "ul", "eui-card", "eui-card-header", "eui-card-content",
+])
+
+_SPACES = re.compile(r"[^\S\n]+")
+_SECTION_CONTENT_CLASSES = frozenset(["eui-input-group", "sedia-base", "row"])
+
+
+def normalize_text(text):
+    """Collapse runs of whitespace inside lines and drop empty lines"""
+    lines = (_SPACES.sub(" ", line).strip() for line in text.split("\n"))
+    return "\n".join(line for line in lines if line)
+
+
+def dedupe(items):
+    """Drop repeated entries while keeping first-seen order"""
+    seen = set()
+    unique = []
+    for item in items:
+        if item not in seen:
+            seen.add(item)
+            unique.append(item)
+    return unique
+
+
+def parse_portal_date(text):
+    """Convert a portal date such as '16 September 2025' to ISO format, '' if empty"""
+    text = (text or "").strip()
+    if not text:
+        return ""
+    return datetime.strptime(text, PORTAL_DATE_FORMAT).strftime("%Y-%m-%d")
+
+
+def replace_raw_dates(basic_info, parse=parse_portal_date):
+    """
+    Swap the *_raw portal dates of a basic info for parsed ones in place, each
+    at the position of its raw field, so records keep the listing field order
+    """
+    items = list(basic_info.items())
+    basic_info.clear()
+    for key, value in items:
+        if key in ("opening_date_raw", "deadline_date_raw"):
+            basic_info[key[:-len("_raw")]] = parse(value)
+        else:
+            basic_info[key] = value
+    return basic_info
+
+
+def node_text(node):
+    """Approximation of the element's innerText, cached on the node"""
+    cached = node.get("_x")
+    if cached is not None:
+        return cached
+    parts = []
+    for child in node.get("k", ()):
+        if isinstance(child, str):
+            parts.append(child)
+        elif child["t"] in BLOCK_TAGS:
+            parts.append("\n" + node_text(child) + "\n")
+        elif child["t"] == "br":
+            parts.append("\n")
+        else:
+            parts.append(node_text(child))
+    text = normalize_text("".join(parts))
+    node["_x"] = text
+    return text
+
+
+def iter_descendants(node, parents=None):
+    """Element descendants in document order (like querySelectorAll('*'))"""
+    stack = [c for c in reversed(node.get("k", ())) if not isinstance(c, str)]
+    if parents is not None:
+        for child in stack:
+            parents[id(child)] = node
+    while stack:
+        current = stack.pop()
+        yield current
+        children = [c for c in current.get("k", ()) if not isinstance(c, str)]
+        if parents is not None:
+            for child in children:
+                parents[id(child)] = current
+        stack.extend(reversed(children))
+
+
+def text_with_links(node):
+    """Snapshot counterpart of FundingOpportunitiesScraper.extract_text_with_links"""
+    parts = []
+    joined = ""
+    for child in iter_descendants(node):
+        text = node_text(child)
+        if child["t"] == "a":
+            href = child.get("h")
+            if text and href:
+                part = f"[{text}]({href})"
+            elif text:
+                part = text
+            else:
+                continue
+        elif text and text not in joined:
+            # Avoid duplicating text that's already captured by an ancestor
+            part = text
+        else:
+            continue
+        parts.append(part)
+        joined = f"{joined} {part}" if joined else part
+
+    if not parts and node_text(node):
+        parts.append(node_text(node))
+    return " ".join(parts)
+
+
+def heading_selected(title, include=None, exclude=None):
+    """
+    Section projection: True if a card or section heading passes the include
+    and exclude lists (case-insensitive substrings, like the 'General info' check)
+    """
+    title = title.lower()
+    if include and not any(heading.lower() in title for heading in include):
+        return False
+    return not (exclude and any(heading.lower() in title for heading in exclude))
+
+
+def render_card_content(content):
+    """
+    Snapshot counterpart of extract_hierarchical_content_from_card.
+    The live path's structured-header selector never matches the portal markup,
+    so only its fallback extraction is mirrored here.
+    """
+    text = text_with_links(content)
+    return {"content": [text]} if text else {"content": ["No content found"]}
+
+
+def render_card_page(cards):
+    """Render card-based detail pages; mirrors extract_all_card_details"""
+    cards_data = OrderedDict()
+    for card in cards:
+        header_title = (card.get("title") or "").strip()
+        if not header_title:
+            continue
+        # Skip 'General info' cards
+        if "General info" in header_title:
+            continue
+        content = card.get("content")
+        # Stop processing after extracting 'Partner search announcements'
+        if "Partner search announcements" in header_title:
+            if card.get("skip"):
+                break
+            if content is None:
+                cards_data["Partner search announcements"] = ["Extraction error: no card content"]
+            else:
+                cards_data.update(render_card_content(content))
+            break
+        # Left out by section projection before expansion and serialization
+        if card.get("skip"):
+            continue
+        if content is None:
+            cards_data[header_title] = ["No content available"]
+            continue
+        for section_title, section_content in render_card_content(content).items():
+            key = header_title if section_title in ["content", "error"] else section_title
+            cards_data[key] = section_content
+    return cards_data
+
+
+def _is_section_content(node):
+    """Matches 'div.eui-input-group, div.sedia-base, ol, ul, p, div.row'"""
+    tag = node["t"]
+    if tag in ("ol", "ul", "p"):
+        return True
+    return tag == "div" and not _SECTION_CONTENT_CLASSES.isdisjoint(node.get("cl", "").split())
+
+
+def render_section(section):
+    """Render one section-layout block; mirrors the loop body of extract_page_sections"""
+    parents = {}
+    elements = [n for n in iter_descendants(section, parents) if _is_section_content(n)]
+    content_list = []
+    for elem in elements:
+        elem_text = text_with_links(elem)
+        if not elem_text or len(elem_text.strip()) <= 3:
+            continue
+        labels = [n for n in iter_descendants(elem) if n["t"] == "strong"]
+        if labels:
+            # This is likely a label-value pair
+            for label in labels:
+                label_text = node_text(label)
+                parent = parents.get(id(parents.get(id(label))))
+                if parent is None:
+                    continue
+                value_text = node_text(parent).replace(label_text, "").strip()
+                if value_text:
+                    content_list.append(f"**{label_text}**: {value_text}")
+        elif elem["t"] in ("ol", "ul"):
+            for li in iter_descendants(elem):
+                if li["t"] != "li":
+                    continue
+                li_text = text_with_links(li)
+                if li_text:
+                    content_list.append(f"• {li_text}")
+        else:
+            content_list.append(elem_text)
+    return dedupe(content_list)
+
+
+def render_section_page(sections):
+    """Render section-based detail pages; mirrors extract_page_sections"""
+    sections_data = OrderedDict()
+    for section in sections:
+        section_title = (section.get("title") or "").strip()
+        if not section_title or section.get("skip"):
+            continue
+        content_list = render_section(section["content"])
+        sections_data[section_title] = content_list if content_list else ["No content found"]
+    return sections_data
+
+
+def render_snapshot(snapshot):
+    """Turn a captured detail-page snapshot into the detailed sections of a call"""
+    if snapshot.get("layout") == "sections":
+        return render_section_page(snapshot.get("sections", []))
+    return render_card_page(snapshot.get("cards", []))
+
+
+def render_call(basic_info, snapshot):
+    """Worker entry point: merge listing info with the rendered detail sections"""
+    basic_info = replace_raw_dates(dict(basic_info))
+    return {**basic_info, **render_snapshot(snapshot)}
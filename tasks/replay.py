@@ -0,0 +1,91 @@
+"""
+Offline re-extraction of archived detail pages (see archive.py).
+
+Rebuilds calls_raw.json from a page archive without a browser or network:
+every archived page is parsed back into a snapshot and rendered with the
+current render.py, in a process pool.
+
+    python -m luigi --module replay ReplayFundingOpportunities --archive-file pages.db --local-scheduler
+"""
+import json
+import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import luigi
+
+from archive import PageArchive, snapshot_from_html
+from render import render_call
+
+logger = logging.getLogger(__name__)
+
+_archive = None
+
+
+def _open_worker_archive(path):
+    global _archive
+    _archive = PageArchive(path)
+
+
+def _replay_page(job):
+    """Worker: re-extract one archived page; None if nothing could be extracted"""
+    url, digest, basic_info = job
+    try:
+        snapshot = snapshot_from_html(_archive.html(digest), url)
+        if snapshot is None:
+            logger.warning("No cards or sections found in the archived page of %s", url)
+            return None
+        return render_call(basic_info, snapshot)
+    except Exception as e:
+        logger.error("Error replaying %s: %s", url, e)
+        return None
+
+
+def replay(archive_file, output_file, workers=None):
+    """Re-extract every archived page into output_file; returns the number of calls written"""
+    started = time.monotonic()
+    archive = PageArchive(archive_file)
+    try:
+        jobs = archive.pages()
+    finally:
+        archive.close()
+    logger.info("Replaying %s archived pages from %s", len(jobs), archive_file)
+
+    if workers == 0:
+        _open_worker_archive(archive_file)
+        results = [_replay_page(job) for job in jobs]
+    else:
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_open_worker_archive,
+            initargs=(archive_file,),
+        ) as executor:
+            results = list(executor.map(_replay_page, jobs, chunksize=8))
+    calls = [call for call in results if call is not None]
+
+    output_dir = os.path.dirname(output_file)
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+    with open(output_file, "w", encoding="utf-8") as f:
+        json.dump(calls, f, indent=4, ensure_ascii=False)
+    logger.info(
+        "Replayed %s/%s calls into %s in %.1fs", len(calls), len(jobs), output_file, time.monotonic() - started
+    )
+    return len(calls)
+
+
+class ReplayFundingOpportunities(luigi.Task):
+    """Luigi task re-extracting calls from a page archive; output matches FetchFundingOpportunities"""
+
+    archive_file = luigi.Parameter(default="pages.db")
+    output_file = luigi.Parameter(default="calls_replayed.json")
+    workers = luigi.IntParameter(default=None)
+
+    def run(self):
+        replay(self.archive_file, self.output_file, self.workers)
+
+    def output(self):
+        return luigi.LocalTarget(self.output_file)
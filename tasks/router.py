@@ -0,0 +1,87 @@
+import logging
+from urllib.parse import urlparse
+
+logger = logging.getLogger(__name__)
+
+CARDS = "cards"
+SECTIONS = "sections"
+
+# Detail URL route (the path segment before the call identifier) -> page layout
+DEFAULT_ROUTES = {
+    "topic-details": CARDS,
+    "competitive-calls-cs": SECTIONS,
+}
+
+
+def route_pattern(url):
+    """The route part of a detail URL, e.g. 'topic-details' for .../topic-details/HORIZON-..."""
+    segments = [s for s in urlparse(url).path.split("/") if s]
+    if len(segments) >= 2:
+        return segments[-2]
+    return segments[0] if segments else ""
+
+
+class Route:
+    """A cached layout decision for one URL pattern"""
+
+    def __init__(self, pattern, layout, learned=False):
+        self.pattern = pattern
+        self.layout = layout
+        self.learned = learned
+        self.hits = 0
+        self.misses = 0
+
+
+class PageRouter:
+    """
+    Picks the extraction strategy for a detail page from its URL instead of
+    probing the page. Unknown patterns are learned from the first detection;
+    a cached layout that finds nothing is re-detected and replaced.
+    """
+
+    def __init__(self, routes=None):
+        self.routes = {}
+        self.detections = 0
+        for pattern, layout in (routes or DEFAULT_ROUTES).items():
+            self.routes[pattern] = Route(pattern, layout)
+
+    def route(self, url):
+        """Cached layout for the URL's pattern, or None if it has to be detected"""
+        route = self.routes.get(route_pattern(url))
+        return route.layout if route else None
+
+    def hit(self, url):
+        """The routed layout extracted the page"""
+        route = self.routes.get(route_pattern(url))
+        if route:
+            route.hits += 1
+
+    def miss(self, url):
+        """The routed layout found nothing; the page falls back to detection"""
+        route = self.routes.get(route_pattern(url))
+        if route:
+            route.misses += 1
+            logger.warning("Route '%s' (%s) found nothing on %s, detecting layout", route.pattern, route.layout, url)
+
+    def learn(self, url, layout):
+        """Cache the layout detected on a page for every URL with the same pattern"""
+        self.detections += 1
+        if layout not in (CARDS, SECTIONS):
+            return
+        pattern = route_pattern(url)
+        route = self.routes.get(pattern)
+        if route is None or route.layout != layout:
+            logger.info("Routing '%s' pages to the %s layout", pattern, layout)
+            self.routes[pattern] = Route(pattern, layout, learned=True)
+        self.routes[pattern].hits += 1
+
+    def log_report(self):
+        """Log how often each route was used and how often detection was still needed"""
+        for route in self.routes.values():
+            if not (route.hits or route.misses):
+                continue
+            logger.info(
+                "Route '%s' -> %s: hits=%s misses=%s%s",
+                route.pattern, route.layout, route.hits, route.misses, " (learned)" if route.learned else "",
+            )
+        logger.info("Layout detections: %s", self.detections)
@@ -0,0 +1,142 @@
+import json
+import logging
+import os
+import sys
+from collections import deque
+
+TEXT_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+
+# Per-event sampling rates used unless SCRAPER_LOG_SAMPLE overrides them.
+# Records that are sampled out are not lost: they are kept in the ring buffer
+# and written out if an error follows. A rate of 0 drops an event from the
+# normal output entirely, so defaults stay above it.
+DEFAULT_SAMPLE_RATES = {
+    "detail.card": 0.1,
+    "detail.section": 0.1,
+    "detail.expand": 0.1,
+    "listing.card": 0.2,
+    "listing.status_distribution": 0.3,
+}
+
+
+def event(name, **fields):
+    """Build the `extra` dict for a structured log call"""
+    return {"event": name, "fields": fields}
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, with the event name and structured fields"""
+
+    def format(self, record):
+        payload = {
+            "ts": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "event": getattr(record, "event", None),
+            "msg": record.getMessage(),
+        }
+        fields = getattr(record, "fields", None)
+        if fields:
+            payload.update(fields)
+        if getattr(record, "replayed", False):
+            payload["replayed"] = True
+        if record.exc_info:
+            payload["exc"] = self.formatException(record.exc_info)
+        return json.dumps(payload, ensure_ascii=False, default=str)
+
+
+class EventSampler:
+    """Keeps every Nth record of each event type; warnings and above always pass"""
+
+    def __init__(self, rates=None, default_rate=1.0):
+        self.rates = dict(DEFAULT_SAMPLE_RATES if rates is None else rates)
+        self.default_rate = default_rate
+        self.seen = {}
+
+    def keep(self, record):
+        if record.levelno >= logging.WARNING:
+            return True
+        name = getattr(record, "event", None)
+        rate = self.rates.get(name, self.default_rate)
+        if rate >= 1:
+            return True
+        if rate <= 0:
+            return False
+        count = self.seen.get(name, 0)
+        self.seen[name] = count + 1
+        return count % round(1 / rate) == 0
+
+
+class SampledRingHandler(logging.Handler):
+    """
+    Forwards sampled records to a target handler and keeps the rest in a bounded
+    ring buffer, which is only written out when an error is logged
+    """
+
+    def __init__(self, target, sampler, emit_level=logging.INFO, capacity=2000):
+        super().__init__(level=logging.DEBUG)
+        self.target = target
+        self.sampler = sampler
+        self.emit_level = emit_level
+        self.buffer = deque(maxlen=capacity)
+
+    def emit(self, record):
+        if record.levelno >= logging.ERROR and self.buffer:
+            self.dump()
+        if record.levelno >= self.emit_level and self.sampler.keep(record):
+            self.target.handle(record)
+        else:
+            self.buffer.append(record)
+
+    def dump(self):
+        """Write out the buffered context records, oldest first"""
+        records, self.buffer = list(self.buffer), deque(maxlen=self.buffer.maxlen)
+        for record in records:
+            record.replayed = True
+            self.target.handle(record)
+
+    def setFormatter(self, fmt):
+        self.target.setFormatter(fmt)
+
+    def close(self):
+        self.target.close()
+        super().close()
+
+
+def _parse_rates(spec):
+    """Parse 'event=rate,event=rate' into a dict"""
+    rates = dict(DEFAULT_SAMPLE_RATES)
+    for part in filter(None, (p.strip() for p in spec.split(","))):
+        name, _, rate = part.partition("=")
+        rates[name.strip()] = float(rate)
+    return rates
+
+
+def configure_logging(fmt=None, sample_rates=None, ring_size=None, level=logging.INFO, stream=None):
+    """
+    Configure the root logger for a scraper run.
+    fmt is 'text' (the historical format) or 'json'; defaults come from the
+    SCRAPER_LOG_FORMAT, SCRAPER_LOG_SAMPLE and SCRAPER_LOG_RING environment variables.
+    """
+    fmt = fmt or os.environ.get("SCRAPER_LOG_FORMAT", "text")
+    if sample_rates is None:
+        sample_rates = _parse_rates(os.environ.get("SCRAPER_LOG_SAMPLE", ""))
+    if ring_size is None:
+        ring_size = int(os.environ.get("SCRAPER_LOG_RING", "2000"))
+
+    target = logging.StreamHandler(stream or sys.stderr)
+    target.setFormatter(JsonFormatter() if fmt == "json" else logging.Formatter(TEXT_FORMAT))
+    handler = SampledRingHandler(target, EventSampler(sample_rates), emit_level=level, capacity=ring_size)
+
+    root = logging.getLogger()
+    for existing in [h for h in root.handlers if isinstance(h, SampledRingHandler)]:
+        root.removeHandler(existing)
+    root.addHandler(handler)
+    # Keep per-command WebDriver/HTTP chatter out of the buffer
+    for noisy in ("selenium", "urllib3"):
+        logging.getLogger(noisy).setLevel(max(level, logging.INFO))
+    # The root logger passes DEBUG on so the ring buffer holds the context before an
+    # error; the handler's emit_level decides what is written out. Without a buffer
+    # there is nothing to keep, so the root logger drops records below the run's level.
+    root.setLevel(logging.DEBUG if ring_size > 0 else level)
+    return handler
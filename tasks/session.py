@@ -0,0 +1,153 @@
+"""
+Portal session state carried over to new browser sessions.
+
+The first driver pays the portal setup (cookie banner, 'Closed' status
+filter). PortalSession then captures its cookies, localStorage and
+sessionStorage and injects them into every later driver before its first
+page load: cookies through the DevTools Network domain, storage and the
+cookie banner hiding through a script that runs at the start of every
+document. The scraper validates the restored session on the first listing
+page and falls back to the full setup (and a fresh capture) if it fails.
+
+Cookies are browser-wide, but the start-of-document script only applies to
+the tab it was registered in, so every extra tab (detail tabs, the CDP
+backend's tab) registers it again through apply_to_tab / init_script.
+"""
+import json
+import logging
+import os
+import time
+
+logger = logging.getLogger(__name__)
+
+# Key marking that storage was restored in this browsing session; never captured
+_RESTORED_KEY = "__scraper_session_restored"
+
+_CAPTURE_STORAGE_SCRIPT = """
+var skip = arguments[0];
+var copy = function(storage) {
+    var items = {};
+    for (var i = 0; i < storage.length; i++) {
+        var key = storage.key(i);
+        if (key !== skip) { items[key] = storage.getItem(key); }
+    }
+    return items;
+};
+return {origin: location.origin, local: copy(window.localStorage), session: copy(window.sessionStorage)};
+"""
+
+# Runs before the page's own scripts in every new document of the tab
+_RESTORE_SCRIPT = """
+(function(state, bannerSelector, marker) {
+    var hide = document.createElement('style');
+    hide.textContent = bannerSelector + ' { display: none !important; }';
+    var root = document.head || document.documentElement;
+    if (root) { root.appendChild(hide); }
+    if (location.origin !== state.origin) { return; }
+    try {
+        if (sessionStorage.getItem(marker)) { return; }
+        Object.keys(state.local).forEach(function(key) { localStorage.setItem(key, state.local[key]); });
+        Object.keys(state.session).forEach(function(key) { sessionStorage.setItem(key, state.session[key]); });
+        sessionStorage.setItem(marker, '1');
+    } catch (e) {}
+})(%s, %s, %s);
+"""
+
+COOKIE_BANNER = "div.wt-cck--container"
+_COOKIE_PARAM_KEYS = ("name", "value", "domain", "path", "secure", "httpOnly", "sameSite", "expires")
+
+
+class PortalSession:
+    """Cookies and web storage of a set-up portal session, optionally persisted to a JSON file"""
+
+    def __init__(self, path=None, max_age=12 * 3600):
+        self.path = path
+        self.max_age = max_age
+        self.state = None
+        if path and os.path.exists(path):
+            self.load()
+
+    @property
+    def available(self):
+        return self.state is not None and time.time() - self.state["captured_at"] < self.max_age
+
+    def load(self):
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                self.state = json.load(f)
+            logger.info("Loaded portal session from %s", self.path)
+        except Exception as e:
+            logger.warning("Could not load portal session from %s: %s", self.path, e)
+            self.state = None
+
+    def save(self):
+        if not self.path:
+            return
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.state, f)
+        os.replace(tmp_path, self.path)
+
+    def capture(self, driver):
+        """Record the session of a driver that has just completed the portal setup"""
+        try:
+            cookies = driver.execute_cdp_cmd("Network.getAllCookies", {})["cookies"]
+        except Exception as e:
+            logger.debug("Network.getAllCookies failed, reading the current domain's cookies: %s", e)
+            cookies = [_cdp_cookie(cookie) for cookie in driver.get_cookies()]
+        storage = driver.execute_script(_CAPTURE_STORAGE_SCRIPT, _RESTORED_KEY)
+        self.state = {"captured_at": time.time(), "cookies": cookies, **storage}
+        try:
+            self.save()
+        except Exception as e:
+            logger.warning("Could not save portal session to %s: %s", self.path, e)
+        logger.info("Captured portal session: %s cookies, %s localStorage items", len(cookies), len(storage["local"]))
+
+    def init_script(self):
+        """Source of the start-of-document script restoring storage and hiding the banner, or None"""
+        if not self.available:
+            return None
+        storage = {"origin": self.state["origin"], "local": self.state["local"], "session": self.state["session"]}
+        return _RESTORE_SCRIPT % (json.dumps(storage), json.dumps(COOKIE_BANNER), json.dumps(_RESTORED_KEY))
+
+    def apply(self, driver):
+        """Inject the captured session into a fresh driver before it loads any page; True on success"""
+        if not self.available:
+            return False
+        try:
+            cookies = [_cookie_param(cookie) for cookie in self.state["cookies"]]
+            if cookies:
+                driver.execute_cdp_cmd("Network.setCookies", {"cookies": cookies})
+            driver.execute_cdp_cmd("Page.addScriptToEvaluateOnNewDocument", {"source": self.init_script()})
+            return True
+        except Exception as e:
+            logger.warning("Could not restore the portal session: %s", e)
+            return False
+
+    def apply_to_tab(self, driver):
+        """Register the start-of-document script in the driver's current tab, e.g. one it just opened"""
+        source = self.init_script()
+        if source is None:
+            return False
+        try:
+            driver.execute_cdp_cmd("Page.addScriptToEvaluateOnNewDocument", {"source": source})
+            return True
+        except Exception as e:
+            logger.debug("Could not restore the portal session in a new tab: %s", e)
+            return False
+
+
+def _cookie_param(cookie):
+    """Network.getAllCookies entry -> Network.CookieParam (session cookies carry no expiry)"""
+    param = {key: value for key, value in cookie.items() if key in _COOKIE_PARAM_KEYS}
+    if cookie.get("session") or param.get("expires", 0) < 0:
+        param.pop("expires", None)
+    return param
+
+
+def _cdp_cookie(cookie):
+    """Selenium cookie dict -> DevTools Network.CookieParam"""
+    converted = {key: cookie[key] for key in ("name", "value", "domain", "path", "secure", "httpOnly", "sameSite") if key in cookie}
+    if "expiry" in cookie:
+        converted["expires"] = cookie["expiry"]
+    return converted
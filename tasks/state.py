@@ -0,0 +1,287 @@
+"""
+Crawl state and deadline-aware ordering of detail scrapes.
+
+CrawlState remembers, per call link, when the call was last seen on a listing
+page and when its detail page was last scraped, plus a high-water mark (the
+newest opening date and the call codes seen at it) for incremental crawls of
+the startDate-sorted listing. DetailQueue orders detail work so the most
+time-critical calls are scraped first: closest upcoming deadline, then Open
+before Forthcoming, then the call whose data is oldest. crawl_by_priority runs
+one listing sweep plus its detail scrapes against the state; the --priority
+task and the daemon's refreshes share it.
+"""
+import heapq
+import json
+import logging
+import os
+import sqlite3
+import time
+from datetime import date
+
+from cursor import ListingCursor
+from runlog import event
+
+logger = logging.getLogger(__name__)
+
+# Portal status labels in detail-scrape order, matched as prefixes because the
+# portal shows e.g. "Open For Submission"; anything else (Closed) ranks last
+STATUS_RANK = ("Open", "Forthcoming")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS calls (
+    link TEXT PRIMARY KEY,
+    code TEXT,
+    status TEXT,
+    deadline_date TEXT,
+    last_seen REAL,
+    last_scraped REAL
+);
+CREATE TABLE IF NOT EXISTS watermark (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    opening_date TEXT NOT NULL,
+    codes TEXT NOT NULL
+);
+"""
+
+
+class CrawlState:
+    """Per-call crawl bookkeeping persisted in SQLite between runs"""
+
+    def __init__(self, path):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.executescript(_SCHEMA)
+
+    def mark_seen(self, infos):
+        """Record calls found on a listing page; returns (link, code, old, new) status changes"""
+        if not infos:
+            return []
+        now = time.time()
+        old = dict(self.conn.execute(
+            f"SELECT link, status FROM calls WHERE link IN ({', '.join('?' * len(infos))})",
+            [i["link"] for i in infos],
+        ).fetchall())
+        changes = [
+            (i["link"], i.get("code"), old[i["link"]], i.get("status"))
+            for i in infos if i["link"] in old and i.get("status") and old[i["link"]] != i.get("status")
+        ]
+        # Fields a caller does not have (None) keep their stored value
+        with self.conn:
+            self.conn.executemany(
+                "INSERT INTO calls (link, code, status, deadline_date, last_seen) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT(link) DO UPDATE SET code = COALESCE(excluded.code, code), "
+                "status = COALESCE(excluded.status, status), "
+                "deadline_date = COALESCE(excluded.deadline_date, deadline_date), last_seen = excluded.last_seen",
+                [(i["link"], i.get("code"), i.get("status"), i.get("deadline_date"), now) for i in infos],
+            )
+        return changes
+
+    def close_unseen(self, since, status="Closed"):
+        """
+        After a complete listing sweep: calls not seen since `since` have left the
+        open/forthcoming listing. Returns their (link, code, old, new) status changes.
+        """
+        rows = self.conn.execute(
+            "SELECT link, code, status FROM calls WHERE last_seen < ? AND status IS NOT ?", (since, status)
+        ).fetchall()
+        with self.conn:
+            self.conn.execute("UPDATE calls SET status = ? WHERE last_seen < ?", (status, since))
+        return [(link, code, old, status) for link, code, old in rows]
+
+    def mark_scraped(self, calls):
+        """Record calls whose detail pages were scraped"""
+        now = time.time()
+        with self.conn:
+            self.conn.executemany(
+                "UPDATE calls SET last_scraped = ? WHERE link = ?", [(now, call["link"]) for call in calls]
+            )
+
+    def last_scraped(self):
+        """link -> last detail scrape time (None if never scraped)"""
+        return dict(self.conn.execute("SELECT link, last_scraped FROM calls").fetchall())
+
+    def known_links(self):
+        """Links of calls whose detail pages have been scraped before"""
+        return {row[0] for row in self.conn.execute("SELECT link FROM calls WHERE last_scraped IS NOT NULL")}
+
+    def watermark(self):
+        """(newest opening_date, codes opened on that date) from earlier runs, or (None, empty set)"""
+        row = self.conn.execute("SELECT opening_date, codes FROM watermark WHERE id = 1").fetchone()
+        return (row[0], set(json.loads(row[1]))) if row else (None, set())
+
+    def advance_watermark(self, infos):
+        """Move the high-water mark to the newest opening date among infos"""
+        dated = [i for i in infos if i.get("opening_date")]
+        if not dated:
+            return self.watermark()
+        newest = max(i["opening_date"] for i in dated)
+        codes = {i.get("code") for i in dated if i["opening_date"] == newest}
+        current, current_codes = self.watermark()
+        if current and current > newest:
+            return current, current_codes
+        if current == newest:
+            codes |= current_codes
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO watermark VALUES (1, ?, ?)", (newest, json.dumps(sorted(codes)))
+            )
+        logger.info("Watermark: %s calls opened on %s", len(codes), newest)
+        return newest, codes
+
+    def close(self):
+        self.conn.commit()
+        self.conn.close()
+
+
+def is_known(basic_info, known_links, watermark):
+    """
+    True if a listed call was handled by an earlier run: its detail page was
+    scraped, or it opened before the watermark (or on it, with a known code)
+    """
+    if basic_info["link"] in known_links:
+        return True
+    mark, codes = watermark
+    opening = basic_info.get("opening_date")
+    if not mark or not opening:
+        return False
+    return opening < mark or (opening == mark and basic_info.get("code") in codes)
+
+
+def merge_calls(calls, new_calls, status_changes=()):
+    """
+    Dataset calls after a refresh: newly scraped calls first in listing order,
+    then the known calls with their listing status updated
+    """
+    statuses = {link: new for link, _, _, new in status_changes}
+    fresh = {call["link"] for call in new_calls}
+    merged = list(new_calls)
+    for call in calls:
+        if call["link"] in fresh:
+            continue
+        if call["link"] in statuses and call.get("status") != statuses[call["link"]]:
+            call = {**call, "status": statuses[call["link"]]}
+        merged.append(call)
+    return merged
+
+
+def save_calls(calls, output_file):
+    """Write calls as the calls_raw.json dataset, replacing the file atomically"""
+    output_dir = os.path.dirname(output_file)
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+    tmp_file = f"{output_file}.tmp"
+    with open(tmp_file, "w", encoding="utf-8") as f:
+        json.dump(calls, f, indent=4, ensure_ascii=False)
+    os.replace(tmp_file, output_file)
+
+
+def detail_priority(basic_info, last_scraped=None, today=None):
+    """
+    Sort key for a call's detail scrape: days to an upcoming deadline (calls
+    without one, or already past it, go last), Open before Forthcoming, then
+    least recently scraped first
+    """
+    today = today or date.today()
+    try:
+        days = (date.fromisoformat(basic_info.get("deadline_date") or "") - today).days
+    except ValueError:
+        days = None
+    closeness = days if days is not None and days >= 0 else float("inf")
+    return (closeness, status_rank(basic_info.get("status")), last_scraped or 0)
+
+
+def status_rank(status):
+    """Position of a portal status label in STATUS_RANK, len(STATUS_RANK) if unranked"""
+    status = status or ""
+    return next((rank for rank, label in enumerate(STATUS_RANK) if status.startswith(label)), len(STATUS_RANK))
+
+
+class DetailQueue:
+    """Priority queue of (page, index, basic_info) detail entries"""
+
+    def __init__(self, state=None, today=None):
+        self.heap = []
+        self.seq = 0
+        self.today = today or date.today()
+        self.scraped = state.last_scraped() if state is not None else {}
+
+    def push(self, page, index, basic_info):
+        priority = detail_priority(basic_info, self.scraped.get(basic_info["link"]), self.today)
+        # seq keeps listing order among equal priorities and avoids comparing dicts
+        heapq.heappush(self.heap, (priority, self.seq, (page, index, basic_info)))
+        self.seq += 1
+
+    def pop_batch(self, size):
+        """Up to size most urgent entries"""
+        return [heapq.heappop(self.heap)[2] for _ in range(min(size, len(self.heap)))]
+
+    def __len__(self):
+        return len(self.heap)
+
+
+def crawl_by_priority(scraper, state, page_size=50, max_pages=None, incremental=False, full_sweep=False,
+                      batch_size=10, on_batch=None):
+    """
+    Sweep the listing, then scrape detail pages in deadline priority order.
+
+    Listing pages are read through a ListingCursor and every card is recorded
+    with mark_seen. Incremental crawls only queue calls that is_known does not
+    cover and, unless full_sweep, stop paginating at the first full page of
+    known calls; a complete full sweep closes the calls that are no longer
+    listed. on_batch(calls) runs after each scraped batch. The watermark only
+    moves once every queued call was scraped.
+    Returns (new calls in listing order, status changes, pages read).
+    """
+    started = time.time()
+    queue = DetailQueue(state)
+    known = state.known_links() if incremental else set()
+    watermark = state.watermark() if incremental else (None, set())
+    listed = []
+    changes = []
+    positions = {}
+    pages = 0
+    complete = True
+    cursor = ListingCursor(scraper.list_page, page_size, max_pages, result_count=scraper.result_count)
+    for page_num, entries, total in cursor:
+        # Re-fetched boundary pages come back with an earlier page number
+        forward = page_num > pages
+        pages = max(pages, page_num)
+        infos = [basic_info for _, basic_info in entries]
+        listed.extend(infos)
+        changes.extend(state.mark_seen(infos))
+        new = [(index, basic_info) for index, basic_info in entries if not is_known(basic_info, known, watermark)]
+        for index, basic_info in new:
+            positions.setdefault(basic_info["link"], (page_num, index))
+            queue.push(page_num, index, basic_info)
+        if incremental:
+            logger.info("Page %s: %s new of %s calls", page_num, len(new), len(entries),
+                        extra=event("listing.incremental", page=page_num, new=len(new), listed=len(entries)))
+            # The listing is sorted by start date, so a page of known calls means the rest are known too
+            if forward and not new and not full_sweep and total >= page_size:
+                logger.info("Page %s contains only known calls, stopping pagination", page_num)
+                complete = False
+                break
+    cursor.log_report()
+    if max_pages and pages >= max_pages:
+        complete = False
+    if full_sweep and complete:
+        changes.extend(state.close_unseen(started))
+
+    scheduled = len(queue)
+    logger.info("Scraping %s detail pages by deadline priority", scheduled)
+    new_calls = []
+    while queue:
+        batch = queue.pop_batch(max(batch_size, scraper.tabs))
+        calls = scraper.scrape_details([(index, basic_info, page) for page, index, basic_info in batch],
+                                       total=scheduled)
+        state.mark_scraped(calls)
+        new_calls.extend(calls)
+        if on_batch is not None:
+            on_batch(calls)
+        logger.info("Scraped %s/%s detail pages", len(new_calls), scheduled,
+                    extra=event("detail.batch", calls=len(calls), done=len(new_calls)))
+    state.advance_watermark(listed)
+
+    # Same order as a page-by-page crawl
+    new_calls.sort(key=lambda call: positions.get(call["link"], (float("inf"), 0)))
+    return new_calls, changes, pages
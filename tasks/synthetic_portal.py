@@ -0,0 +1,495 @@
+"""
+Synthetic funding portal for scale and soak testing.
+
+SyntheticPortal serves listing and detail pages with the markup the scraper
+relies on (eui-card listing cards with the 'Go to next page' button, cookie
+banner and 'Submission status' filter; eui-card detail pages with
+sedia-show-more toggles; section[id^='scroll-'] pages) for any number of
+generated calls, including closed ones. Calls are generated from their index
+and a seed, so tens of thousands of calls cost no memory and every run sees
+the same data. Server latency, client-side render delay, an error rate and
+calls published while a crawl runs are configurable.
+
+    # a portal with the full historical archive
+    python synthetic_portal.py serve --calls 40000 --latency-ms 150 --render-ms 300
+    python -m luigi --module extract FetchFundingOpportunities --listing-url <printed url> --local-scheduler
+
+    # repeated crawls for hours, reporting throughput, memory growth and failures
+    python synthetic_portal.py soak --calls 20000 --hours 6 --max-pages 4 --report soak.jsonl
+"""
+import argparse
+import html
+import json
+import logging
+import os
+import random
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlencode, urlparse
+
+from runlog import configure_logging, event
+from watchdog import process_tree_rss
+
+logger = logging.getLogger(__name__)
+
+# Submission status filter values used in portal URLs
+FORTHCOMING = "31094501"
+OPEN = "31094502"
+CLOSED = "31094503"
+STATUS_CODES = {FORTHCOMING: "Forthcoming", OPEN: "Open For Submission", CLOSED: "Closed"}
+# Listing fields of a scraped call; a call with nothing else lost its detail page
+BASIC_FIELDS = {"title", "link", "code", "type", "stage", "status", "opening_date", "deadline_date"}
+LISTING_PATH = "/portal/screen/opportunities/calls-for-proposals"
+
+PROGRAMMES = ["HORIZON", "DIGITAL", "LIFE", "CEF", "ERASMUS", "EU4H", "SMP", "CREA"]
+ACTION_TYPES = ["HORIZON-RIA", "HORIZON-IA", "HORIZON-CSA", "DIGITAL-SIMPLE", "LIFE-SAP", "CEF-PJG"]
+STAGES = ["Single-stage", "Two-stage"]
+WORDS = (
+    "research innovation digital climate energy health data resilience transition "
+    "industrial platform network capacity sustainable urban rural market skills "
+    "infrastructure circular security ecosystem deployment pilot cross-border"
+).split()
+
+# Shared boilerplate, repeated verbatim across calls like the real portal's standard conditions
+BOILERPLATE = [
+    "Eligible countries: described in Annex B of the Work Programme General Annexes.",
+    "A number of non-EU/non-Associated Countries that are not automatically eligible for funding have made specific provisions for making funding available for their participants in Horizon Europe projects.",
+    "Other eligibility conditions: described in Annex B of the Work Programme General Annexes.",
+    "Financial and operational capacity and exclusion: described in Annex C of the Work Programme General Annexes.",
+    "Submission and evaluation processes: described in Annex F of the Work Programme General Annexes and the Online Manual.",
+    "Legal and financial set-up of the Grant Agreements: described in Annex G of the Work Programme General Annexes.",
+]
+DOCUMENTS = [
+    "Standard application form", "Detailed budget table", "Evaluation form", "Model Grant Agreement",
+    "Funding & Tenders Portal Online Manual", "Rules for Legal Entity Validation", "Programme Guide",
+]
+
+PAGE = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>{title}</title></head>
+<body>
+<template id="app">{body}</template>
+<script>
+// Rendered client side after a delay, like the portal's Angular app
+setTimeout(function() {{
+    document.body.appendChild(document.getElementById('app').content.cloneNode(true));
+}}, {render_ms});
+</script>
+</body></html>
+"""
+
+SHOW_MORE = """<sedia-show-more><div class="show-more-content" style="display:none">{hidden}</div>
+<button type="button" aria-expanded="false" onclick="this.previousElementSibling.style.display='block';this.setAttribute('aria-expanded','true');this.style.display='none';">Show more</button></sedia-show-more>"""
+
+
+def portal_date(day):
+    return day.strftime("%d %B %Y")
+
+
+def call_dates(seed, index, total, today):
+    """(opening, deadline, rng) of a generated call; cheap enough to filter the whole archive"""
+    rng = random.Random(seed * 1000003 + index)
+    # Newest first: index 0 opens soonest; the archive spans about five years
+    opening = today + timedelta(days=45) - timedelta(days=int(index * 5 * 365 / max(total, 1)))
+    return opening, opening + timedelta(days=rng.randint(30, 200)), rng
+
+
+def call_status(opening, deadline, today):
+    if opening > today:
+        return "Forthcoming"
+    return "Closed" if deadline < today else "Open For Submission"
+
+
+class SyntheticCall:
+    """One generated call; everything derives from (seed, index)"""
+
+    def __init__(self, seed, index, total, today, section_ratio):
+        self.opening, self.deadline, rng = call_dates(seed, index, total, today)
+        self.status = call_status(self.opening, self.deadline, today)
+        self.index = index
+        programme = PROGRAMMES[index % len(PROGRAMMES)]
+        # Calls published while the server runs have negative indexes
+        serial = f"{index:06d}" if index >= 0 else f"N{-index:05d}"
+        self.code = f"{programme}-{2021 + (index * 7) % 6}-SYN-{serial}"
+        self.title = " ".join(rng.choice(WORDS) for _ in range(rng.randint(4, 9))).capitalize()
+        self.type = rng.choice(ACTION_TYPES)
+        self.stage = rng.choice(STAGES)
+        self.sections = rng.random() < section_ratio
+        self.budget = rng.randint(5, 400) * 100000
+        self.paragraphs = [
+            " ".join(rng.choice(WORDS) for _ in range(rng.randint(25, 80))).capitalize() + "."
+            for _ in range(rng.randint(2, 6))
+        ]
+
+    def path(self):
+        route = "competitive-calls-cs" if self.sections else "topic-details"
+        return f"/portal/screen/opportunities/{route}/{self.code}"
+
+
+class SyntheticPortal:
+    """Generates and serves a portal of `calls` calls (see module docstring)"""
+
+    def __init__(self, calls=800, seed=1, latency_ms=0, jitter_ms=0, render_ms=200, error_rate=0.0,
+                 section_ratio=0.1, publish_every=0, today=None):
+        self.total = calls
+        self.seed = seed
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.render_ms = render_ms
+        self.error_rate = error_rate
+        self.section_ratio = section_ratio
+        # Seconds between calls published while the server runs (0 = a static listing)
+        self.publish_every = publish_every
+        self.today = today or date.today()
+        self.started = time.monotonic()
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.errors = 0
+        self.filtered = {}
+        self.server = None
+
+    def published(self):
+        """Calls published since the server started; they get negative indexes, newest first"""
+        if not self.publish_every:
+            return 0
+        return int((time.monotonic() - self.started) / self.publish_every)
+
+    def call(self, index):
+        return SyntheticCall(self.seed, index, self.total, self.today, self.section_ratio)
+
+    def listed(self, statuses):
+        """Indexes of the calls matching a status filter, newest first"""
+        key = frozenset(statuses)
+        indexes = self.filtered.get(key)
+        if indexes is None:
+            indexes = self.filtered[key] = [
+                i for i in range(self.total)
+                if call_status(*call_dates(self.seed, i, self.total, self.today)[:2], self.today) in key
+            ]
+        published = self.published()
+        return list(range(-published, 0)) + indexes if published and "Forthcoming" in key else indexes
+
+    def listing_url(self, closed=False, page_size=50):
+        """First listing page, in the shape of browser.LISTING_URL"""
+        statuses = [FORTHCOMING, OPEN] + ([CLOSED] if closed else [])
+        query = urlencode({"order": "DESC", "pageNumber": 1, "pageSize": page_size, "sortBy": "startDate",
+                           "isExactMatch": "true", "status": ",".join(statuses)})
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}{LISTING_PATH}?{query}"
+
+    def expected(self, closed=False, max_pages=None, page_size=50):
+        """Number of calls a crawl of listing_url(closed) should return"""
+        statuses = {"Forthcoming", "Open For Submission"} | ({"Closed"} if closed else set())
+        count = len(self.listed(statuses))
+        return min(count, max_pages * page_size) if max_pages else count
+
+    def _render(self, title, body):
+        return PAGE.format(title=html.escape(title), body=body, render_ms=self.render_ms)
+
+    def listing_page(self, query):
+        statuses = [STATUS_CODES[c] for c in query.get("status", f"{FORTHCOMING},{OPEN}").split(",") if c in STATUS_CODES]
+        page = max(1, int(query.get("pageNumber", 1)))
+        page_size = max(1, int(query.get("pageSize", 50)))
+        indexes = self.listed(statuses)
+        cards = []
+        for index in indexes[(page - 1) * page_size:page * page_size]:
+            call = self.call(index)
+            cards.append(
+                "<eui-card><eui-card-header>"
+                f'<eui-card-header-title class="eui-card-header__title-container-title">'
+                f'<a class="eui-u-text-link" href="{call.path()}">{html.escape(call.title)}</a></eui-card-header-title>'
+                f'<div class="eui-card-header__title-container-subtitle"><span>{call.code}</span> | '
+                f"<span>{call.code.split('-')[0]}</span> | <span>{call.type}</span> | <span>{call.stage}</span>"
+                f"<div>Opening date: <strong>{portal_date(call.opening)}</strong> "
+                f"Deadline date: <strong>{portal_date(call.deadline)}</strong></div></div>"
+                f'<span class="eui-label">{call.status}</span>'
+                "</eui-card-header></eui-card>"
+            )
+        last = page * page_size >= len(indexes)
+        next_query = dict(query, pageNumber=page + 1)
+        closed_checked = " checked" if "Closed" in statuses else ""
+        without_closed = dict(query, status=",".join(c for c in query.get("status", "").split(",") if c != CLOSED), pageNumber=1)
+        body = (
+            '<div class="wt-cck--container">This site uses cookies. <button type="button">Accept</button></div>'
+            '<button type="button" onclick="var p=document.getElementById(\'status-filter\');p.style.display=p.style.display===\'none\'?\'block\':\'none\';">'
+            "<span>Submission status</span></button>"
+            '<div id="status-filter" style="display:none">'
+            f'<input type="checkbox" id="status-closed"{closed_checked} '
+            f"onchange=\"location.href='{LISTING_PATH}?{urlencode(without_closed)}'\">"
+            '<label class="eui-label" for="status-closed">Closed</label></div>'
+            f"<div>{len(indexes)} item(s) found</div>"
+            + "".join(cards)
+            + f'<button type="button" aria-disabled="{"true" if last else "false"}" '
+            f"onclick=\"location.href='{LISTING_PATH}?{urlencode(next_query)}'\">"
+            '<eui-icon-svg icon="eui-caret-right" aria-label="Go to next page">&gt;</eui-icon-svg></button>'
+        )
+        return self._render("Calls for proposals", body)
+
+    def _card(self, title, content):
+        return (
+            "<eui-card><eui-card-header>"
+            f'<eui-card-header-title class="eui-card-header__title-container-title">{title}</eui-card-header-title>'
+            f"</eui-card-header><eui-card-content>{content}</eui-card-content></eui-card>"
+        )
+
+    def detail_page(self, code):
+        try:
+            serial = code.rsplit("-", 1)[1]
+            index = -int(serial[1:]) if serial.startswith("N") else int(serial)
+        except (IndexError, ValueError):
+            return None
+        call = self.call(index)
+        if call.code != code:
+            return None
+        documents = "".join(f'<li><a href="/docs/{i}.pdf">{name}</a></li>' for i, name in enumerate(DOCUMENTS))
+        if call.sections:
+            body = (
+                f'<h1>{html.escape(call.title)}</h1>'
+                '<section id="scroll-gi"><h2>General information</h2>'
+                f'<div class="eui-input-group"><div><strong>Programme</strong></div><div>{call.code.split("-")[0]}</div></div>'
+                f'<div class="eui-input-group"><div><strong>Deadline date</strong></div><div>{portal_date(call.deadline)}</div></div></section>'
+                '<section id="scroll-sep"><h2>Expected outcome</h2>'
+                + "".join(f"<p>{p}</p>" for p in call.paragraphs)
+                + "</section>"
+                '<section id="scroll-doc"><h2>Documents</h2>'
+                f"<ul>{documents}</ul></section>"
+            )
+        else:
+            description = "".join(f"<p>{p}</p>" for p in call.paragraphs[:2])
+            hidden = "".join(f"<p>{p}</p>" for p in call.paragraphs[2:]) or "<p>No further details.</p>"
+            body = "".join([
+                self._card("General info", f"<p>Programme: {call.code.split('-')[0]}</p>"),
+                self._card("Topic description", description + SHOW_MORE.format(hidden=hidden)),
+                self._card("Topic conditions and documents",
+                           "".join(f"<p>{p}</p>" for p in BOILERPLATE) + SHOW_MORE.format(hidden=f"<ul>{documents}</ul>")),
+                self._card("Budget overview",
+                           f"<p>Budget year: {call.opening.year}</p><p>Topic budget: {call.budget} EUR</p>"),
+                self._card("Partner search announcements", "<p>There are currently no partner search announcements.</p>"),
+                self._card("Submission service", "<p>Not extracted: follows the partner search card.</p>"),
+            ])
+        return self._render(call.title, body)
+
+    def delay(self):
+        delay = self.latency_ms + (self.rng.uniform(0, self.jitter_ms) if self.jitter_ms else 0)
+        if delay:
+            time.sleep(delay / 1000)
+
+    def fail(self):
+        with self.lock:
+            self.requests += 1
+            failed = self.error_rate and self.rng.random() < self.error_rate
+            if failed:
+                self.errors += 1
+        return failed
+
+    def start(self, host="127.0.0.1", port=0):
+        """Serve in a background thread; port 0 picks a free port"""
+        self.server = _PortalServer(self, host, port)
+        thread = threading.Thread(target=self.server.serve_forever, name="synthetic-portal", daemon=True)
+        thread.start()
+        logger.info("Synthetic portal with %s calls listening on %s:%s", self.total, *self.server.server_address[:2])
+        return thread
+
+    def shutdown(self):
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+
+
+class _PortalRequestHandler(BaseHTTPRequestHandler):
+
+    def _send(self, status, body):
+        data = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        portal = self.server.portal
+        url = urlparse(self.path)
+        portal.delay()
+        if url.path == LISTING_PATH:
+            query = {name: values[-1] for name, values in parse_qs(url.query).items()}
+            self._send(200, portal.listing_page(query))
+            return
+        if url.path.startswith("/portal/screen/opportunities/"):
+            if portal.fail():
+                self._send(503, "<html><body><h1>Service unavailable</h1></body></html>")
+                return
+            page = portal.detail_page(url.path.rstrip("/").rsplit("/", 1)[-1])
+            if page is not None:
+                self._send(200, page)
+                return
+        self._send(404, "<html><body><h1>Not found</h1></body></html>")
+
+    def log_message(self, format, *args):
+        logger.debug("%s - %s", self.address_string(), format % args)
+
+
+class _PortalServer(ThreadingHTTPServer):
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, portal, host, port):
+        super().__init__((host, port), _PortalRequestHandler)
+        self.portal = portal
+
+
+class MemorySampler:
+    """Peak RSS of this process and its browser children, sampled in the background"""
+
+    def __init__(self, interval=5):
+        self.interval = interval
+        self.peak = 0
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self._run, name="memory-sampler", daemon=True)
+
+    def _run(self):
+        while True:
+            self.peak = max(self.peak, process_tree_rss(os.getpid()))
+            if self.stop_event.wait(self.interval):
+                return
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop_event.set()
+        self.thread.join()
+
+
+def soak(portal, hours, closed=False, max_pages=None, page_size=50, tabs=1, render_workers=0,
+         report_file="soak.jsonl", work_dir=None):
+    """
+    Run FetchFundingOpportunities against the portal round after round for
+    `hours`, appending one JSON line per round to report_file; returns the summary
+    """
+    import luigi
+    from extract import FetchFundingOpportunities
+
+    work_dir = work_dir or tempfile.mkdtemp(prefix="soak-")
+    deadline = time.monotonic() + hours * 3600
+    rounds = []
+    with open(report_file, "a", encoding="utf-8") as report:
+        while time.monotonic() < deadline:
+            number = len(rounds) + 1
+            output_file = os.path.join(work_dir, f"round-{number}.json")
+            expected = portal.expected(closed, max_pages, page_size)
+            errors_before = portal.errors
+            task = FetchFundingOpportunities(
+                output_file=output_file,
+                listing_url=portal.listing_url(closed, page_size),
+                # Without this the initial setup deselects 'Closed' and the closed calls are never listed
+                include_closed=closed,
+                max_pages=max_pages,
+                page_size=page_size,
+                tabs=tabs,
+                render_workers=render_workers,
+                session_file=os.path.join(work_dir, "portal_session.json"),
+            )
+            started = time.monotonic()
+            with MemorySampler() as memory:
+                ok = luigi.build([task], local_scheduler=True)
+            seconds = time.monotonic() - started
+            calls = []
+            if ok and os.path.exists(output_file):
+                with open(output_file, encoding="utf-8") as f:
+                    calls = json.load(f)
+            codes = [call.get("code") for call in calls]
+            row = {
+                "round": number,
+                "ok": ok,
+                "seconds": round(seconds, 1),
+                "expected": expected,
+                "calls": len(calls),
+                "missing": max(0, expected - len(set(codes))),
+                "duplicates": len(codes) - len(set(codes)),
+                "degraded": sum(1 for call in calls if not set(call) - BASIC_FIELDS),
+                "server_errors": portal.errors - errors_before,
+                "calls_per_second": round(len(calls) / seconds, 3) if seconds else 0,
+                "peak_rss_mb": round(memory.peak / 1024 / 1024, 1),
+                "rss_after_mb": round(process_tree_rss(os.getpid()) / 1024 / 1024, 1),
+            }
+            rounds.append(row)
+            report.write(json.dumps(row) + "\n")
+            report.flush()
+            logger.info("Soak round %s: %s/%s calls in %.0fs (%.2f/s), %s missing, peak %s MB",
+                        number, row["calls"], expected, seconds, row["calls_per_second"], row["missing"],
+                        row["peak_rss_mb"], extra=event("soak.round", **row))
+    summary = soak_summary(rounds)
+    logger.info("Soak summary: %s", summary, extra=event("soak.summary", **summary))
+    return summary
+
+
+def soak_summary(rounds):
+    """Throughput, failure rate and memory growth over all rounds"""
+    if not rounds:
+        return {"rounds": 0}
+    expected = sum(r["expected"] for r in rounds)
+    seconds = sum(r["seconds"] for r in rounds)
+    first, last = rounds[0], rounds[-1]
+    hours = seconds / 3600
+    return {
+        "rounds": len(rounds),
+        "failed_rounds": sum(1 for r in rounds if not r["ok"]),
+        "calls": sum(r["calls"] for r in rounds),
+        "calls_per_second": round(sum(r["calls"] for r in rounds) / seconds, 3) if seconds else 0,
+        "failure_rate": round(sum(r["missing"] + r["degraded"] for r in rounds) / expected, 4) if expected else 0,
+        "peak_rss_mb": max(r["peak_rss_mb"] for r in rounds),
+        # Growth of what stays resident between rounds, where a leak would show
+        "rss_growth_mb": round(last["rss_after_mb"] - first["rss_after_mb"], 1),
+        "rss_growth_mb_per_hour": round((last["rss_after_mb"] - first["rss_after_mb"]) / hours, 1) if hours else 0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Synthetic funding portal for scale and soak testing")
+    sub = parser.add_subparsers(dest="mode", required=True)
+    for mode in ("serve", "soak"):
+        p = sub.add_parser(mode)
+        p.add_argument("--calls", type=int, default=800)
+        p.add_argument("--seed", type=int, default=1)
+        p.add_argument("--latency-ms", type=int, default=0, help="server delay per response")
+        p.add_argument("--jitter-ms", type=int, default=0, help="random extra delay up to this")
+        p.add_argument("--render-ms", type=int, default=200, help="client-side render delay")
+        p.add_argument("--error-rate", type=float, default=0.0, help="share of detail pages answered with 503")
+        p.add_argument("--publish-every", type=float, default=0, help="seconds between newly published calls")
+        p.add_argument("--closed", action="store_true", help="list closed calls too")
+        p.add_argument("--host", default="127.0.0.1")
+        p.add_argument("--port", type=int, default=0)
+    soak_parser = sub.choices["soak"]
+    soak_parser.add_argument("--hours", type=float, default=1)
+    soak_parser.add_argument("--max-pages", type=int)
+    soak_parser.add_argument("--page-size", type=int, default=50)
+    soak_parser.add_argument("--tabs", type=int, default=1)
+    soak_parser.add_argument("--report", default="soak.jsonl")
+    args = parser.parse_args()
+
+    configure_logging()
+    portal = SyntheticPortal(args.calls, args.seed, args.latency_ms, args.jitter_ms, args.render_ms,
+                             args.error_rate, publish_every=args.publish_every)
+    thread = portal.start(args.host, args.port)
+    try:
+        if args.mode == "serve":
+            print(portal.listing_url(args.closed))
+            thread.join()
+        else:
+            summary = soak(portal, args.hours, args.closed, args.max_pages, args.page_size, args.tabs,
+                           report_file=args.report)
+            print(json.dumps(summary, indent=2))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        portal.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+# Marks the current document so a tab still showing its previous page is never
+# mistaken for the new one, then starts the navigation without waiting for it
+_NAVIGATE_SCRIPT = "window.__scraperStale = true; window.location.href = arguments[0];"
+
+# Ready once the new document has loaded and rendered detail content
+_READY_SCRIPT = """
+return !window.__scraperStale && document.readyState === 'complete'
+    && !!document.querySelector(arguments[0]);
+"""
+
+
+class TabScheduler:
+    """
+    Keeps up to `size` detail tabs loading at the same time in one driver and
+    hands back whichever one is ready first. Tab handles are opened once and
+    reused for later URLs instead of opening and closing a window per call.
+    on_new_tab(driver) runs once per opened tab, switched to it, before it
+    loads anything (per-tab DevTools setup such as start-of-document scripts).
+    """
+
+    def __init__(self, driver, size=3, ready_selector="eui-card, section", timeout=30, poll_interval=0.1,
+                 on_new_tab=None):
+        self.driver = driver
+        self.size = size
+        self.ready_selector = ready_selector
+        self.timeout = timeout
+        self.poll_interval = poll_interval
+        self.on_new_tab = on_new_tab
+        self.home = driver.current_window_handle
+        self.handles = []
+
+    def _ensure_tabs(self):
+        """Open the worker tabs once; later batches reuse them"""
+        while len(self.handles) < self.size:
+            before = set(self.driver.window_handles)
+            self.driver.switch_to.window(self.home)
+            self.driver.execute_script("window.open('about:blank', '_blank');")
+            new = [h for h in self.driver.window_handles if h not in before]
+            if not new:
+                break
+            self.handles.append(new[0])
+            if self.on_new_tab is not None:
+                self.driver.switch_to.window(new[0])
+                self.on_new_tab(self.driver)
+
+    def _start(self, handle, url):
+        self.driver.switch_to.window(handle)
+        self.driver.execute_script(_NAVIGATE_SCRIPT, url)
+
+    def run(self, items, url_of, on_ready):
+        """
+        Load items' URLs concurrently and call on_ready(item) with the driver
+        switched to the item's tab. Yields (item, result) in completion order;
+        result is None if the tab timed out or on_ready raised.
+        """
+        self._ensure_tabs()
+        queue = list(items)
+        queue.reverse()
+        loading = {}
+        try:
+            for handle in self.handles:
+                if not queue:
+                    break
+                item = queue.pop()
+                self._start(handle, url_of(item))
+                loading[handle] = (item, time.monotonic())
+
+            while loading:
+                progressed = False
+                for handle, (item, started) in list(loading.items()):
+                    self.driver.switch_to.window(handle)
+                    try:
+                        ready = self.driver.execute_script(_READY_SCRIPT, self.ready_selector)
+                    except Exception as e:
+                        logger.debug("Readiness check failed for %s: %s", url_of(item), e)
+                        ready = False
+                    timed_out = time.monotonic() - started > self.timeout
+                    if not ready and not timed_out:
+                        continue
+
+                    progressed = True
+                    result = None
+                    if ready:
+                        try:
+                            result = on_ready(item)
+                        except Exception as e:
+                            logger.error("Error extracting %s: %s", url_of(item), e)
+                    else:
+                        logger.warning("Tab timed out after %ss loading %s", self.timeout, url_of(item))
+
+                    # Reuse the tab for the next URL straight away so it loads while we yield
+                    del loading[handle]
+                    if queue:
+                        next_item = queue.pop()
+                        self._start(handle, url_of(next_item))
+                        loading[handle] = (next_item, time.monotonic())
+                    yield item, result
+                if not progressed:
+                    time.sleep(self.poll_interval)
+        finally:
+            self.driver.switch_to.window(self.home)
+
+    def close(self):
+        """Close the worker tabs and return to the original window"""
+        for handle in self.handles:
+            try:
+                self.driver.switch_to.window(handle)
+                self.driver.close()
+            except Exception as e:
+                logger.debug("Could not close tab %s: %s", handle, e)
+        self.handles = []
+        try:
+            self.driver.switch_to.window(self.home)
+        except Exception as e:
+            logger.debug("Could not return to the original window: %s", e)
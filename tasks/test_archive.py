@@ -0,0 +1,65 @@
+import pytest
+
+from archive import PageArchive, snapshot_from_html
+from render import render_snapshot
+
+PAGE = """<html><head><script>var x = 1;</script></head><body>
+<eui-card><eui-card-header><eui-card-header-title class="eui-card-header__title-container-title">
+General information</eui-card-header-title></eui-card-header>
+<eui-card-content><div><p>Programme: Horizon Europe</p></div></eui-card-content></eui-card>
+<eui-card><eui-card-header><eui-card-header-title class="eui-card-header__title-container-title">
+Topic description</eui-card-header-title></eui-card-header>
+<eui-card-content><div><p>Expected outcome</p><p style="display: none">Hidden</p>
+<a href="/docs/wp.pdf">Work programme</a></div></eui-card-content></eui-card>
+</body></html>"""
+
+
+@pytest.fixture
+def archive(tmp_path):
+    archive = PageArchive(str(tmp_path / "pages.db"), codec="zlib")
+    yield archive
+    archive.close()
+
+
+def call(index):
+    return {"title": f"Call {index}", "link": f"https://ec.europa.eu/topic-details/CALL-{index}"}
+
+
+def test_round_trip_and_content_dedupe(archive):
+    archive.put(call(2), PAGE, position=(1, 2))
+    archive.put(call(1), PAGE, position=(1, 1))
+    other = PAGE.replace("Expected outcome", "Other outcome")
+    archive.put(call(3), other)
+    assert archive.page(call(1)["link"]) == (call(1), PAGE)
+    assert archive.page(call(3)["link"])[1] == other
+    assert [info["title"] for _, _, info in archive.pages()] == ["Call 1", "Call 2", "Call 3"]
+    stats = archive.stats()
+    assert (stats["pages"], stats["blobs"], archive.deduplicated) == (3, 2, 1)
+    # The second distinct page compresses against the first one
+    assert stats["stored_bytes"] < stats["raw_bytes"] / 2
+
+
+def test_reopened_archive_reads_pages(tmp_path):
+    path = str(tmp_path / "pages.db")
+    archive = PageArchive(path, codec="zlib")
+    archive.put(call(1), PAGE)
+    archive.close()
+    archive = PageArchive(path, codec="zlib")
+    try:
+        assert archive.page(call(1)["link"])[1] == PAGE
+    finally:
+        archive.close()
+
+
+def test_snapshot_from_html_renders_like_the_browser():
+    snapshot = snapshot_from_html(PAGE, call(1)["link"])
+    assert snapshot["layout"] == "cards"
+    assert [card["title"] for card in snapshot["cards"]] == ["General information", "Topic description"]
+    sections = render_snapshot(snapshot)
+    assert sections["Topic description"] == [
+        "Expected outcome\nWork programme [Work programme](https://ec.europa.eu/docs/wp.pdf)"
+    ]
+
+
+def test_page_without_cards_or_sections_has_no_snapshot():
+    assert snapshot_from_html("<html><body><p>Maintenance</p></body></html>") is None
@@ -0,0 +1,94 @@
+import pytest
+
+from cursor import ListingCursor
+
+
+class ShiftingListing:
+    """
+    Fake startDate-sorted listing; on_read(page_num, calls) runs between the
+    read of page_num and the next read, so a test can publish or withdraw calls
+    mid-crawl
+    """
+
+    def __init__(self, count, page_size=50, on_read=None):
+        self.calls = [{"code": f"CALL-{i:03d}", "link": f"https://example.org/call-{i}"} for i in range(count)]
+        self.page_size = page_size
+        self.on_read = on_read
+        self.reads = []
+
+    def list_page(self, page_num, start_index=0, end_index=None):
+        if self.reads and self.on_read is not None:
+            self.on_read(self.reads[-1], self.calls)
+        self.reads.append(page_num)
+        cards = self.calls[(page_num - 1) * self.page_size:page_num * self.page_size]
+        entries = [(index, dict(card)) for index, card in enumerate(cards, 1)]
+        return entries, len(entries)
+
+    def result_count(self):
+        return len(self.calls)
+
+    # FundingOpportunitiesScraper.scrape_details stand-in for scrape_in_page_order
+    def scrape_details(self, entries, page_number=1, total=None):
+        return [basic_info for _, basic_info in entries]
+
+
+def publish_after_first_page(page_num, calls):
+    if page_num == 1 and calls[0]["code"] != "NEW":
+        calls.insert(0, {"code": "NEW", "link": "https://example.org/new"})
+
+
+def withdraw_after_first_page(page_num, calls):
+    if page_num == 1 and len(calls) == 120:
+        del calls[10]
+
+
+def crawl(listing):
+    cursor = ListingCursor(listing.list_page, listing.page_size, result_count=listing.result_count)
+    codes = [basic_info["code"] for _, entries, _ in cursor for _, basic_info in entries]
+    return cursor, codes
+
+
+def test_stable_listing_reads_every_page_once():
+    listing = ShiftingListing(120)
+    cursor, codes = crawl(listing)
+    assert codes == [call["code"] for call in listing.calls]
+    assert listing.reads == [1, 2, 3]
+    assert cursor.duplicates == cursor.refetches == 0
+
+
+def test_call_published_mid_crawl_is_recovered():
+    listing = ShiftingListing(120, on_read=publish_after_first_page)
+    cursor, codes = crawl(listing)
+    assert len(codes) == len(set(codes))
+    assert sorted(codes) == sorted(call["code"] for call in listing.calls)
+    assert cursor.refetches == 1
+    assert cursor.recovered == 1
+
+
+def test_call_withdrawn_mid_crawl_does_not_hide_its_neighbour():
+    listing = ShiftingListing(120, on_read=withdraw_after_first_page)
+    cursor, codes = crawl(listing)
+    assert len(codes) == len(set(codes))
+    # CALL-050 moved up onto page 1 after it was read and is picked up by the re-fetch
+    assert "CALL-050" in codes
+    assert sorted(codes) == sorted(["CALL-010"] + [call["code"] for call in listing.calls])
+
+
+def test_max_pages_limits_the_crawl():
+    listing = ShiftingListing(200)
+    cursor = ListingCursor(listing.list_page, 50, max_pages=2, result_count=listing.result_count)
+    assert [page for page, _, _ in cursor] == [1, 2]
+
+
+@pytest.mark.parametrize("on_read", [publish_after_first_page, withdraw_after_first_page])
+def test_page_order_crawl_has_no_duplicate_or_missing_codes(on_read):
+    pytest.importorskip("luigi")
+    from extract import FetchFundingOpportunities
+
+    listing = ShiftingListing(120, on_read=on_read)
+    task = FetchFundingOpportunities(page_size=50)
+    calls, pages = task.scrape_in_page_order(listing)
+    codes = [call["code"] for call in calls]
+    assert len(codes) == len(set(codes))
+    assert set(codes) >= {call["code"] for call in listing.calls}
+    assert pages == 3
@@ -0,0 +1,100 @@
+import json
+
+import pytest
+
+from daemon import Dataset, ScrapeDaemon
+
+
+def listed(index, status="Open For Submission"):
+    return {
+        "code": f"CALL-{index:03d}",
+        "link": f"https://example.org/call-{index}",
+        "status": status,
+        "opening_date": f"2025-{12 - index // 28:02d}-{28 - index % 28:02d}",
+        "deadline_date": "2026-03-01",
+    }
+
+
+class FakeScraper:
+    """Stands in for FundingOpportunitiesScraper over a startDate-sorted listing"""
+
+    tabs = 1
+
+    def __init__(self, calls, page_size=50):
+        self.calls = calls
+        self.page_size = page_size
+        self.scraped = []
+
+    def setup_driver(self):
+        pass
+
+    def cleanup(self):
+        pass
+
+    def list_page(self, page_num):
+        cards = self.calls[(page_num - 1) * self.page_size:page_num * self.page_size]
+        return [(index, dict(card)) for index, card in enumerate(cards, 1)], len(cards)
+
+    def result_count(self):
+        return len(self.calls)
+
+    def scrape_details(self, entries, page_number=1, total=None):
+        self.scraped.extend(basic_info["code"] for _, basic_info, _ in entries)
+        return [{**basic_info, "Topic description": ["..."]} for _, basic_info, _ in entries]
+
+
+@pytest.fixture
+def dataset():
+    return Dataset([listed(1), listed(2, "Forthcoming"), listed(3, "Closed")])
+
+
+def codes(body):
+    return [call["code"] for call in json.loads(body)]
+
+
+def test_status_filter_matches_portal_labels(dataset):
+    body, _ = dataset.query({"status": "Open"})
+    assert codes(body) == ["CALL-001"]
+    body, _ = dataset.query({"status": "open for submission,forthcoming"})
+    assert codes(body) == ["CALL-001", "CALL-002"]
+
+
+def test_query_etags(dataset):
+    body, etag = dataset.query({})
+    assert body == dataset.body and etag == dataset.etag()
+    _, open_etag = dataset.query({"status": "Open"})
+    assert open_etag != etag
+    # Cached per filter set, and stable across datasets with the same calls
+    assert dataset.query({"status": "Open"}) == (dataset.query({"status": "Open"})[0], open_etag)
+    assert Dataset(list(dataset.calls)).query({"status": "Open"})[1] == open_etag
+    assert Dataset(dataset.calls[:2]).etag() != etag
+
+
+def test_unknown_filter_raises(dataset):
+    with pytest.raises(KeyError):
+        dataset.query({"colour": "blue"})
+
+
+def test_call_by_code(dataset):
+    body, etag = dataset.call("CALL-002")
+    assert json.loads(body)["status"] == "Forthcoming"
+    assert etag != dataset.etag()
+    assert dataset.call("CALL-999") is None
+
+
+def test_refresh_scrapes_only_new_calls(tmp_path):
+    calls = [listed(index) for index in range(1, 121)]
+    scraper = FakeScraper(calls)
+    daemon = ScrapeDaemon(output_file=str(tmp_path / "calls_raw.json"), state_file=str(tmp_path / "state.db"),
+                          full_sweep_every=0, scraper_factory=lambda: scraper)
+    daemon.refresh()
+    assert sorted(scraper.scraped) == sorted(call["code"] for call in calls)
+
+    scraper.scraped = []
+    scraper.calls = [{**listed(0), "opening_date": "2026-01-15"}] + calls
+    daemon.refresh()
+    assert scraper.scraped == ["CALL-000"]
+    assert [call["code"] for call in daemon.dataset.calls][:2] == ["CALL-000", "CALL-001"]
+    assert len(daemon.dataset.calls) == 121
+    with open(tmp_path / "calls_raw.json", encoding="utf-8") as f:
+        assert len(json.load(f)) == 121
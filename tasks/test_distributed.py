@@ -0,0 +1,113 @@
+import functools
+import multiprocessing
+import threading
+import time
+
+import pytest
+
+pytest.importorskip("luigi")
+
+from distributed import DETAIL, run_coordinator, run_worker
+from workqueue import LeaseQueue, QueueServer, open_queue
+
+
+class FakeScraper:
+    """Stands in for FundingOpportunitiesScraper; logs every detail it scrapes"""
+
+    def __init__(self, log_path):
+        self.log_path = log_path
+
+    def setup_driver(self):
+        pass
+
+    def cleanup(self):
+        pass
+
+    def list_page(self, page_num):
+        links = [f"https://example.org/topic-{index}" for index in range(120)][(page_num - 1) * 50:page_num * 50]
+        return [(index, {"link": link}) for index, link in enumerate(links, 1)], len(links)
+
+    def scrape_details(self, items, page):
+        time.sleep(0.02)
+        calls = []
+        for _, basic_info in items:
+            with open(self.log_path, "a", encoding="utf-8") as f:
+                f.write(basic_info["link"] + "\n")
+            calls.append(basic_info)
+        return calls
+
+
+def _fake_worker(queue_spec, log_path):
+    run_worker(open_queue(queue_spec), lease_seconds=3, idle_timeout=2, poll_interval=0.1,
+               scraper_factory=functools.partial(FakeScraper, log_path))
+
+
+def _publish(queue, count):
+    for index in range(count):
+        link = f"https://example.org/topic-{index}"
+        queue.put(DETAIL, link, {"page": 1, "index": index, "basic_info": {"link": link}})
+
+
+def test_local_worker_processes_process_each_item_once(tmp_path):
+    queue = LeaseQueue(str(tmp_path / "queue.db"))
+    server = QueueServer(queue, port=0)
+    server.start()
+    log_path = str(tmp_path / "scraped.log")
+    try:
+        _publish(queue, 40)
+        # A worker that claimed an item and died without completing it
+        abandoned = queue.claim("dead-worker", lease_seconds=1)
+
+        context = multiprocessing.get_context("spawn")
+        queue_spec = "tcp://%s:%s" % server.server_address
+        workers = [context.Process(target=_fake_worker, args=(queue_spec, log_path)) for _ in range(3)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join(timeout=60)
+            assert worker.exitcode == 0
+
+        with open(log_path, encoding="utf-8") as f:
+            scraped = f.read().split()
+        assert sorted(scraped) == sorted(f"https://example.org/topic-{i}" for i in range(40))
+        assert queue.stats() == {"done": 40}
+
+        row = queue.conn.execute("SELECT worker, attempts FROM items WHERE id = ?", (abandoned["id"],)).fetchone()
+        assert row[0] != "dead-worker"
+        assert row[1] == 2
+    finally:
+        server.shutdown()
+        server.server_close()
+        queue.close()
+
+
+def test_coordinator_merges_every_listed_call(tmp_path):
+    queue = LeaseQueue(str(tmp_path / "queue.db"))
+    server = QueueServer(queue, port=0)
+    server.start()
+    log_path = str(tmp_path / "scraped.log")
+    queue_spec = "tcp://%s:%s" % server.server_address
+    worker = threading.Thread(target=_fake_worker, args=(queue_spec, log_path))
+    worker.start()
+    try:
+        calls = run_coordinator(open_queue(queue_spec), poll_interval=0.05)
+        assert [call["link"] for call in calls] == [f"https://example.org/topic-{i}" for i in range(120)]
+    finally:
+        worker.join(timeout=60)
+        server.shutdown()
+        server.server_close()
+        queue.close()
+
+
+def test_expired_leases_fail_after_max_attempts(tmp_path):
+    queue = LeaseQueue(str(tmp_path / "queue.db"), max_attempts=2)
+    try:
+        queue.put(DETAIL, "https://example.org/hangs", {})
+        for attempt in (1, 2):
+            item = queue.claim("worker", lease_seconds=-1)
+            assert item["attempts"] == attempt
+        assert queue.claim("worker") is None
+        assert queue.stats() == {"failed": 1}
+        assert queue.is_finished()
+    finally:
+        queue.close()
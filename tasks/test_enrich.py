@@ -0,0 +1,108 @@
+import json
+import sqlite3
+
+import pytest
+
+pytest.importorskip("luigi")
+
+from enrich import AMOUNT_RE, EnrichFundingOpportunities, ParseCache, enrich_call, parse_section
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = ParseCache(str(tmp_path / "enrich_cache.db"))
+    yield cache
+    cache.close()
+
+
+@pytest.fixture
+def call():
+    return {
+        "title": "Advanced materials for batteries",
+        "link": "https://ec.europa.eu/info/funding-tenders/opportunities/portal/screen/opportunities/topic-details/horizon-cl4-2025-01-01",
+        "code": "HORIZON-CL4-2025-01-01",
+        "type": "Call for proposal",
+        "opening_date": "2025-05-06",
+        "deadline_date": "2025-09-16",
+        "stage": "Single-stage",
+        "status": "Open For Submission",
+        "Topic description": [
+            "Expected EU contribution per project: EUR 3 000 000 to 5 000 000",
+            "An info day takes place on 3 June 2025.",
+            "Projects are expected to start on 1 March 2027.",
+        ],
+        "Budget overview": [
+            "HORIZON-CL4-2025-01-01 2025",
+            "2025: 7 500 000 EUR",
+            "2026: 7 500 000 EUR",
+            "Total: 15 000 000 EUR",
+            "Indicative number of grants: 3",
+        ],
+        "Deadline model": ["single-stage"],
+        "Deadline": ["16 September 2025 17:00:00 Brussels time"],
+    }
+
+
+def test_amounts_need_digit_boundaries():
+    assert AMOUNT_RE.search("HORIZON-CL4-2025-01-01 2025") is None
+    assert [m.group(2) for m in AMOUNT_RE.finditer("2025: 7 500 000 EUR")] == ["7 500 000"]
+
+
+def test_total_figure_is_marked():
+    amounts = parse_section("Budget overview", ["2025: 7 500 000 EUR", "Total: 15 000 000 EUR"])["amounts"]
+    assert [(a["amount"], a["year"], a["total"]) for a in amounts] == [
+        (7500000.0, 2025, False),
+        (15000000.0, None, True),
+    ]
+
+
+def test_budget_total_uses_explicit_total(call, cache):
+    row = enrich_call(call, cache)
+    assert row["call"]["budget_total"] == 15000000.0
+    assert row["call"]["currency"] == "EUR"
+    # Per-project amounts outside the budget section are not budgets
+    assert all(b["amount"] != 3000000.0 for b in row["budgets"])
+
+
+def test_budget_total_sums_years_without_total(call, cache):
+    call["Budget overview"] = ["2025: 7 500 000 EUR", "2026: 7 500 000 EUR"]
+    assert enrich_call(call, cache)["call"]["budget_total"] == 15000000.0
+
+
+def test_no_budget_section_means_no_budget(call, cache):
+    del call["Budget overview"]
+    row = enrich_call(call, cache)
+    assert row["call"]["budget_total"] is None
+    assert row["budgets"] == []
+
+
+def test_deadlines_only_from_deadline_sections(call, cache):
+    row = enrich_call(call, cache)
+    assert row["deadlines"] == ["2025-09-16"]
+    assert row["call"]["final_deadline"] == "2025-09-16"
+    assert row["call"]["deadline_model"] == "single-stage"
+
+
+def test_two_stage_deadlines(call, cache):
+    call["Deadline model"] = ["two-stage"]
+    call["Deadline"] = ["First stage: 16 September 2025", "Second stage: 17 February 2026"]
+    row = enrich_call(call, cache)
+    assert row["deadlines"] == ["2025-09-16", "2026-02-17"]
+    assert row["call"]["deadline_count"] == 2
+    assert row["call"]["final_deadline"] == "2026-02-17"
+    assert row["call"]["deadline_model"] == "two-stage"
+
+
+def test_duplicate_codes_are_written_once(call, tmp_path):
+    input_file = tmp_path / "calls_raw.json"
+    input_file.write_text(json.dumps([call, {**call, "title": "Listed twice"}]), encoding="utf-8")
+    task = EnrichFundingOpportunities(input_file=str(input_file), output_file=str(tmp_path / "calls_enriched.db"),
+                                      cache_file=str(tmp_path / "enrich_cache.db"))
+    task.run()
+    conn = sqlite3.connect(task.output_file)
+    try:
+        assert conn.execute("SELECT title FROM calls").fetchall() == [("Advanced materials for batteries",)]
+        assert conn.execute("SELECT COUNT(*) FROM call_deadlines").fetchone() == (1,)
+        assert conn.execute("SELECT COUNT(*) FROM call_budgets").fetchone()[0] == 3
+    finally:
+        conn.close()
@@ -0,0 +1,58 @@
+from locators import CSS, XPATH, Locator, LocatorRegistry
+
+
+class FakeDriver:
+    """Answers the combined-query script with per-variant match counts"""
+
+    def __init__(self, counts):
+        self.counts = counts
+        self.scripts = []
+
+    def execute_script(self, script, parent, variants, query):
+        self.scripts.append((variants, query))
+        return [f"element-{i}" for i in range(sum(self.counts.get(v, 0) for v in variants))], \
+            [self.counts.get(v, 0) for v in variants]
+
+    def find_elements(self, by, value):
+        return [f"element-{i}" for i in range(self.counts.get(value, 0))]
+
+
+def test_variants_are_joined_into_one_query():
+    assert Locator("css", CSS, ["a", "b"]).query == "a, b"
+    assert Locator("xpath", XPATH, ["//a", "//b"]).query == "//a | //b"
+
+
+def test_registry_finds_all_variants_in_one_call():
+    driver = FakeDriver({"button.more": 2, ".show-more": 1})
+    registry = LocatorRegistry({"show_more": (CSS, ["button.more", ".show-more", ".expand"], False)})
+    assert len(registry.find_elements(driver, "show_more")) == 3
+    assert driver.scripts == [(["button.more", ".show-more", ".expand"], "button.more, .show-more, .expand")]
+    stats = registry.report()[0]["variants"]
+    assert [(v["hits"], v["misses"], v["matched"]) for v in stats] == [(1, 0, 2), (1, 0, 1), (0, 1, 0)]
+
+
+def test_single_variant_uses_find_elements():
+    registry = LocatorRegistry({"card": (CSS, ["eui-card"], False)})
+    assert registry.find_element(FakeDriver({"eui-card": 4}), "card") == "element-0"
+    assert registry.find_element(FakeDriver({}), "card") is None
+
+
+def test_dead_variants_are_pruned_and_revived():
+    locator = Locator("show_more", CSS, ["a", "b", "c"], prune=True, warmup=3, reprobe_every=5)
+    for _ in range(3):
+        locator.record(locator.variants_for_lookup(), [1, 0, 0])
+    assert locator.live == ["a"]
+    assert locator.query == "a"
+    # Dead variants are only queried again on re-probe lookups
+    while locator.lookups % locator.reprobe_every:
+        assert locator.variants_for_lookup() == ["a"]
+        locator.record(["a"], [1])
+    assert locator.variants_for_lookup() == ["a", "b", "c"]
+    locator.record(["a", "b", "c"], [1, 1, 0])
+    assert locator.live == ["a", "b"]
+
+
+def test_pruning_keeps_one_variant():
+    locator = Locator("gone", CSS, ["a", "b"], prune=True, warmup=1)
+    locator.record(locator.variants_for_lookup(), [0, 0])
+    assert len(locator.live) == 1
@@ -0,0 +1,57 @@
+import json
+
+import pytest
+
+from parastore import ParagraphStore, write_store
+
+ELIGIBILITY = "Eligible countries: as described in Annex B of the Work Programme General Annexes.\nLegal entities"
+
+
+@pytest.fixture
+def calls():
+    return [
+        {
+            "title": "Advanced materials for batteries",
+            "code": "HORIZON-CL4-2025-01-01",
+            "status": "Open For Submission",
+            "Topic description": ["Expected outcome:\nBetter batteries", ""],
+            "Topic conditions and documents": [ELIGIBILITY],
+            "Budget overview": {"2025": "7 500 000 EUR"},
+        },
+        {
+            "code": "HORIZON-CL4-2025-01-02",
+            "title": "Hydrogen storage",
+            "deadline_date": None,
+            "Topic conditions and documents": [ELIGIBILITY, "Expected outcome:"],
+            "Keywords": [],
+        },
+    ]
+
+
+def test_round_trip_restores_calls(calls, tmp_path):
+    path = str(tmp_path / "calls.parastore.json")
+    write_store(calls, path)
+    store = ParagraphStore(path)
+    assert len(store) == 2
+    assert store.calls() == calls
+    # Key order is kept, so a re-dump matches calls_raw.json
+    assert [list(call) for call in store] == [list(call) for call in calls]
+    assert json.dumps(store[1].to_dict()) == json.dumps(calls[1])
+
+
+def test_shared_paragraphs_are_stored_once(calls, tmp_path):
+    path = str(tmp_path / "calls.parastore.json")
+    stats = write_store(calls, path)
+    with open(path, encoding="utf-8") as f:
+        paragraphs = json.load(f)["paragraphs"]
+    assert paragraphs.count("Legal entities") == 1
+    assert paragraphs.count("Expected outcome:") == 1
+    assert stats["unique_paragraphs"] < stats["paragraphs"]
+    assert stats["dedupe_ratio"] > 1
+
+
+def test_rejects_other_files(tmp_path):
+    path = tmp_path / "calls_raw.json"
+    path.write_text("{}", encoding="utf-8")
+    with pytest.raises(ValueError):
+        ParagraphStore(str(path))
@@ -0,0 +1,38 @@
+import pytest
+
+from pipeline import RenderStage
+
+SNAPSHOT = {"layout": "cards", "cards": [
+    {"title": "Topic description", "content": {"t": "div", "k": [{"t": "p", "k": ["Expected outcome"]}]}},
+]}
+
+
+def basic_info(index):
+    return {"title": f"Call {index}", "link": f"https://example.org/call-{index}",
+            "opening_date_raw": "6 May 2025", "deadline_date_raw": ""}
+
+
+@pytest.mark.parametrize("workers", [0, 1])
+def test_results_keep_submission_order(workers):
+    stage = RenderStage(workers=workers, max_pending=2)
+    try:
+        for index in range(5):
+            if index == 2:
+                stage.add_rendered({"title": "Rendered elsewhere"})
+            else:
+                stage.submit(basic_info(index), SNAPSHOT)
+        calls = stage.drain()
+    finally:
+        stage.close()
+    assert [call["title"] for call in calls] == ["Call 0", "Call 1", "Rendered elsewhere", "Call 3", "Call 4"]
+    assert calls[0]["opening_date"] == "2025-05-06"
+    assert calls[0]["Topic description"] == ["Expected outcome"]
+
+
+def test_keys_order_results_and_failures_are_dropped():
+    stage = RenderStage(workers=0)
+    stage.submit(basic_info(1), SNAPSHOT, key=(2, 1))
+    stage.submit({**basic_info(2), "opening_date_raw": "not a date"}, SNAPSHOT, key=(1, 5))
+    stage.add_rendered({"title": "First"}, key=(1, 1))
+    assert [call["title"] for call in stage.drain()] == ["First", "Call 1"]
+    assert stage.drain() == []
@@ -0,0 +1,49 @@
+import threading
+import time
+
+from profiling import SamplingProfiler
+
+
+def wait_in_sleep(stop):
+    while not stop.is_set():
+        time.sleep(0.005)
+
+
+def test_samples_fold_into_thread_rooted_stacks(tmp_path):
+    stop = threading.Event()
+    worker = threading.Thread(target=wait_in_sleep, args=(stop,), name="sleeper")
+    worker.start()
+    profiler = SamplingProfiler(interval=0.002, threads=["sleeper"])
+    profiler.start()
+    time.sleep(0.2)
+    profiler.stop()
+    stop.set()
+    worker.join()
+
+    assert profiler.samples > 0
+    sleeping = [stack for stack in profiler.stacks if stack.endswith(";sleep")]
+    assert sleeping
+    frames = sleeping[0].split(";")
+    assert frames[0] == "sleeper"
+    assert frames[-2].startswith("wait_in_sleep (test_profiling.py:")
+
+    path = tmp_path / "profile.folded"
+    profiler.write_folded(str(path))
+    lines = path.read_text(encoding="utf-8").splitlines()
+    assert sum(int(line.rsplit(" ", 1)[1]) for line in lines) == sum(profiler.stacks.values())
+
+
+def test_summary_splits_self_and_inclusive_time():
+    profiler = SamplingProfiler(interval=0.01)
+    profiler.stacks.update({
+        "MainThread;scrape;list_page;WebDriver:executeScript": 6,
+        "MainThread;scrape;scrape_details;sleep": 3,
+        "MainThread;scrape": 1,
+        "MainThread": 5,
+    })
+    self_time, inclusive = profiler.summary()
+    assert self_time[0] == ("WebDriver:executeScript", 0.06)
+    assert dict(self_time)["scrape"] == 0.01
+    assert dict(inclusive)["scrape"] == 0.1
+    # Thread roots without frames are not attributed
+    assert "MainThread" not in dict(inclusive)
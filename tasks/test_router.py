@@ -0,0 +1,38 @@
+from router import CARDS, SECTIONS, PageRouter, route_pattern
+
+TOPIC = "https://ec.europa.eu/info/funding-tenders/opportunities/portal/screen/opportunities/topic-details/HORIZON-CL4-2025-01-01"
+CASCADE = "https://ec.europa.eu/info/funding-tenders/opportunities/portal/screen/opportunities/competitive-calls-cs/1234"
+PROSPECT = "https://ec.europa.eu/info/funding-tenders/opportunities/portal/screen/opportunities/prospect-details/5678"
+
+
+def test_route_pattern_is_the_segment_before_the_identifier():
+    assert route_pattern(TOPIC) == "topic-details"
+    assert route_pattern(CASCADE) == "competitive-calls-cs"
+    assert route_pattern("https://example.org/only") == "only"
+    assert route_pattern("https://example.org/") == ""
+
+
+def test_default_routes():
+    router = PageRouter()
+    assert router.route(TOPIC) == CARDS
+    assert router.route(CASCADE) == SECTIONS
+    assert router.route(PROSPECT) is None
+
+
+def test_unknown_patterns_are_learned():
+    router = PageRouter()
+    router.learn(PROSPECT, SECTIONS)
+    assert router.route(PROSPECT.replace("5678", "9999")) == SECTIONS
+    assert router.routes["prospect-details"].learned
+    # Detection that found no layout is not cached
+    router.learn("https://example.org/other-details/1", None)
+    assert router.route("https://example.org/other-details/2") is None
+    assert router.detections == 2
+
+
+def test_miss_then_redetection_replaces_the_route():
+    router = PageRouter()
+    router.miss(TOPIC)
+    router.learn(TOPIC, SECTIONS)
+    assert router.route(TOPIC) == SECTIONS
+    assert router.routes["topic-details"].misses == 0
@@ -0,0 +1,27 @@
+import io
+import logging
+
+import pytest
+
+from runlog import configure_logging
+
+
+@pytest.fixture
+def configured():
+    root = logging.getLogger()
+    level = root.level
+    stream = io.StringIO()
+    handler = configure_logging(fmt="text", ring_size=10, stream=stream)
+    yield stream
+    root.removeHandler(handler)
+    root.setLevel(level)
+
+
+def test_debug_context_is_written_out_on_error(configured):
+    logger = logging.getLogger("test_runlog")
+    logger.debug("context before the failure")
+    logger.info("progress")
+    assert "context before the failure" not in configured.getvalue()
+    logger.error("failure")
+    lines = configured.getvalue().splitlines()
+    assert [line.split(" - ", 2)[2] for line in lines] == ["progress", "context before the failure", "failure"]
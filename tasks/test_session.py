@@ -0,0 +1,69 @@
+import json
+import time
+
+from session import PortalSession
+
+
+class FakeDriver:
+    """Records DevTools commands and answers the capture calls"""
+
+    def __init__(self):
+        self.commands = []
+
+    def execute_cdp_cmd(self, command, params):
+        self.commands.append((command, params))
+        if command == "Network.getAllCookies":
+            return {"cookies": [
+                {"name": "cck1", "value": "accepted", "domain": ".europa.eu", "path": "/", "expires": -1,
+                 "session": True, "size": 17, "priority": "Medium"},
+            ]}
+        return {}
+
+    def execute_script(self, script, *args):
+        return {"origin": "https://ec.europa.eu", "local": {"filters": "open"}, "session": {}}
+
+
+def test_capture_saves_and_reloads(tmp_path):
+    path = str(tmp_path / "portal_session.json")
+    PortalSession(path).capture(FakeDriver())
+    session = PortalSession(path)
+    assert session.available
+    assert session.state["local"] == {"filters": "open"}
+
+
+def test_expired_session_is_not_applied(tmp_path):
+    path = tmp_path / "portal_session.json"
+    PortalSession(str(path)).capture(FakeDriver())
+    state = json.loads(path.read_text(encoding="utf-8"))
+    state["captured_at"] = time.time() - 13 * 3600
+    path.write_text(json.dumps(state), encoding="utf-8")
+
+    session = PortalSession(str(path))
+    driver = FakeDriver()
+    assert not session.available
+    assert session.init_script() is None
+    assert not session.apply(driver)
+    assert not session.apply_to_tab(driver)
+    assert driver.commands == []
+    assert PortalSession(str(path), max_age=24 * 3600).available
+
+
+def test_apply_sets_cookies_and_registers_the_restore_script(tmp_path):
+    session = PortalSession(str(tmp_path / "portal_session.json"))
+    session.capture(FakeDriver())
+    driver = FakeDriver()
+    assert session.apply(driver)
+    (set_cookies, params), (add_script, script) = driver.commands
+    assert set_cookies == "Network.setCookies"
+    # Session cookies carry no expiry, and only CookieParam keys are sent
+    assert params["cookies"] == [{"name": "cck1", "value": "accepted", "domain": ".europa.eu", "path": "/"}]
+    assert add_script == "Page.addScriptToEvaluateOnNewDocument"
+    assert '"filters": "open"' in script["source"]
+    assert session.apply_to_tab(driver)
+    assert driver.commands[-1] == (add_script, script)
+
+
+def test_unreadable_session_file_is_ignored(tmp_path):
+    path = tmp_path / "portal_session.json"
+    path.write_text("{", encoding="utf-8")
+    assert not PortalSession(str(path)).available
@@ -0,0 +1,91 @@
+from datetime import date
+
+import pytest
+
+from state import CrawlState, DetailQueue, detail_priority, is_known, merge_calls
+
+TODAY = date(2025, 6, 1)
+
+
+def listed(code, status, deadline_date="", opening_date="2025-05-06"):
+    return {
+        "code": code,
+        "link": f"https://example.org/{code}",
+        "status": status,
+        "opening_date": opening_date,
+        "deadline_date": deadline_date,
+    }
+
+
+@pytest.fixture
+def state(tmp_path):
+    state = CrawlState(str(tmp_path / "crawl_state.db"))
+    yield state
+    state.close()
+
+
+def test_portal_status_labels_are_ranked():
+    open_call = listed("A", "Open For Submission", "2025-09-16")
+    forthcoming = listed("B", "Forthcoming", "2025-09-16")
+    closed = listed("C", "Closed", "2025-09-16")
+    assert detail_priority(open_call, today=TODAY) < detail_priority(forthcoming, today=TODAY)
+    assert detail_priority(forthcoming, today=TODAY) < detail_priority(closed, today=TODAY)
+
+
+def test_detail_queue_orders_by_deadline_then_status():
+    queue = DetailQueue(today=TODAY)
+    entries = [
+        listed("NO-DEADLINE", "Open For Submission"),
+        listed("PAST", "Open For Submission", "2025-01-01"),
+        listed("LATE-FORTHCOMING", "Forthcoming", "2025-12-01"),
+        listed("LATE-OPEN", "Open For Submission", "2025-12-01"),
+        listed("SOON", "Forthcoming", "2025-06-10"),
+    ]
+    for index, basic_info in enumerate(entries, 1):
+        queue.push(1, index, basic_info)
+    assert len(queue) == 5
+    batch = queue.pop_batch(3)
+    assert [basic_info["code"] for _, _, basic_info in batch] == ["SOON", "LATE-OPEN", "LATE-FORTHCOMING"]
+    # Calls without an upcoming deadline keep their listing order
+    assert [basic_info["code"] for _, _, basic_info in queue.pop_batch(10)] == ["NO-DEADLINE", "PAST"]
+    assert len(queue) == 0
+
+
+def test_detail_queue_prefers_least_recently_scraped(state):
+    stale = listed("STALE", "Open For Submission", "2025-09-16")
+    fresh = listed("FRESH", "Open For Submission", "2025-09-16")
+    state.mark_seen([stale, fresh])
+    state.mark_scraped([stale, fresh])
+    state.conn.execute("UPDATE calls SET last_scraped = 1 WHERE link = ?", (stale["link"],))
+    queue = DetailQueue(state, today=TODAY)
+    queue.push(1, 1, fresh)
+    queue.push(1, 2, stale)
+    assert [basic_info["code"] for _, _, basic_info in queue.pop_batch(2)] == ["STALE", "FRESH"]
+
+
+def test_mark_seen_reports_status_changes(state):
+    call = listed("A", "Forthcoming")
+    assert state.mark_seen([call]) == []
+    changes = state.mark_seen([{**call, "status": "Open For Submission"}])
+    assert [(link, new) for link, _, _, new in changes] == [(call["link"], "Open For Submission")]
+
+
+def test_is_known_uses_scraped_links_and_watermark(state):
+    state.advance_watermark([listed("A", "Open For Submission", opening_date="2025-05-06")])
+    watermark = state.watermark()
+    assert is_known(listed("OLD", "Open For Submission", opening_date="2025-04-01"), set(), watermark)
+    assert is_known(listed("A", "Open For Submission", opening_date="2025-05-06"), set(), watermark)
+    assert not is_known(listed("B", "Open For Submission", opening_date="2025-05-06"), set(), watermark)
+    assert not is_known(listed("NEW", "Open For Submission", opening_date="2025-06-01"), set(), watermark)
+    assert is_known(listed("NEW", "Open For Submission", opening_date="2025-06-01"),
+                    {"https://example.org/NEW"}, watermark)
+
+
+def test_merge_calls_puts_new_calls_first_and_updates_statuses():
+    known = [listed("A", "Forthcoming"), listed("B", "Open For Submission")]
+    new = [{**listed("B", "Open For Submission"), "Topic description": ["updated"]}]
+    changes = [(known[0]["link"], "A", "Forthcoming", "Open For Submission")]
+    merged = merge_calls(known, new, changes)
+    assert [call["code"] for call in merged] == ["B", "A"]
+    assert merged[0]["Topic description"] == ["updated"]
+    assert merged[1]["status"] == "Open For Submission"
@@ -0,0 +1,163 @@
+"""
+Memory and latency watchdog for long-running browser sessions.
+
+Chromium's memory grows over hundreds of detail tabs and pages get slower.
+DriverWatchdog samples the RSS of the chromedriver/Chromium process tree and
+the latency of each detail page, and tells the scraper when the driver should
+be recycled between calls.
+"""
+import logging
+import os
+import statistics
+from collections import deque
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+from runlog import event
+
+logger = logging.getLogger(__name__)
+
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def _proc_children():
+    """Parent pid -> child pids for every process visible in /proc"""
+    children = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                # The command name may contain spaces, so split after its closing paren
+                ppid = int(f.read().rpartition(")")[2].split()[1])
+        except (OSError, ValueError, IndexError):
+            continue
+        children.setdefault(ppid, []).append(int(entry))
+    return children
+
+
+def _proc_rss(pid):
+    try:
+        with open(f"/proc/{pid}/statm") as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except (OSError, ValueError, IndexError):
+        return 0
+
+
+def process_tree_rss(pid):
+    """Resident memory in bytes of a process and all of its descendants"""
+    if psutil is not None:
+        try:
+            root = psutil.Process(pid)
+            total = 0
+            for process in [root] + root.children(recursive=True):
+                try:
+                    total += process.memory_info().rss
+                except psutil.Error:
+                    continue
+            return total
+        except psutil.Error:
+            return 0
+    if not os.path.isdir("/proc"):
+        return 0
+    children = _proc_children()
+    total = 0
+    stack = [pid]
+    while stack:
+        current = stack.pop()
+        total += _proc_rss(current)
+        stack.extend(children.get(current, ()))
+    return total
+
+
+def driver_pid(driver):
+    """Pid of the chromedriver process behind a Selenium driver, or None"""
+    try:
+        return driver.service.process.pid
+    except AttributeError:
+        return None
+
+
+class DriverWatchdog:
+    """
+    Decides when to recycle the driver: when the browser process tree grows
+    past max_rss_mb, when recent pages are latency_factor times slower than the
+    first ones, or after max_calls calls on one driver.
+    """
+
+    def __init__(self, max_rss_mb=2048, latency_factor=2.5, latency_window=20, max_calls=None, check_every=5):
+        self.max_rss = max_rss_mb * 1024 * 1024 if max_rss_mb else None
+        self.latency_factor = latency_factor
+        self.latency_window = latency_window
+        self.max_calls = max_calls
+        self.check_every = check_every
+        self.baseline = None
+        self.recent = deque(maxlen=latency_window)
+        self.calls = 0
+        self.total_calls = 0
+        self.last_rss = 0
+        self.peak_rss = 0
+        self.restarts = 0
+        self.restart_reasons = {}
+
+    def record(self, latency):
+        """Record how long one detail page took"""
+        self.calls += 1
+        self.total_calls += 1
+        self.recent.append(latency)
+        if self.baseline is None and len(self.recent) == self.latency_window:
+            self.baseline = statistics.median(self.recent)
+            logger.info("Detail page latency baseline: %.1fs", self.baseline)
+
+    def sample_rss(self, driver):
+        pid = driver_pid(driver)
+        if pid is None:
+            return 0
+        self.last_rss = process_tree_rss(pid)
+        self.peak_rss = max(self.peak_rss, self.last_rss)
+        return self.last_rss
+
+    def check(self, driver):
+        """Reason to recycle the driver now, or None; sampled every check_every calls"""
+        if self.max_calls and self.calls >= self.max_calls:
+            return "calls"
+        if not self.calls or self.calls % self.check_every:
+            return None
+        rss = self.sample_rss(driver)
+        logger.info("Browser memory: %.0f MB after %s calls", rss / 1e6, self.calls,
+                    extra=event("watchdog.sample", rss_mb=round(rss / 1e6), calls=self.calls))
+        if self.max_rss and rss > self.max_rss:
+            return "memory"
+        if self.baseline and len(self.recent) == self.latency_window:
+            current = statistics.median(self.recent)
+            if current > self.baseline * self.latency_factor:
+                return "latency"
+        return None
+
+    def recycled(self, reason):
+        """Count a restart and start measuring the new driver from scratch"""
+        self.restarts += 1
+        self.restart_reasons[reason] = self.restart_reasons.get(reason, 0) + 1
+        self.calls = 0
+        self.recent.clear()
+
+    def metrics(self):
+        return {
+            "calls": self.total_calls,
+            "restarts": self.restarts,
+            "restart_reasons": dict(self.restart_reasons),
+            "last_rss_mb": round(self.last_rss / 1e6),
+            "peak_rss_mb": round(self.peak_rss / 1e6),
+            "latency_baseline_s": round(self.baseline, 2) if self.baseline else None,
+        }
+
+    def log_report(self):
+        metrics = self.metrics()
+        logger.info(
+            "Driver watchdog: %s calls, %s restarts %s, peak browser memory %s MB",
+            metrics["calls"], metrics["restarts"], metrics["restart_reasons"] or "", metrics["peak_rss_mb"],
+            extra=event("watchdog.summary", **metrics),
+        )
@@ -0,0 +1,263 @@
+"""
+Lease-based work queue for distributed crawls, with no external broker.
+
+LeaseQueue keeps items in a local SQLite file. QueueServer exposes one over a
+small JSON-lines TCP protocol and RemoteQueue is the matching client, so
+workers on other hosts use the same API. Use open_queue() to get either.
+"""
+import json
+import logging
+import socket
+import socketserver
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS items (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind TEXT NOT NULL,
+    key TEXT NOT NULL UNIQUE,
+    priority INTEGER NOT NULL DEFAULT 0,
+    payload TEXT,
+    state TEXT NOT NULL DEFAULT 'pending',
+    worker TEXT,
+    lease_until REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    result TEXT,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS items_claim ON items (state, priority, id);
+"""
+
+
+class LeaseQueue:
+    """Work items that workers lease, keep alive with heartbeats and complete"""
+
+    def __init__(self, path, max_attempts=3):
+        self.path = path
+        self.max_attempts = max_attempts
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(_SCHEMA)
+
+    def _transaction(self, fn):
+        # BEGIN IMMEDIATE serializes writers across processes sharing the file
+        with self.lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                result = fn(self.conn)
+                self.conn.execute("COMMIT")
+                return result
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+
+    def put(self, kind, key, payload=None, priority=0):
+        """Add an item; items are unique by key, so re-publishing is a no-op"""
+        return self._transaction(lambda c: c.execute(
+            "INSERT OR IGNORE INTO items (kind, key, priority, payload) VALUES (?, ?, ?, ?)",
+            (kind, key, priority, json.dumps(payload, ensure_ascii=False)),
+        ).rowcount)
+
+    def _requeue_expired(self, c, now):
+        # attempts already counts the expired lease (claim increments it), so an item
+        # that keeps crashing or hanging its worker is failed like one that keeps raising
+        failed = c.execute(
+            "UPDATE items SET state = 'failed', worker = NULL, lease_until = NULL, error = 'lease expired' "
+            "WHERE state = 'leased' AND lease_until < ? AND attempts >= ?",
+            (now, self.max_attempts),
+        ).rowcount
+        if failed:
+            logger.warning("Failed %s items whose lease expired after %s attempts", failed, self.max_attempts)
+        return c.execute(
+            "UPDATE items SET state = 'pending', worker = NULL, lease_until = NULL "
+            "WHERE state = 'leased' AND lease_until < ?",
+            (now,),
+        ).rowcount
+
+    def requeue_expired(self):
+        """Return items whose lease ran out to the pending pool, or fail them after max_attempts"""
+        count = self._transaction(lambda c: self._requeue_expired(c, time.time()))
+        if count:
+            logger.warning("Re-queued %s items with expired leases", count)
+        return count
+
+    def claim(self, worker, lease_seconds=120, kinds=None):
+        """Lease the next pending item (lowest priority value first), or None"""
+        def claim_next(c):
+            now = time.time()
+            self._requeue_expired(c, now)
+            query = "SELECT id, kind, key, payload, attempts FROM items WHERE state = 'pending'"
+            args = []
+            if kinds:
+                query += f" AND kind IN ({', '.join('?' * len(kinds))})"
+                args.extend(kinds)
+            row = c.execute(query + " ORDER BY priority, id LIMIT 1", args).fetchone()
+            if row is None:
+                return None
+            c.execute(
+                "UPDATE items SET state = 'leased', worker = ?, lease_until = ?, attempts = attempts + 1 "
+                "WHERE id = ?",
+                (worker, now + lease_seconds, row[0]),
+            )
+            return {"id": row[0], "kind": row[1], "key": row[2], "payload": json.loads(row[3]), "attempts": row[4] + 1}
+        return self._transaction(claim_next)
+
+    def heartbeat(self, item_id, worker, lease_seconds=120):
+        """Extend a lease; False if the item is no longer leased by this worker"""
+        return bool(self._transaction(lambda c: c.execute(
+            "UPDATE items SET lease_until = ? WHERE id = ? AND worker = ? AND state = 'leased'",
+            (time.time() + lease_seconds, item_id, worker),
+        ).rowcount))
+
+    def complete(self, item_id, worker, result=None):
+        """Store the result of a leased item; False if the lease was lost meanwhile"""
+        return bool(self._transaction(lambda c: c.execute(
+            "UPDATE items SET state = 'done', result = ?, lease_until = NULL "
+            "WHERE id = ? AND worker = ? AND state = 'leased'",
+            (json.dumps(result, ensure_ascii=False), item_id, worker),
+        ).rowcount))
+
+    def fail(self, item_id, worker, error):
+        """Give an item back; it is marked failed after max_attempts"""
+        return bool(self._transaction(lambda c: c.execute(
+            "UPDATE items SET state = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END, "
+            "worker = NULL, lease_until = NULL, error = ? "
+            "WHERE id = ? AND worker = ? AND state = 'leased'",
+            (self.max_attempts, str(error), item_id, worker),
+        ).rowcount))
+
+    def results(self, kind, since_id=0):
+        """Completed items of a kind as (id, key, payload, result), oldest first"""
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT id, key, payload, result FROM items WHERE kind = ? AND state = 'done' AND id > ? ORDER BY id",
+                (kind, since_id),
+            ).fetchall()
+        return [(r[0], r[1], json.loads(r[2]), json.loads(r[3])) for r in rows]
+
+    def stats(self):
+        """Item counts by state"""
+        with self.lock:
+            rows = self.conn.execute("SELECT state, COUNT(*) FROM items GROUP BY state").fetchall()
+        return dict(rows)
+
+    def is_finished(self):
+        """True once nothing is pending or leased"""
+        counts = self.stats()
+        return not counts.get("pending") and not counts.get("leased")
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+
+# Methods a RemoteQueue may call through the server
+_REMOTE_METHODS = frozenset([
+    "put", "requeue_expired", "claim", "heartbeat", "complete", "fail", "results", "stats", "is_finished",
+])
+
+
+class _QueueRequestHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        for line in self.rfile:
+            try:
+                request = json.loads(line)
+                if request["op"] not in _REMOTE_METHODS:
+                    raise ValueError(f"Unknown operation: {request['op']}")
+                result = getattr(self.server.queue, request["op"])(*request.get("args", []), **request.get("kwargs", {}))
+                response = {"ok": True, "result": result}
+            except Exception as e:
+                logger.error("Queue request failed: %s", e)
+                response = {"ok": False, "error": str(e)}
+            self.wfile.write(json.dumps(response, ensure_ascii=False).encode("utf-8") + b"\n")
+            self.wfile.flush()
+
+
+class QueueServer(socketserver.ThreadingTCPServer):
+    """
+    Serves a LeaseQueue to remote workers over JSON lines. There is no
+    authentication, so it binds to loopback unless a host is given.
+    """
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, queue, host="127.0.0.1", port=8765):
+        super().__init__((host, port), _QueueRequestHandler)
+        self.queue = queue
+
+    def start(self):
+        """Serve in a background thread"""
+        thread = threading.Thread(target=self.serve_forever, name="queue-server", daemon=True)
+        thread.start()
+        logger.info("Work queue listening on %s:%s", *self.server_address)
+        return thread
+
+
+class RemoteQueue:
+    """Client for QueueServer with the same API as LeaseQueue"""
+
+    def __init__(self, host, port, timeout=30):
+        self.address = (host, port)
+        self.timeout = timeout
+        self.lock = threading.Lock()
+        self.sock = None
+        self.reader = None
+
+    def _connect(self):
+        self.sock = socket.create_connection(self.address, timeout=self.timeout)
+        self.reader = self.sock.makefile("rb")
+
+    def _call(self, op, *args, **kwargs):
+        request = json.dumps({"op": op, "args": args, "kwargs": kwargs}, ensure_ascii=False).encode("utf-8") + b"\n"
+        with self.lock:
+            for attempt in range(2):
+                try:
+                    if self.sock is None:
+                        self._connect()
+                    self.sock.sendall(request)
+                    line = self.reader.readline()
+                    if not line:
+                        raise ConnectionError("Queue server closed the connection")
+                    break
+                except OSError:
+                    # Reconnect once; the server may have restarted
+                    self.close()
+                    if attempt:
+                        raise
+        response = json.loads(line)
+        if not response["ok"]:
+            raise RuntimeError(response["error"])
+        return response["result"]
+
+    def __getattr__(self, name):
+        if name in _REMOTE_METHODS:
+            return lambda *args, **kwargs: self._call(name, *args, **kwargs)
+        raise AttributeError(name)
+
+    def results(self, kind, since_id=0):
+        return [tuple(row) for row in self._call("results", kind, since_id)]
+
+    def close(self):
+        if self.sock is not None:
+            try:
+                self.reader.close()
+                self.sock.close()
+            finally:
+                self.sock = None
+                self.reader = None
+
+
+def open_queue(spec):
+    """'tcp://host:port' for a remote queue, otherwise a SQLite file path"""
+    if spec.startswith("tcp://"):
+        host, _, port = spec[len("tcp://"):].rpartition(":")
+        return RemoteQueue(host, int(port))
+    if spec.startswith("sqlite://"):
+        spec = spec[len("sqlite://"):]
+    return LeaseQueue(spec)